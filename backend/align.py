@@ -0,0 +1,669 @@
+"""
+把大模型返回的删减结果对齐回原始 ASR 词下标
+
+模型输出是纯文本时逐字符对齐（去掉标点和空白，英文转小写）；是词列表时按词对齐，每个不同的词编码成一个字符。
+停顿词不参与文字对齐：模型在哪里保留了停顿，就保留原文中对应位置的停顿。
+
+对齐求的是原文与输出的最长公共子序列，做法与常见的 diff 实现相同：
+1. 去掉公共前缀和后缀；
+2. 锚点（patience diff）：取在原文和输出中都只出现一次的 k 元组（至少 ANCHOR_K，字符种类少时加长），
+   连成同一对角线上的公共段。与前后 CHAIN_WINDOW 段中多段交叉、又比它们短的段视为偶然重复先剔除，
+   剩下仍有交叉的段再选出两边位置都递增、总长度最大的一条链；
+3. 锚点之间的空档：先批量做贪心子序列嵌入，输出一侧的字符全部找到时就是最优解；找不到的空档用 LCS 动态规划
+   精确对齐，按大小分桶后批量计算，每一行用 maximum.accumulate 一次求出。超过 DP_MAX_CELLS 的空档
+   （大段重复、找不到锚点的内容）只做贪心匹配；
+4. 扩窗重对齐：输出中仍有未匹配、但原文里出现过的字符时，在它两侧取窗口重新做动态规划，窗口逐轮放大 4 倍，
+   匹配数增加才替换；整体不大时最后对全文做一次动态规划；
+5. 滑动整理（diff 的 compaction）：被删掉的一段两端字符相同时可以整体平移而不改变匹配数，
+   移到能与相邻删除段合并、且两端落在词边界上的位置，
+   例如原文 "今天 今天 我们" 对输出 "今天我们" 删掉前一个 "今天"，原文 "那个 个" 对输出 "个" 保留后一个 "个"；
+6. 整词修正：只对上一部分的词连同前后几个词按整词重新对齐，避免输出字符落到被删掉的多字词里。
+除了锚点交叉、过大的空档和可平移的删除段这些少见情况，全程是 NumPy 向量运算，5 万词在几十毫秒内完成，
+大量重复的字词也不例外。
+"""
+import re
+from bisect import bisect_left
+from itertools import accumulate
+from typing import Dict, List, Sequence, Tuple, Union
+import numpy as np
+from word_store import is_gap_text
+
+# 锚点元组的最小长度（按字符对齐时为字符数，按词对齐时为词数）。字符种类少时按种类数加长，
+# 使随机出现一次的元组足够少
+ANCHOR_K = 4
+# 检查锚点冲突时前后各看的段数
+CHAIN_WINDOW = 4
+# 单个空档动态规划的最大格子数，更大的空档退回贪心匹配
+DP_MAX_CELLS = 4_000_000
+# 输出有字符没匹配上时重新对齐的窗口：从未匹配字符两侧各 WIDEN_MIN 个字符起，每轮放大 4 倍，
+# 不超过 WIDEN_MAX，累计格子数不超过 WIDEN_CELLS
+WIDEN_MIN = 16
+WIDEN_MAX = 1024
+WIDEN_CELLS = 4_000_000
+# 一批空档一起做动态规划时的格子数上限，控制内存
+DP_BATCH_CELLS = 2_000_000
+# 输出一侧不超过这个长度的空档才批量处理
+BATCH_MAX_ROWS = 64
+# 删除段平移的最大距离
+SLIDE_MAX = 64
+# 按整词重新对齐部分匹配的词时，前后各带上的词数和窗口内输出字符数的上限
+REPAIR_WORDS = 3
+REPAIR_MAX_CHARS = 256
+# 匹配率低于该值时认为模型改写了内容，调用方应放弃对齐结果
+MIN_MATCH_RATIO = 0.9
+
+# 按词对齐时词的编码起点（辅助平面，避开代理区）
+_TOKEN_BASE = 0x10000
+# k 元组滚动哈希的乘数
+_HASH_MUL = np.uint64(0x9E3779B97F4A7C15)
+
+_DROP_RE = re.compile(r"[\W_]+", re.UNICODE)
+# 纯文本输出中的停顿标记，如 [0.350 sec]
+_GAP_RE = re.compile(r"\[\s*\d+(?:\.\d+)?\s*sec\]")
+
+
+def normalize(text: str) -> str:
+    return _DROP_RE.sub("", text).lower()
+
+
+def _encode_text(output: str) -> Tuple[str, List[int]]:
+    """
+    :return: (输出串, 输出中各停顿的位置（之前的输出字符数）)
+    """
+    parts = []
+    out_gaps = []
+    n = 0
+    for k, part in enumerate(_GAP_RE.split(output)):
+        if k:
+            out_gaps.append(n)
+        part = normalize(part)
+        parts.append(part)
+        n += len(part)
+    return "".join(parts), out_gaps
+
+
+def _encode_words(out_texts: List[str], index: Dict[str, int], pieces: List[str], is_gap: np.ndarray
+                  ) -> Tuple[str, List[int], List[str]]:
+    """
+    按词编码：原文每个不同的词（归一化后）对应一个字符，输出中原文没有的词编码成一个都不匹配的字符
+    :param index: 原文文字 -> 去重后的序号
+    :param pieces: 去重后各文字的归一化片段
+    :param is_gap: 去重后各文字是否为停顿
+    :return: (输出串, 输出中各停顿的位置, 去重后各文字的编码)
+    """
+    vocab = {}
+    codes = [vocab.setdefault(piece, chr(_TOKEN_BASE + len(vocab))) if piece else "" for piece in pieces]
+    unknown = chr(_TOKEN_BASE + len(vocab))
+    out_table = {}
+    for t in set(out_texts):
+        k = index.get(t)
+        if k is not None:
+            out_table[t] = "\n" if is_gap[k] else codes[k]
+        elif is_gap_text(t):
+            out_table[t] = "\n"
+        else:
+            piece = normalize(t)
+            out_table[t] = vocab.get(piece, unknown) if piece else ""
+    out = "".join(map(out_table.__getitem__, out_texts))
+    if "\n" not in out:
+        return out, [], codes
+    # 停顿先用换行占位，再换算成之前的输出字符数
+    breaks = np.flatnonzero(_codes(out) == ord("\n"))
+    return out.replace("\n", ""), (breaks - np.arange(len(breaks))).tolist(), codes
+
+
+def _previous(candidates: np.ndarray, idxs: np.ndarray) -> np.ndarray:
+    # idxs 中每个下标之前最近的 candidates（升序），没有时为 -1
+    pos = np.searchsorted(candidates, idxs)
+    return np.where(pos > 0, candidates[np.maximum(pos - 1, 0)] if len(candidates) else -1, -1)
+
+
+def _codes(text: str) -> np.ndarray:
+    return np.frombuffer(text.encode("utf-32-le"), dtype="<u4").astype(np.int64)
+
+
+def _common_prefix(a: np.ndarray, b: np.ndarray) -> int:
+    n = min(len(a), len(b))
+    diff = np.flatnonzero(a[:n] != b[:n])
+    return int(diff[0]) if len(diff) else n
+
+
+def _ranges(starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    # 把 [starts[r], starts[r] + lengths[r]) 依次拼接起来
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return offsets + np.arange(int(lengths.sum()))
+
+
+def _merge(lo: np.ndarray, hi: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # 按起点升序的区间 [lo, hi)，重叠的合并
+    new = np.ones(len(lo), dtype=bool)
+    new[1:] = lo[1:] > np.maximum.accumulate(hi)[:-1]
+    return lo[new], np.maximum.reduceat(hi, np.flatnonzero(new))
+
+
+def _gram_hashes(codes: np.ndarray, k: int) -> np.ndarray:
+    h = np.zeros(len(codes) - k + 1, dtype=np.uint64)
+    for t in range(k):
+        h = h * _HASH_MUL + codes[t:len(h) + t].astype(np.uint64)
+    # 再乘一次，让最后一个元素也影响到高位
+    return h * _HASH_MUL
+
+
+def _unique_pairs(s: np.ndarray, o: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    在原文和输出中都只出现一次的 k 元组
+    :return: (原文起点, 输出起点)，按输出起点升序
+    """
+    n = len(s) - k + 1
+    h = np.concatenate((_gram_hashes(s, k), _gram_hashes(o, k)))
+    # 哈希的高位和位置拼成一个数直接排序，比 argsort 快得多；高位相同即视为同一元组，碰撞由调用方核对
+    bits = len(h).bit_length()
+    mask = np.uint64((1 << bits) - 1)
+    key = np.sort((h & ~mask) | np.arange(len(h), dtype=np.uint64))
+    gram = key >> np.uint64(bits)
+    same = np.zeros(len(key) + 1, dtype=bool)
+    same[1:-1] = gram[1:] == gram[:-1]
+    # 恰好出现两次，且一次在原文、一次在输出
+    pair = np.flatnonzero(same[1:-1] & ~same[:-2] & ~same[2:])
+    a, b = (key[pair] & mask).astype(np.int64), (key[pair + 1] & mask).astype(np.int64)
+    both = (a < n) & (b >= n)
+    i, j = a[both], b[both] - n
+    order = np.sort((j << bits) | i)
+    return order & int(mask), order >> bits
+
+
+def _heaviest_chain(first: np.ndarray, last: np.ndarray, weight: np.ndarray) -> List[int]:
+    """
+    带权最长递增链：按输出顺序给出的段中，选出原文位置也递增（前一段的 last < 后一段的 first）、总权重最大的一组。
+    前沿上保存各个末端能达到的最大权重，末端越大权重越大，O(n log n)
+    """
+    ends, totals, heads = [], [], []
+    back = []
+    for r, (f, l, w) in enumerate(zip(first.tolist(), last.tolist(), weight.tolist())):
+        p = bisect_left(ends, f) - 1
+        total = w + (totals[p] if p >= 0 else 0)
+        back.append(heads[p] if p >= 0 else -1)
+        q = bisect_left(ends, l)
+        if (q > 0 and totals[q - 1] >= total) or (q < len(ends) and ends[q] == l and totals[q] >= total):
+            continue
+        e = q
+        while e < len(ends) and totals[e] <= total:
+            e += 1
+        ends[q:e], totals[q:e], heads[q:e] = [l], [total], [r]
+    chain = []
+    r = heads[-1] if heads else -1
+    while r >= 0:
+        chain.append(r)
+        r = back[r]
+    return chain[::-1]
+
+
+def _chain(first: np.ndarray, last: np.ndarray, weight: np.ndarray) -> np.ndarray:
+    """
+    从按输出顺序排列的段中选出原文位置也递增的链，返回保留的段下标。
+    先去掉明显错误的锚点：与前后 CHAIN_WINDOW 个段中至少两个冲突、且比冲突的段加起来短，
+    否则一个跳到远处的锚点会让它与回到原处之间的所有段都互相冲突。
+    之前的段都在它之前结束、之后的段都在它之后开始的段与谁都不冲突，一定在链上；
+    其余的段按连续区间分组，组与组之间互不影响，各组单独求带权最长递增链
+    """
+    n = len(first)
+    if n < 2 or np.all(first[1:] > last[:-1]):
+        return np.arange(n)
+    conflicts = np.zeros(n, dtype=np.int64)
+    against = np.zeros(n, dtype=np.int64)
+    for d in range(1, min(CHAIN_WINDOW, n - 1) + 1):
+        pair = last[:-d] >= first[d:]
+        conflicts[:-d] += pair
+        conflicts[d:] += pair
+        against[:-d] += pair * weight[d:]
+        against[d:] += pair * weight[:-d]
+    alive = np.flatnonzero((conflicts < 2) | (weight >= against))
+    first, last, weight = first[alive], last[alive], weight[alive]
+    prev_max = np.maximum.accumulate(np.concatenate(([-1], last[:-1])))
+    next_min = np.minimum.accumulate(np.concatenate((first[1:], [np.iinfo(np.int64).max]))[::-1])[::-1]
+    safe = (prev_max < first) & (next_min > last)
+    keep = [np.flatnonzero(safe)]
+    unsafe = np.flatnonzero(~safe)
+    bounds = np.flatnonzero(np.diff(unsafe) != 1) + 1
+    for group in np.split(unsafe, bounds):
+        chain = _heaviest_chain(first[group], last[group], weight[group])
+        keep.append(group[chain])
+    return alive[np.sort(np.concatenate(keep))]
+
+
+def _anchor_runs(s: np.ndarray, o: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    :return: (原文起点, 输出起点, 长度)，按位置递增、互不重叠的公共段
+    """
+    empty = np.zeros(0, dtype=np.int64)
+    if len(s) < k or len(o) < k:
+        return empty, empty, empty
+    i, j = _unique_pairs(s, o, k)
+    # 排除哈希碰撞
+    same = np.ones(len(i), dtype=bool)
+    for t in range(k):
+        same &= s[i + t] == o[j + t]
+    i, j = i[same], j[same]
+    if not len(i):
+        return empty, empty, empty
+    # 同一对角线上相邻的锚点连成一段
+    starts = np.concatenate(([0], np.flatnonzero((np.diff(i) != 1) | (np.diff(j) != 1)) + 1))
+    counts = np.diff(np.append(starts, len(i)))
+    first, last = i[starts], i[starts] + counts - 1
+    chosen = _chain(first, last, counts)
+    i, j, counts = i[starts][chosen], j[starts][chosen], counts[chosen]
+    length = counts + k - 1
+    # 每段覆盖到最后一个锚点之后的 k - 1 个位置，可能与下一段的开头重叠，截掉下一段的开头
+    overlap = np.zeros(len(i), dtype=np.int64)
+    overlap[1:] = np.maximum(np.maximum((i + length)[:-1] - i[1:], (j + length)[:-1] - j[1:]), 0)
+    return i + overlap, j + overlap, length - overlap
+
+
+def _embed_batch(s: np.ndarray, o: np.ndarray, i0: np.ndarray, j0: np.ndarray, ls: np.ndarray, lo: np.ndarray,
+                 match: np.ndarray) -> np.ndarray:
+    """
+    模型只删词时，空档里的输出通常就是原文的子序列：逐个输出字符在原文中往后找最近的相同字符，
+    全部找到时就是最长公共子序列，且每对匹配都尽量靠前，与动态规划的结果相同。
+    找到的写入 match，返回没能全部找到、需要动态规划的空档
+    """
+    cols = int(ls.max())
+    col = np.arange(cols)
+    src = np.where(col < ls[:, None], s[np.minimum(i0[:, None] + col, len(s) - 1)], -1)
+    g = np.arange(len(i0))
+    pos = np.zeros(len(i0), dtype=np.int64)
+    found = np.zeros((len(i0), int(lo.max())), dtype=np.int64)
+    ok = np.ones(len(i0), dtype=bool)
+    for a in range(int(lo.max())):
+        live = a < lo
+        hit = (src == o[np.minimum(j0 + a, len(o) - 1), None]) & (col >= pos[:, None])
+        q = np.argmax(hit, axis=1)
+        ok &= ~live | hit[g, q]
+        found[:, a] = q
+        pos = q + 1
+    done = np.flatnonzero(ok)
+    rows = _ranges(np.zeros(len(done), dtype=np.int64), lo[done])
+    owner = np.repeat(done, lo[done])
+    match[j0[owner] + rows] = i0[owner] + found[owner, rows]
+    return np.flatnonzero(~ok)
+
+
+def _lcs_batch(s: np.ndarray, o: np.ndarray, i0: np.ndarray, j0: np.ndarray, ls: np.ndarray, lo: np.ndarray,
+               match: np.ndarray):
+    """
+    一批空档一起做 LCS 动态规划：原文 s[i0:i0+ls] 对输出 o[j0:j0+lo]，结果写入 match（输出下标 -> 原文下标）
+    """
+    rows, cols = int(lo.max()), int(ls.max())
+    col = np.arange(cols)
+    src = np.where(col < ls[:, None], s[np.minimum(i0[:, None] + col, len(s) - 1)], -1)
+    row = np.arange(rows)
+    dst = np.where(row < lo[:, None], o[np.minimum(j0[:, None] + row, len(o) - 1)], -2)
+    # table[g, a, b]：输出前 a 个与原文前 b 个的 LCS 长度；每行对 b 不减，用前缀最大值一次求出
+    table = np.zeros((len(i0), rows + 1, cols + 1), dtype=np.int32)
+    for a in range(1, rows + 1):
+        prev = table[:, a - 1]
+        step = np.maximum(prev[:, 1:], prev[:, :-1] + (dst[:, a - 1, None] == src))
+        np.maximum.accumulate(step, axis=1, out=table[:, a, 1:])
+    # 回溯：在当前行找第一个达到 v 的列，再在该列找第一个达到 v 的行，该处必是一对匹配，
+    # 这样每对匹配都尽量靠前
+    g = np.arange(len(i0))
+    v = table[g, lo, ls]
+    a = lo.copy()
+    while True:
+        alive = v > 0
+        g, a, v = g[alive], a[alive], v[alive]
+        if not len(g):
+            break
+        b = np.argmax(table[g, a, :] >= v[:, None], axis=1)
+        a = np.argmax(table[g, :, b] >= v[:, None], axis=1)
+        match[j0[g] + a - 1] = i0[g] + b - 1
+        a -= 1
+        v -= 1
+
+
+def _greedy(src: str, out: str, i0: int, i1: int, j0: int, j1: int, match: np.ndarray) -> int:
+    """
+    按顺序为每个输出字符找原文中下一个相同的字符；记住每个字符从哪里开始找不到，避免重复扫描
+    :return: 匹配上的字符数
+    """
+    missing: Dict[str, int] = {}
+    p = i0
+    count = 0
+    for j in range(j0, j1):
+        c = out[j]
+        if missing.get(c, i1) <= p:
+            continue
+        q = src.find(c, p, i1)
+        if q < 0:
+            missing[c] = p
+            continue
+        match[j] = q
+        p = q + 1
+        count += 1
+    return count
+
+
+def _batches(ls: np.ndarray, lo: np.ndarray, gaps: np.ndarray):
+    """
+    把空档分批：按输出一侧的长度向上取到 2 的幂分桶，每批循环的行数由它决定；
+    桶内按原文一侧的长度排序，依次装批，补齐到批内最长后的格子数不超过 DP_BATCH_CELLS
+    """
+    if not len(gaps):
+        return
+    bucket = np.ceil(np.log2(lo[gaps])).astype(np.int64)
+    order = np.lexsort((ls[gaps], bucket))
+    gaps, bucket = gaps[order], bucket[order]
+    for group in np.split(gaps, np.flatnonzero(np.diff(bucket)) + 1):
+        rows = int(lo[group].max()) + 1
+        b = 0
+        while b < len(group):
+            cost = np.arange(1, len(group) - b + 1) * rows * (ls[group[b:]] + 1)
+            e = b + max(1, int(np.searchsorted(cost, DP_BATCH_CELLS, side="right")))
+            yield group[b:e]
+            b = e
+
+
+def _fill_gaps(s: np.ndarray, o: np.ndarray, src: str, out: str, i0: np.ndarray, i1: np.ndarray,
+               j0: np.ndarray, j1: np.ndarray, match: np.ndarray):
+    ls, lo = i1 - i0, j1 - j0
+    busy = (ls > 0) & (lo > 0)
+    large = (ls + 1) * (lo + 1) > DP_MAX_CELLS
+    # 太大的空档只做贪心匹配
+    for g in np.flatnonzero(busy & large).tolist():
+        _greedy(src, out, int(i0[g]), int(i1[g]), int(j0[g]), int(j1[g]), match)
+    busy &= ~large
+    # 输出一侧较长的空档批量处理时循环次数多，逐个在字符串上找子序列更快；全部找到就是最优解，否则做动态规划
+    failed = []
+    for g in np.flatnonzero(busy & (lo > BATCH_MAX_ROWS)).tolist():
+        if _greedy(src, out, int(i0[g]), int(i1[g]), int(j0[g]), int(j1[g]), match) < lo[g]:
+            match[j0[g]:j1[g]] = -1
+            failed.append(g)
+    for part in _batches(ls, lo, np.array(failed, dtype=np.int64)):
+        _lcs_batch(s, o, i0[part], j0[part], ls[part], lo[part], match)
+    for part in _batches(ls, lo, np.flatnonzero(busy & (lo <= BATCH_MAX_ROWS))):
+        part = part[_embed_batch(s, o, i0[part], j0[part], ls[part], lo[part], match)]
+        if len(part):
+            _lcs_batch(s, o, i0[part], j0[part], ls[part], lo[part], match)
+
+
+def _widen(s: np.ndarray, o: np.ndarray, src: str, out: str, match: np.ndarray):
+    """
+    锚点是启发式的：原文重复多、字符种类少时，偶然只出现一次的元组会把对齐带偏。
+    输出还有字符没匹配上时，以它们为中心、两侧已匹配的字符为界重新做精确的动态规划，窗口逐轮放大，
+    直到全部匹配、窗口超过 WIDEN_MAX 或累计格子数超过 WIDEN_CELLS。窗口内原有的匹配是可行解，重算不会变差
+    """
+    n, m = len(s), len(o)
+    if np.all(match >= 0):
+        return
+    # 原文里根本没有的字符（模型改写的字）不用管
+    present = np.isin(o, s)
+    width = WIDEN_MIN
+    spent = 0
+    while width <= WIDEN_MAX:
+        miss = np.flatnonzero((match < 0) & present)
+        if not len(miss):
+            return
+        j0, j1 = _merge(np.maximum(miss - width, 0), np.minimum(miss + width + 1, m))
+        matched = np.flatnonzero(match >= 0)
+        i0, i1 = np.zeros(len(j0), dtype=np.int64), np.full(len(j0), n, dtype=np.int64)
+        if len(matched):
+            k = np.searchsorted(matched, j0) - 1
+            i0 = np.where(k >= 0, match[matched[np.maximum(k, 0)]] + 1, 0)
+            k = np.searchsorted(matched, j1)
+            i1 = np.where(k < len(matched), match[matched[np.minimum(k, len(matched) - 1)]], n)
+        cells = (i1 - i0 + 1) * (j1 - j0 + 1)
+        fit = cells <= DP_MAX_CELLS
+        spent += int(cells[fit].sum())
+        if not fit.any() or spent > WIDEN_CELLS:
+            break
+        i0, i1, j0, j1 = i0[fit], i1[fit], j0[fit], j1[fit]
+        match[_ranges(j0, j1 - j0)] = -1
+        _fill_gaps(s, o, src, out, i0, i1, j0, j1, match)
+        width *= 4
+    # 整体不大时最后对全文做一次
+    if ((match < 0) & present).any() and (n + 1) * (m + 1) <= DP_MAX_CELLS:
+        match[:] = -1
+        _fill_gaps(s, o, src, out, np.zeros(1, dtype=np.int64), np.array([n]), np.zeros(1, dtype=np.int64),
+                   np.array([m]), match)
+
+
+def _diff(src: str, out: str) -> np.ndarray:
+    """
+    :return: 输出每个字符匹配到的原文位置，未匹配为 -1；匹配位置严格递增
+    """
+    s, o = _codes(src), _codes(out)
+    n, m = len(s), len(o)
+    match = np.full(m, -1, dtype=np.int64)
+    head = _common_prefix(s, o)
+    tail = _common_prefix(s[head:][::-1], o[head:][::-1])
+    match[:head] = np.arange(head)
+    match[m - tail:] = np.arange(n - tail, n)
+    kinds = len(np.unique(s[head:n - tail]))
+    k = max(ANCHOR_K, int(np.log(max(n, 2)) / np.log(max(kinds, 2))) + 2)
+    i, j, length = _anchor_runs(s[head:n - tail], o[head:m - tail], k)
+    i, j = i + head, j + head
+    match[_ranges(j, length)] = _ranges(i, length)
+    _fill_gaps(s, o, src, out, np.append(head, i + length), np.append(i, n - tail),
+               np.append(head, j + length), np.append(j, m - tail), match)
+    _widen(s, o, src, out, match)
+    return match
+
+
+def _compact(s: np.ndarray, src_match: np.ndarray, boundary: np.ndarray):
+    """
+    平移删除段：原文 [a, b) 未匹配、前面紧挨着的已匹配字符与 b-1 处相同时，可以把删除段左移一位，
+    原来匹配 a-1 的输出字符改为匹配 b-1，匹配数不变；右移同理。
+    在可平移的范围内选：能与相邻删除段合并的位置优先，其次是两端落在词边界（boundary）上的，再次是移动最少的。
+    src_match（原文下标 -> 输出下标，未匹配为 -1）就地修改
+    """
+    n = len(s)
+    free = src_match < 0
+    if not free.any() or free.all():
+        return
+    edge = np.diff(np.concatenate(([0], free.view(np.int8), [0])))
+    starts, ends = np.flatnonzero(edge == 1), np.flatnonzero(edge == -1)
+    inner_l = starts > 0
+    inner_r = ends < n
+    left = np.zeros(len(starts), dtype=bool)
+    left[inner_l] = s[starts[inner_l] - 1] == s[ends[inner_l] - 1]
+    right = np.zeros(len(starts), dtype=bool)
+    right[inner_r] = s[starts[inner_r]] == s[ends[inner_r]]
+    sm = src_match
+    for a, b in zip(starts[left | right].tolist(), ends[left | right].tolist()):
+        # 前面的平移可能已经改变了这一段
+        if (sm[a:b] >= 0).any() or (a > 0 and sm[a - 1] < 0) or (b < n and sm[b] < 0):
+            continue
+        size = b - a
+        t_l = 0
+        while t_l < SLIDE_MAX and a - t_l > 0 and sm[a - t_l - 1] >= 0 and s[a - t_l - 1] == s[b - t_l - 1]:
+            t_l += 1
+        t_r = 0
+        while t_r < SLIDE_MAX and b + t_r < n and sm[b + t_r] >= 0 and s[a + t_r] == s[b + t_r]:
+            t_r += 1
+        # 左移到头时紧挨着前一个删除段则合并，右移同理；不合并时相邻删除段的端点不变，需计入比较
+        merge_l = t_l and a - t_l > 0 and sm[a - t_l - 1] < 0
+        merge_r = t_r and b + t_r < n and sm[b + t_r] < 0
+        best = None
+        for shift in range(-t_l, t_r + 1):
+            merged = int(bool(merge_l) and shift == -t_l) + int(bool(merge_r) and shift == t_r)
+            bad = 0
+            if not (merge_l and shift == -t_l):
+                bad += (not boundary[a + shift]) + (merge_l and not boundary[a - t_l])
+            if not (merge_r and shift == t_r):
+                bad += (not boundary[b + shift]) + (merge_r and not boundary[b + t_r])
+            key = (-merged, bad, abs(shift))
+            if best is None or key < best[0]:
+                best = (key, shift)
+        shift = best[1]
+        if shift < 0:
+            moved = sm[a + shift:a].copy()
+            sm[a + shift:b] = -1
+            sm[b + shift:b] = moved
+        elif shift > 0:
+            moved = sm[b:b + shift].copy()
+            sm[a:b + shift] = -1
+            sm[a:a + shift] = moved
+
+
+def _repair_window(pieces: List[str], seg: str) -> Tuple[int, List[Tuple[int, int]]]:
+    """
+    只允许整词匹配的对齐：每个词要么整个对上 seg 中连续的一段，要么删掉；seg 中的字符可以跳过
+    :return: (匹配的字符数, [(词序号, 在 seg 中的起点)])
+    """
+    m = len(seg)
+    table = [[0] * (m + 1)]
+    for piece in pieces:
+        prev = table[-1]
+        row = prev[:]
+        size = len(piece)
+        y = seg.find(piece) if size else -1
+        while y >= 0:
+            row[y + size] = max(row[y + size], prev[y] + size)
+            y = seg.find(piece, y + 1)
+        table.append(list(accumulate(row, max)))
+    # 回溯时能保留就保留，并列时保留靠后的词，与 _compact 把删除段往前合并一致
+    kept = []
+    y = m
+    for w in range(len(pieces), 0, -1):
+        size = len(pieces[w - 1])
+        while True:
+            if size and y >= size and table[w - 1][y - size] + size == table[w][y] \
+                    and seg.startswith(pieces[w - 1], y - size):
+                kept.append((w - 1, y - size))
+                y -= size
+                break
+            if table[w - 1][y] == table[w][y]:
+                break
+            y -= 1
+    return table[-1][m], kept[::-1]
+
+
+def _repair(out: str, ids: np.ndarray, pieces: List[str], starts: np.ndarray, src_match: np.ndarray,
+            partial: np.ndarray, full: np.ndarray):
+    """
+    逐字符对齐只求匹配数最多，可能让输出字符落到被删掉的多字词里，例如原文 "视 要视 需来" 对输出 "视需来"，
+    "视" 匹配到 "要视" 上，单字词 "视" 反而丢了。对部分匹配的词连同前后 REPAIR_WORDS 个词按整词重新对齐，
+    匹配数不减少就替换。full 标记整个匹配上的词，src_match 就地修改
+    """
+    n_words = len(ids)
+    lo, hi = _merge(np.maximum(partial - REPAIR_WORDS, 0), np.minimum(partial + REPAIR_WORDS + 1, n_words))
+    positions = np.flatnonzero(src_match >= 0)
+    out_pos = src_match[positions]
+    # 前面的窗口改动后只会用到本窗口原有匹配之前的输出字符，floor 防止后面的窗口与之重叠
+    floor = 0
+    for a, b in zip(lo.tolist(), hi.tolist()):
+        cs, ce = int(starts[a]), int(starts[b])
+        k = np.searchsorted(positions, cs)
+        y_l = max(int(out_pos[k - 1]) + 1 if k else 0, floor)
+        k = np.searchsorted(positions, ce)
+        y_r = int(out_pos[k]) if k < len(positions) else len(out)
+        if y_r - y_l > REPAIR_MAX_CHARS:
+            continue
+        words = [pieces[k] for k in ids[a:b].tolist()]
+        seg = out[y_l:y_r]
+        # 按整词对齐只算整词，得分要不少于现有匹配，必须有原本没整个对上的词能整个对上
+        chars = set(seg)
+        if not any(w and not f and chars.issuperset(w) for w, f in zip(words, full[a:b].tolist())):
+            continue
+        score, kept = _repair_window(words, seg)
+        if score < int((src_match[cs:ce] >= 0).sum()):
+            continue
+        src_match[cs:ce] = -1
+        for w, y in kept:
+            size = len(words[w])
+            start = int(starts[a + w])
+            src_match[start:start + size] = np.arange(y_l + y, y_l + y + size)
+        if kept:
+            floor = y_l + kept[-1][1] + len(words[kept[-1][0]])
+
+
+def align_words(output: Union[str, Sequence[Union[str, Dict]]], orig_words: List[Dict]) -> Tuple[List[int], float]:
+    """
+    :param output: 模型返回的删减结果，纯文本或词列表（字符串或 {"word": ...}）
+    :param orig_words: 原始词列表 [{"word": ...}, ...]
+    :return: (保留的 orig_words 下标（升序）, 匹配率)。匹配率为输出文字中能在原文按顺序找到的比例（停顿不计），
+             明显小于 1 说明模型改写了内容，结果不可信
+    """
+    texts = [w["word"] for w in orig_words]
+    # ASR 结果里同样的字词反复出现，按去重后的文字处理；停顿没有片段
+    unique = list(dict.fromkeys(texts))
+    index = {t: k for k, t in enumerate(unique)}
+    ids = np.fromiter(map(index.__getitem__, texts), dtype=np.int64, count=len(texts))
+    is_gap = np.fromiter(map(is_gap_text, unique), dtype=bool, count=len(unique))
+    pieces = ["" if gap else normalize(t) for t, gap in zip(unique, is_gap.tolist())]
+    if isinstance(output, str):
+        out, out_gaps = _encode_text(output)
+        return _align(out, out_gaps, ids, pieces, is_gap)
+
+    try:
+        # 通常是字符串列表，能直接拼接就不必逐个判断
+        "".join(output)
+        out_texts = list(output)
+    except TypeError:
+        out_texts = [w["word"] if isinstance(w, dict) else w for w in output]
+    out, out_gaps, codes = _encode_words(out_texts, index, pieces, is_gap)
+    keep, ratio = _align(out, out_gaps, ids, codes, is_gap)
+    # 模型合并或拆分了词时按词对不上，再逐字符对齐一次，取匹配率高的；所有词都是单字时两者相同
+    if ratio < 1.0 and max(map(len, pieces + out_texts), default=0) > 1:
+        out, out_gaps = _encode_text("".join(out_texts))
+        char_keep, char_ratio = _align(out, out_gaps, ids, pieces, is_gap)
+        if char_ratio > ratio:
+            return char_keep, char_ratio
+    return keep, ratio
+
+
+def _align(out: str, out_gaps: List[int], ids: np.ndarray, pieces: List[str], is_gap: np.ndarray
+           ) -> Tuple[List[int], float]:
+    """
+    :param ids: 原文各词的文字在去重后的序号
+    :param pieces: 去重后各文字的片段（按词对齐时为编码）
+    :param is_gap: 去重后各文字是否为停顿
+    """
+    piece_lengths = np.fromiter(map(len, pieces), dtype=np.int64, count=len(pieces))
+    lengths = piece_lengths[ids]
+    # 原文按去重后的片段拼出码点，不必逐词拼接字符串
+    s = _codes("".join(pieces))[_ranges((np.cumsum(piece_lengths) - piece_lengths)[ids], lengths)]
+    src = s.astype("<u4").tobytes().decode("utf-32-le")
+    # owner[c]：字符 c 所属的词
+    owner = np.repeat(np.arange(len(ids)), lengths)
+    n_src = len(src)
+    n_out = len(out)
+
+    match = _diff(src, out)
+    src_match = np.full(n_src, -1, dtype=np.int64)
+    found = np.flatnonzero(match >= 0)
+    src_match[match[found]] = found
+    boundary = np.ones(n_src + 1, dtype=bool)
+    boundary[1:n_src] = owner[1:] != owner[:-1]
+    _compact(s, src_match, boundary)
+    counts = np.bincount(owner[src_match >= 0], minlength=len(ids))
+    partial = np.flatnonzero((counts > 0) & (counts < lengths))
+    if len(partial):
+        _repair(out, ids, pieces, np.concatenate(([0], np.cumsum(lengths))), src_match, partial,
+                counts == lengths)
+    matched = src_match >= 0
+    ratio = int(matched.sum()) / n_out if n_out else 1.0
+
+    # 一个词的字符过半匹配即保留
+    counts = np.bincount(owner[matched], minlength=len(ids))
+    kept = counts * 2 > lengths
+    empty = np.flatnonzero(lengths == 0)
+    if len(empty):
+        gap = is_gap[ids[empty]]
+        # 纯标点跟随前一个有文字的词
+        punct = empty[~gap]
+        prev = _previous(np.flatnonzero(lengths > 0), punct)
+        kept[punct] = (prev >= 0) & kept[np.maximum(prev, 0)]
+        # 停顿：输出里停顿前最后一个匹配上的字符属于哪个原文词，就保留该词之后、下一个保留的词之前的停顿；
+        # 输出开头的停顿对应第一个保留的词之前的停顿
+        anchors = [-1] if out_gaps and out_gaps[0] == 0 else []
+        if out_gaps:
+            # 匹配是单调的，按原文顺序排列的匹配也按输出顺序排列
+            out_pos = src_match[matched]
+            gaps = np.array([g for g in out_gaps if g], dtype=np.int64)
+            last = np.searchsorted(out_pos, gaps - 1, side="right") - 1
+            last = last[last >= 0]
+            anchors.extend(owner[np.flatnonzero(matched)[last]].tolist())
+        gap_words = empty[gap]
+        prev = _previous(np.flatnonzero(kept & (lengths > 0)), gap_words)
+        kept[gap_words] = np.isin(prev, anchors)
+    return np.flatnonzero(kept).tolist(), ratio
@@ -1,41 +1,26 @@
 """
 语音识别与停顿检测模块
 """
-from typing import List, Dict
-import whisper
-import os
+from typing import List, Dict, Optional
+import config
+from asr_service import asr_service
 
 # 停顿阈值（秒），大于此值认为是换气/停顿
 PAUSE_THRESHOLD = 0.2
 
-# 切换为 medium 模型，兼顾细节和CPU稳定性
-model = whisper.load_model("medium")
 
-def transcribe_with_pauses(audio_path: str) -> List[Dict]:
+def transcribe_with_pauses(audio_path: str, model_name: Optional[str] = None,
+                           engine: str = "whisper") -> List[Dict]:
     """
-    识别音频中的语音，返回每句话/词及其时间戳，检测停顿。
-    返回格式: [{"text": str, "start": float, "end": float, "pause": float}]
+    识别音频中的语音，返回每句话/词及其时间戳，停顿以空隙分段表示。
+    默认使用 whisper 引擎的 medium 模型，兼顾细节和CPU稳定性；首次识别时才加载。
+    返回格式与 ASRService.transcribe 相同:
+    [{"start": float, "end": float, "text": str, "words": [{"word": str, "start": float, "end": float}]}]
+    其中相邻语音段之间的停顿为 text 形如 "[0.350 sec]" 的空隙分段
     """
-    result = model.transcribe(
+    return asr_service.transcribe(
         audio_path,
-        word_timestamps=True,
-        verbose=False,
-        language="zh",
-        condition_on_previous_text=False,
+        chunk_seconds=0,
+        model_name=model_name or config.WHISPER_MODEL,
+        engine=engine,
     )
-    segments = result.get("segments", [])
-    output = []
-    last_end = 0.0
-    for seg in segments:
-        start = seg["start"]
-        end = seg["end"]
-        text = seg["text"].strip()
-        pause = start - last_end if last_end > 0 else 0.0
-        output.append({
-            "text": text,
-            "start": start,
-            "end": end,
-            "pause": round(pause, 2)
-        })
-        last_end = end
-    return output 
\ No newline at end of file
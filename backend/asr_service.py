@@ -1,65 +1,298 @@
-import stable_whisper
-import os
-import tempfile
-from typing import List, Dict, Any
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple, Callable
+import numpy as np
+import config
+from engines import ASREngine, ENGINES, engine_registry, engine_key, create_engine, offset_segments
+from scheduler import InferenceScheduler
+from disk_cache import make_key
+from audio_io import SAMPLE_RATE, load_audio
+
+# VAD 参数：帧长（秒）、相对最大能量的静音阈值（dB）、最短静音时长（秒）
+VAD_FRAME = 0.03
+VAD_THRESHOLD_DB = -40.0
+VAD_MIN_SILENCE = 0.3
+
+
+def find_silences(audio: np.ndarray, sr: int = SAMPLE_RATE) -> List[Tuple[float, float]]:
+    """
+    基于帧能量的 VAD，返回所有不短于 VAD_MIN_SILENCE 的静音区间 [(start, end), ...]（秒）
+    """
+    frame = int(sr * VAD_FRAME)
+    n_frames = len(audio) // frame
+    if n_frames == 0:
+        return []
+    frames = audio[:n_frames * frame].reshape(n_frames, frame)
+    # einsum 逐帧求平方和，不生成与整段音频同样大小的临时数组
+    rms = np.sqrt(np.einsum("ij,ij->i", frames, frames) / frame) + 1e-10
+    db = 20 * np.log10(rms / rms.max())
+    silent = np.concatenate(([False], db < VAD_THRESHOLD_DB, [False]))
+    # 静音段的起止帧
+    edges = np.flatnonzero(np.diff(silent.astype(np.int8)))
+    starts, ends = edges[0::2], edges[1::2]
+    keep = (ends - starts) * VAD_FRAME >= VAD_MIN_SILENCE
+    return [(float(s * VAD_FRAME), float(e * VAD_FRAME)) for s, e in zip(starts[keep], ends[keep])]
+
+
+def split_on_silences(duration: float, silences: List[Tuple[float, float]], chunk_seconds: float) -> List[Tuple[float, float]]:
+    """
+    在静音中点处切分，每块时长尽量接近 chunk_seconds；附近没有静音时在目标位置硬切。
+    返回 [(start, end), ...]（秒）
+    """
+    mids = [(s + e) / 2 for s, e in silences]
+    chunks = []
+    start = 0.0
+    while duration - start > chunk_seconds * 1.5:
+        target = start + chunk_seconds
+        candidates = [m for m in mids if start + chunk_seconds * 0.5 <= m <= start + chunk_seconds * 1.5]
+        cut = min(candidates, key=lambda m: abs(m - target)) if candidates else target
+        chunks.append((start, cut))
+        start = cut
+    chunks.append((start, duration))
+    return chunks
+
+
+def _insert_gaps(raw_segments: List[Dict[str, Any]], last_end: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    在相邻语音段之间插入空隙时间标注
+    :param last_end: 上一批分段的结束时间，分批（流式）处理时用于补上批次之间的空隙
+    """
+    segments = []
+    for segment in raw_segments:
+        if last_end is not None and segment["start"] > last_end:
+            gap_sec = segment["start"] - last_end
+            gap_sec_str = f"[{gap_sec:.3f} sec]"
+            segments.append({
+                "start": last_end,
+                "end": segment["start"],
+                "text": gap_sec_str,
+                "words": [
+                    {
+                        "word": gap_sec_str,
+                        "start": last_end,
+                        "end": segment["start"]
+                    }
+                ]
+            })
+        segments.append(segment)
+        last_end = segment["end"]
+    return segments
+
+
+# 兼容旧名称：模型注册表即引擎注册表，键为 引擎:模型
+model_registry = engine_registry
+
+
+def _transcribe_batch(engine: ASREngine, pieces: List[np.ndarray]) -> List[List[Dict[str, Any]]]:
+    """
+    一次处理多个音频窗口，引擎支持批量解码时整批送入，否则在推理线程内逐个转录
+    """
+    return engine.transcribe_batch(pieces)
+
+
+# 单进程转录统一经调度器排队执行，多个请求公平分享同一个模型
+scheduler = InferenceScheduler(engine_registry, _transcribe_batch, batch_size=config.ASR_BATCH_SIZE,
+                               max_queue=config.ASR_QUEUE_MAX, sample_rate=SAMPLE_RATE)
+
+# 分块转录的工作进程各自持有一份模型
+_worker_engine = None
+
+
+def _init_worker(key: str):
+    global _worker_engine
+    _worker_engine = create_engine(key)
+
+
+def _transcribe_chunk(audio: np.ndarray, offset: float) -> List[Dict[str, Any]]:
+    return offset_segments(_worker_engine.transcribe(audio), offset)
+
 
 class ASRService:
-    def __init__(self, model_name: str = "large-v3"):
+    def __init__(self, model_name: str = config.ASR_MODEL, engine: str = config.ASR_ENGINE):
         """
-        初始化 ASR 服务
-        :param model_name: whisper 模型名称，可选值：tiny, base, small, medium, large
+        初始化 ASR 服务，模型在首次转录时才加载
+        :param model_name: 默认 whisper 模型名称，可选值：tiny, base, small, medium, large
+        :param engine: 默认引擎，见 engines.ENGINES
         """
-        self.model = stable_whisper.load_model(model_name)
-    
-    def transcribe(self, audio_path: str) -> List[Dict[str, Any]]:
+        self.model_name = model_name
+        self.engine = engine
+        self._pool = None
+        self._pool_key = None
+        self._pool_last_used = 0.0
+        # 正在使用进程池的请求数，大于 0 时空闲卸载跳过进程池
+        self._pool_busy = 0
+        self._pool_lock = threading.Lock()
+        self._reaper = None
+
+    @property
+    def model(self) -> ASREngine:
+        return engine_registry.get(engine_key(self.engine, self.model_name))
+
+    def warmup(self, model_names: Optional[List[str]] = None):
+        """
+        预热模型，默认只预热默认模型。名称可以带引擎前缀，如 faster-whisper:medium
         """
-        转录音频文件
+        names = model_names or [self.model_name]
+        engine_registry.warmup([name if ":" in name else engine_key(self.engine, name) for name in names])
+
+    def _get_pool(self, key: str, workers: int) -> ProcessPoolExecutor:
+        # 进程池常驻复用，避免每次请求都在子进程里重新加载模型
+        if self._pool is None or self._pool_key != (key, workers):
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+            self._pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(key,),
+            )
+            self._pool_key = (key, workers)
+        self._pool_last_used = time.time()
+        return self._pool
+
+    def unload_idle(self):
+        """
+        卸载空闲超时的模型；分块进程池空闲超时后整体关闭，释放子进程里的模型
+        """
+        engine_registry.unload_idle()
+        timeout = engine_registry.idle_timeout
+        with self._pool_lock:
+            if (self._pool is not None and timeout > 0 and not self._pool_busy
+                    and time.time() - self._pool_last_used > timeout):
+                print("[ASR] chunk worker pool idle, shutting down")
+                self._pool.shutdown(wait=False)
+                self._pool = None
+                self._pool_key = None
+
+    def start_reaper(self, interval: float = 60):
+        """
+        启动后台线程，定期调用 unload_idle。服务启动时调用一次（见 main.py），空闲卸载只由这一个线程负责
+        """
+        if self._reaper is not None or engine_registry.idle_timeout <= 0:
+            return
+
+        def loop():
+            while True:
+                time.sleep(interval)
+                self.unload_idle()
+
+        self._reaper = threading.Thread(target=loop, daemon=True)
+        self._reaper.start()
+
+    @staticmethod
+    def split_plan(chunk_seconds: Optional[float] = None, workers: Optional[int] = None) -> Tuple[float, int]:
+        """
+        实际的切分方式：(分块目标时长, 进程数)，目标为 0 表示整段转录，进程数为 1 表示交给调度器。
+        未给出的参数取 config.ASR_CHUNK_SECONDS / config.ASR_WORKERS；单进程时目标另外受 ASR_WINDOW_SECONDS 限制，
+        split_on_silences 切出的块最长为目标的 1.5 倍，目标取不超过它的 1/1.5
+        """
+        chunk_seconds = config.ASR_CHUNK_SECONDS if chunk_seconds is None else chunk_seconds
+        chunk_seconds = max(0.0, chunk_seconds or 0.0)
+        workers = config.ASR_WORKERS if workers is None else workers
+        workers = max(1, workers) if chunk_seconds else 1
+        if workers <= 1 and config.ASR_WINDOW_SECONDS > 0:
+            window = config.ASR_WINDOW_SECONDS / 1.5
+            chunk_seconds = min(window, chunk_seconds) if chunk_seconds else window
+        return chunk_seconds, workers
+
+    def cache_key(self, content_hash: str, model_name: Optional[str] = None,
+                  chunk_seconds: Optional[float] = None, engine: Optional[str] = None,
+                  workers: Optional[int] = None) -> str:
+        """
+        转录结果缓存 key：音频内容哈希 + 引擎 + 模型 + 语言等转录参数 + 实际的切分方式（切分会影响结果）。
+        参数与 transcribe 相同，切分方式相同的请求共用缓存；进程池和调度器解码方式不同，分开缓存，
+        具体进程数不影响结果
+        """
+        target, workers = self.split_plan(chunk_seconds, workers)
+        engine = engine or self.engine
+        return make_key("asr", content_hash, engine, model_name or self.model_name,
+                        ENGINES[engine].options, target, "pool" if workers > 1 else "scheduler")
+
+    def transcribe(self, audio_path: str, chunk_seconds: Optional[float] = None,
+                   workers: Optional[int] = None, model_name: Optional[str] = None,
+                   on_progress: Optional[Callable[[float], None]] = None,
+                   on_segments: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+                   content_hash: Optional[str] = None,
+                   queue_timeout: Optional[float] = None,
+                   engine: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        转录音频文件。音频只解码一次（16kHz 单声道，按内容缓存），直接从内存送入模型
         :param audio_path: 音频文件路径
+        :param chunk_seconds: 分块目标时长（秒），默认取 config.ASR_CHUNK_SECONDS；单进程转录时窗口另外不超过
+                              config.ASR_WINDOW_SECONDS。两者都为 0 时整段作为一个窗口转录
+        :param workers: 分块并行进程数，默认取 config.ASR_WORKERS，只在 chunk_seconds 不为 0 时使用
+        :param model_name: 本次使用的模型，默认使用服务的默认模型
+        :param on_progress: 进度回调，参数为 0~1 的完成比例
+        :param on_segments: 分块模式下每完成一块就按时间顺序回调新得到的分段（格式与返回值相同）
+        :param content_hash: 文件内容哈希，用作解码缓存的 key
+        :param queue_timeout: 调度队列已满时最多等待多久（秒），超时抛 queue.Full；None 表示一直等待
+        :param engine: 本次使用的引擎，默认使用服务的默认引擎
         :return: 包含时间戳的转录结果列表
         """
-        # 使用 stable-ts 进行转录，启用 VAD 以获得更好的非语音检测
-        result = self.model.transcribe(
-            audio_path,
-            vad=True,  # 使用 VAD 进行语音检测
-            word_timestamps=True,  # 启用词级别时间戳
-            language="zh",  # 设置语言为中文
-        )
-        
-        # 将结果转换为所需的格式，并插入空隙时间
+        target, workers = self.split_plan(chunk_seconds, workers)
+        key = engine_key(engine or self.engine, model_name or self.model_name)
+        audio = load_audio(audio_path, content_hash)
+        if target:
+            return self._transcribe_chunked(audio, target, workers, key, on_progress, on_segments, queue_timeout)
+        # 整段作为一个窗口排队转录
+        for _, result in scheduler.run(key, audio, [(0, len(audio))], timeout=queue_timeout):
+            pass
+        if on_progress is not None:
+            on_progress(1.0)
+        # 插入空隙时间
+        segments = _insert_gaps(result)
+        if on_segments is not None:
+            on_segments(segments)
+        return segments
+
+    def _transcribe_chunked(self, audio: np.ndarray, chunk_seconds: float, workers: int, key: str,
+                            on_progress: Optional[Callable[[float], None]] = None,
+                            on_segments: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+                            queue_timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        按静音切块转录，再把各块结果平移回全局时间轴；按块的时间顺序插入空隙并回调。
+        chunk_seconds 为 split_plan 给出的目标时长；单进程时各块作为窗口交给调度器
+        """
+        duration = len(audio) / SAMPLE_RATE
+        chunks = split_on_silences(duration, find_silences(audio), chunk_seconds)
+        print(f"[ASR] chunked transcribe: {len(chunks)} chunks, {workers} workers")
         segments = []
         last_end = None
-        for segment in result.segments:
-            # 插入空隙时间标注
-            if last_end is not None and segment.start > last_end:
-                gap_sec = segment.start - last_end
-                gap_sec_str = f"[{gap_sec:.3f} sec]"
-                segments.append({
-                    "start": last_end,
-                    "end": segment.start,
-                    "text": gap_sec_str,
-                    "words": [
-                        {
-                            "word": gap_sec_str,
-                            "start": last_end,
-                            "end": segment.start
-                        }
-                    ]
-                })
-            segments.append({
-                "start": segment.start,
-                "end": segment.end,
-                "text": segment.text,
-                "words": [
-                    {
-                        "word": word.word,
-                        "start": word.start,
-                        "end": word.end
-                    }
-                    for word in segment.words
-                ] if hasattr(segment, 'words') else []
-            })
-            last_end = segment.end
+
+        def collect(i, raw_segments):
+            nonlocal last_end
+            new_segments = _insert_gaps(raw_segments, last_end)
+            if raw_segments:
+                last_end = raw_segments[-1]["end"]
+            segments.extend(new_segments)
+            if on_segments is not None and new_segments:
+                on_segments(new_segments)
+            if on_progress is not None:
+                on_progress(chunks[i][1] / duration if duration else 1.0)
+
+        if workers <= 1:
+            # 各块作为窗口交给调度器，与其他请求的窗口轮流组批
+            spans = [(int(s * SAMPLE_RATE), int(e * SAMPLE_RATE)) for s, e in chunks]
+            for i, result in scheduler.run(key, audio, spans, timeout=queue_timeout):
+                collect(i, offset_segments(result, chunks[i][0]))
+        else:
+            pieces = [(np.array(audio[int(s * SAMPLE_RATE):int(e * SAMPLE_RATE)], dtype=np.float32), s) for s, e in chunks]
+            with self._pool_lock:
+                pool = self._get_pool(key, workers)
+                self._pool_busy += 1
+            try:
+                futures = [pool.submit(_transcribe_chunk, piece, offset) for piece, offset in pieces]
+                # 按块顺序取结果，保证流式输出的分段始终有序
+                for i, future in enumerate(futures):
+                    collect(i, future.result())
+                    self._pool_last_used = time.time()
+            finally:
+                with self._pool_lock:
+                    self._pool_busy -= 1
+                    self._pool_last_used = time.time()
         return segments
 
-# 创建全局 ASR 服务实例
-asr_service = ASRService() 
\ No newline at end of file
+# 创建全局 ASR 服务实例（不会立即加载模型）
+asr_service = ASRService()
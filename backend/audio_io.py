@@ -0,0 +1,122 @@
+"""
+音频读取模块：任意音视频容器只解码一次，经管道直接得到 16kHz 单声道 float32，
+可缓存为 .npy 供后续环节内存映射读取，不再生成大体积的临时 WAV
+"""
+import struct
+import tempfile
+import itertools
+import subprocess
+from typing import Iterator, Optional
+import numpy as np
+import config
+from disk_cache import DiskLRUCache, make_key, file_identity
+
+# ASR 输入统一为 16kHz 单声道
+SAMPLE_RATE = 16000
+# 管道读取/WAV 输出的块大小（字节）
+PIPE_CHUNK_SIZE = 1024 * 1024
+
+_pcm_cache = None
+
+
+def _get_pcm_cache() -> DiskLRUCache:
+    global _pcm_cache
+    if _pcm_cache is None:
+        _pcm_cache = DiskLRUCache(config.AUDIO_CACHE_DIR, config.AUDIO_CACHE_MAX_MB * 1024 * 1024, suffix=".npy")
+    return _pcm_cache
+
+
+def decode_audio(path: str, sr: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    用 ffmpeg 把任意音视频解码为单声道 float32 PCM，数据经 stdout 管道读入内存
+    """
+    cmd = ["ffmpeg", "-nostdin", "-v", "error", "-i", path, "-map", "0:a:0",
+           "-f", "f32le", "-ac", "1", "-ar", str(sr), "-"]
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if proc.returncode != 0:
+        raise RuntimeError(f"音频解码失败: {proc.stderr.decode('utf-8', errors='replace')[-1000:]}")
+    return np.frombuffer(proc.stdout, dtype=np.float32)
+
+
+def load_audio(path: str, content_hash: Optional[str] = None, sr: int = SAMPLE_RATE,
+               use_cache: bool = True) -> np.ndarray:
+    """
+    读取 16kHz 单声道音频。命中缓存时直接内存映射 .npy，不再解码。
+    :param content_hash: 文件内容哈希，作为缓存 key；为空时用 (路径, 大小, 修改时间)
+    :return: float32 数组（缓存命中时为只读 memmap）
+    """
+    if not use_cache:
+        return decode_audio(path, sr)
+    cache = _get_pcm_cache()
+    key = make_key("pcm", content_hash or file_identity(path), sr)
+    cached = cache.get(key)
+    if cached is not None:
+        return np.load(cached, mmap_mode="r")
+    audio = decode_audio(path, sr)
+    tmp_path = cache.temp_path_for(key)
+    with open(tmp_path, "wb") as f:
+        np.save(f, audio)
+    cached = cache.put_file(key, tmp_path)
+    return np.load(cached, mmap_mode="r")
+
+
+def wav_header(n_samples: int, sr: int, channels: int = 1, bits: int = 16) -> bytes:
+    byte_rate = sr * channels * bits // 8
+    data_size = n_samples * channels * bits // 8
+    return (b"RIFF" + struct.pack("<I", 36 + data_size) + b"WAVE"
+            + b"fmt " + struct.pack("<IHHIIHH", 16, 1, channels, sr, byte_rate, channels * bits // 8, bits)
+            + b"data" + struct.pack("<I", data_size))
+
+
+def iter_wav(audio: np.ndarray, sr: int = SAMPLE_RATE) -> Iterator[bytes]:
+    """
+    把单声道 float32 音频按块转成 16bit WAV 字节流，不在内存中拼出整个文件
+    """
+    yield wav_header(len(audio), sr)
+    step = PIPE_CHUNK_SIZE // 2
+    for i in range(0, len(audio), step):
+        block = np.clip(np.asarray(audio[i:i + step]), -1.0, 1.0)
+        yield (block * 32767).astype("<i2").tobytes()
+
+
+def iter_wav_ffmpeg(path: str, sr: Optional[int] = None) -> Iterator[bytes]:
+    """
+    保留原始声道、按指定采样率（默认原采样率）解码为 WAV，经管道边解码边输出。
+    ffmpeg 退出码非 0 时抛出 RuntimeError：响应会被中断，客户端不会把截断的文件当成完整结果
+    """
+    cmd = ["ffmpeg", "-nostdin", "-v", "error", "-i", path, "-map", "0:a:0", "-vn"]
+    if sr:
+        cmd += ["-ar", str(sr)]
+    cmd += ["-f", "wav", "-"]
+    # stderr 写到临时文件而不是管道，错误输出很多时也不会阻塞 ffmpeg
+    err = tempfile.TemporaryFile()
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=err)
+    try:
+        while True:
+            chunk = proc.stdout.read(PIPE_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+        if proc.wait() != 0:
+            err.seek(0)
+            raise RuntimeError(f"音频解码失败: {err.read().decode('utf-8', errors='replace')[-1000:]}")
+    finally:
+        proc.stdout.close()
+        # 客户端中途断开时生成器被关闭，结束仍在运行的 ffmpeg
+        if proc.poll() is None:
+            proc.kill()
+        proc.wait()
+        err.close()
+
+
+def open_wav_stream(path: str, sr: Optional[int] = None) -> Iterator[bytes]:
+    """
+    启动 iter_wav_ffmpeg 并先取出第一块数据：文件损坏、没有音轨等在开始输出前就失败的情况，
+    在返回响应之前抛出 RuntimeError，调用方可以返回错误状态码
+    """
+    stream = iter_wav_ffmpeg(path, sr)
+    try:
+        first = next(stream)
+    except StopIteration:
+        return iter(())
+    return itertools.chain([first], stream)
@@ -0,0 +1,127 @@
+"""
+规则自动粗剪：直接在 ASR 的词/停顿结果上给出建议删除的词，不请求大模型
+
+三条规则都是对列式词数组（WordStore）的向量化运算，按字符串表而不是逐词处理文字：
+- 停顿：时长超过 max_gap 的空隙分段（asr_service 在相邻语音段之间插入的 "[x sec]"，任意长度都会插入，不受 asr.PAUSE_THRESHOLD 限制）
+- 口头禅：文字（去掉标点后）在 fillers 中的词
+- 重复：紧邻重复的词或短语（最长 max_repeat 个词）删掉前面的一遍，只保留最后一遍；
+  单个字的叠词（"谢谢"、"看看"）中间没有明显停顿时不算重复
+"""
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+import numpy as np
+import config
+from align import normalize
+from word_store import WordStore, FLAG_GAP, is_gap_text
+
+# 删除原因，0 表示保留
+REASON_KEEP = 0
+REASON_GAP = 1
+REASON_FILLER = 2
+REASON_REPEAT = 3
+REASON_NAMES = ("keep", "gap", "filler", "repeat")
+# 单字重复之间至少有这么长的停顿（秒）才认为是口吃，而不是叠词
+REPEAT_MIN_PAUSE = 0.15
+
+
+def parse_fillers(fillers: Optional[Iterable[str]]) -> List[str]:
+    # 口头禅可以是列表或逗号分隔的字符串，为空时使用配置
+    if fillers is None:
+        fillers = config.AUTOCUT_FILLERS
+    if isinstance(fillers, str):
+        fillers = fillers.split(",")
+    return [f for f in (normalize(f) for f in fillers) if f]
+
+
+def find_cuts(word_text: np.ndarray, strings: Sequence[str], word_start: np.ndarray, word_end: np.ndarray,
+              gap_mask: np.ndarray, max_gap: Optional[float] = None, fillers: Optional[Iterable[str]] = None,
+              max_repeat: Optional[int] = None) -> np.ndarray:
+    """
+    :param word_text: 每个词在 strings 中的下标
+    :param gap_mask: 每个词是否为停顿
+    :return: 每个词的删除原因（REASON_*，uint8）
+    """
+    max_gap = config.AUTOCUT_MAX_GAP if max_gap is None else max_gap
+    max_repeat = config.AUTOCUT_MAX_REPEAT if max_repeat is None else max_repeat
+    filler_set = set(parse_fillers(fillers))
+    reasons = np.zeros(len(word_text), dtype=np.uint8)
+    if not len(word_text):
+        return reasons
+    word_text = np.asarray(word_text, dtype=np.int64)
+    word_start = np.asarray(word_start, dtype=np.float64)
+    word_end = np.asarray(word_end, dtype=np.float64)
+    gap_mask = np.asarray(gap_mask, dtype=bool)
+
+    # 字符串表上的逐项属性，再按下标广播到每个词
+    table: Dict[str, int] = {}
+    norm = [normalize(s) for s in strings]
+    canon = np.array([table.setdefault(s, len(table)) for s in norm], dtype=np.int64)
+    is_filler = np.array([s in filler_set for s in norm], dtype=bool)
+    single = np.array([len(s) == 1 for s in norm], dtype=bool)
+    has_text = np.array([bool(s) for s in norm], dtype=bool)
+
+    long_gap = gap_mask & (word_end - word_start > max_gap)
+    reasons[long_gap] = REASON_GAP
+    filler = ~gap_mask & is_filler[word_text]
+    reasons[filler] = REASON_FILLER
+
+    # 重复只在有文字的词之间比较，跳过停顿和口头禅，例如 "我们 嗯 我们"
+    seq = np.flatnonzero(~gap_mask & ~filler & has_text[word_text])
+    ids = canon[word_text[seq]]
+    repeat = np.zeros(len(word_text), dtype=bool)
+    n_seq = len(seq)
+    for n in range(1, max_repeat + 1):
+        m = n_seq - 2 * n + 1
+        if m <= 0:
+            break
+        # same[i]：ids[i:i+n] 与紧接着的 ids[i+n:i+2n] 相同
+        same = np.ones(m, dtype=bool)
+        for k in range(n):
+            same &= ids[k:k + m] == ids[n + k:n + k + m]
+        if n == 1:
+            first, second = seq[:m], seq[1:m + 1]
+            same &= ~single[word_text[first]] | (word_start[second] - word_end[first] >= REPEAT_MIN_PAUSE)
+        starts = np.flatnonzero(same)
+        for k in range(n):
+            repeat[seq[starts + k]] = True
+    reasons[repeat & (reasons == REASON_KEEP)] = REASON_REPEAT
+    return reasons
+
+
+def autocut_store(store: WordStore, **kwargs) -> np.ndarray:
+    """
+    对整份转录结果给出删除原因，参数同 find_cuts
+    """
+    return find_cuts(store.word_text, store.strings, store.word_start, store.word_end,
+                     (store.word_flags & FLAG_GAP) != 0, **kwargs)
+
+
+def autocut_words(words: List[Dict[str, Any]], **kwargs) -> List[int]:
+    """
+    桌面端的词列表 [{"word", "start", "end", "is_gap"}]（可以是删改过的），返回建议删除的下标（升序）
+    """
+    table: Dict[str, int] = {}
+    word_text = np.fromiter((table.setdefault(w["word"], len(table)) for w in words), dtype=np.int64,
+                            count=len(words))
+    word_start = np.fromiter((w["start"] for w in words), dtype=np.float64, count=len(words))
+    word_end = np.fromiter((w["end"] for w in words), dtype=np.float64, count=len(words))
+    strings = list(table)
+    gap_mask = np.array([is_gap_text(s) for s in strings], dtype=bool)[word_text]
+    reasons = find_cuts(word_text, strings, word_start, word_end, gap_mask, **kwargs)
+    return np.flatnonzero(reasons).tolist()
+
+
+def cut_list(store: WordStore, reasons: np.ndarray) -> List[Dict[str, Any]]:
+    """
+    把删除原因合并成编辑列表：原因相同的连续词为一项
+    [{"first": 首词下标, "last": 末词下标, "start": 秒, "end": 秒, "reason": "gap" | "filler" | "repeat"}]
+    """
+    idx = np.flatnonzero(reasons)
+    if not len(idx):
+        return []
+    # 下标不连续或原因变化处断开
+    breaks = np.flatnonzero((np.diff(idx) != 1) | (np.diff(reasons[idx]) != 0)) + 1
+    firsts = idx[np.concatenate(([0], breaks))]
+    lasts = idx[np.concatenate((breaks - 1, [len(idx) - 1]))]
+    return [{"first": f, "last": l, "start": s, "end": e, "reason": REASON_NAMES[r]}
+            for f, l, s, e, r in zip(firsts.tolist(), lasts.tolist(), store.word_start[firsts].tolist(),
+                                     store.word_end[lasts].tolist(), reasons[firsts].tolist())]
@@ -0,0 +1,85 @@
+"""
+后端配置，均可通过同名环境变量覆盖
+"""
+import os
+from disk_cache import DEFAULT_CACHE_ROOT
+
+# 默认 ASR 引擎：stable-ts / whisper / faster-whisper，请求中可以另行指定
+ASR_ENGINE = os.environ.get("ASR_ENGINE", "stable-ts")
+# 默认 ASR 模型，请求中可以另行指定
+ASR_MODEL = os.environ.get("ASR_MODEL", "large-v3")
+# asr.py 使用的 whisper 模型
+WHISPER_MODEL = os.environ.get("WHISPER_MODEL", "medium")
+# 允许请求指定的模型名称
+ASR_ALLOWED_MODELS = os.environ.get(
+    "ASR_ALLOWED_MODELS", "tiny,base,small,medium,large,large-v2,large-v3,turbo"
+).split(",")
+# faster-whisper（CTranslate2）的设备与量化类型，CPU 上 int8 速度最快
+FASTER_WHISPER_DEVICE = os.environ.get("FASTER_WHISPER_DEVICE", "auto")
+FASTER_WHISPER_COMPUTE_TYPE = os.environ.get("FASTER_WHISPER_COMPUTE_TYPE", "int8")
+# CPU 推理线程数，0 表示使用 CTranslate2 的默认值
+FASTER_WHISPER_CPU_THREADS = int(os.environ.get("FASTER_WHISPER_CPU_THREADS", "0"))
+# 服务启动时后台预热的模型，逗号分隔，可带引擎前缀（如 faster-whisper:medium），留空则首次请求时再加载
+ASR_WARMUP_MODELS = [m for m in os.environ.get("ASR_WARMUP_MODELS", "").split(",") if m]
+# 模型空闲多久（秒）后卸载释放内存，0 表示常驻
+MODEL_IDLE_TIMEOUT = float(os.environ.get("MODEL_IDLE_TIMEOUT", "1800"))
+
+# ASR 分块转录：按 VAD 检测到的静音切分音频，每块的目标时长（秒），0 表示不另外指定
+ASR_CHUNK_SECONDS = float(os.environ.get("ASR_CHUNK_SECONDS", "0"))
+# 分块转录的并行进程数，每个进程各自加载一份模型；大于 1 且 ASR_CHUNK_SECONDS 不为 0 时使用进程池
+ASR_WORKERS = int(os.environ.get("ASR_WORKERS", "1"))
+# 单进程转录按静音切成不超过该时长（秒）的窗口交给调度器，长文件不会独占推理线程，多个请求的窗口可以组批；
+# whisper 一次解码 30 秒音频，批量解码时超出的部分会被截断，不要设得更大。
+# 0（默认）表示 ASR_CHUNK_SECONDS 为 0 时整段解码，窗口边界不会切断上下文，识别结果与不经过调度器时相同
+ASR_WINDOW_SECONDS = float(os.environ.get("ASR_WINDOW_SECONDS", "0"))
+# 异步任务（/asr/jobs）的分块时长；整段转录无法边识别边输出分段，所以任务默认按块转录，0 表示整段转录
+ASR_JOB_CHUNK_SECONDS = float(os.environ.get("ASR_JOB_CHUNK_SECONDS", "30"))
+# 同时执行的异步转录任务数
+ASR_JOB_WORKERS = int(os.environ.get("ASR_JOB_WORKERS", "2"))
+# 推理调度：单进程转录的请求统一排队，由一个推理线程把多个请求的窗口轮流拼成批次执行
+ASR_BATCH_SIZE = int(os.environ.get("ASR_BATCH_SIZE", "4"))
+# 最多同时排队/执行的转录请求数
+ASR_QUEUE_MAX = int(os.environ.get("ASR_QUEUE_MAX", "16"))
+# 队列满时 /asr 最多等待多久（秒），超时返回 503
+ASR_QUEUE_TIMEOUT = float(os.environ.get("ASR_QUEUE_TIMEOUT", "30"))
+
+# /asr 转录结果缓存（按音频内容哈希 + 模型 + 参数），超出上限按 LRU 淘汰
+TRANSCRIPT_CACHE_DIR = os.environ.get("TRANSCRIPT_CACHE_DIR", os.path.join(DEFAULT_CACHE_ROOT, "transcripts"))
+TRANSCRIPT_CACHE_MAX_MB = int(os.environ.get("TRANSCRIPT_CACHE_MAX_MB", "512"))
+# 解码后的 16kHz 单声道 PCM 缓存（.npy，可内存映射），按内容哈希复用
+AUDIO_CACHE_DIR = os.environ.get("AUDIO_CACHE_DIR", os.path.join(DEFAULT_CACHE_ROOT, "pcm"))
+AUDIO_CACHE_MAX_MB = int(os.environ.get("AUDIO_CACHE_MAX_MB", "2048"))
+
+# 单个上传文件（multipart 或分块上传）的大小上限（MB），超出时返回 413，0 表示不限
+UPLOAD_MAX_MB = int(os.environ.get("UPLOAD_MAX_MB", "20480"))
+
+# 本机直读模式：后端与桌面端在同一台机器时，客户端可以直接传文件路径而不上传文件。
+# 只允许读取这些目录（os.pathsep 分隔）下的文件，留空表示关闭该模式
+LOCAL_PATH_ROOTS = [p for p in os.environ.get("LOCAL_PATH_ROOTS", "").split(os.pathsep) if p]
+
+# LLM 文字优化（分窗口模式）：每个窗口的词数、与相邻窗口重叠的上下文词数
+LLM_WINDOW_ITEMS = int(os.environ.get("LLM_WINDOW_ITEMS", "300"))
+LLM_WINDOW_OVERLAP = int(os.environ.get("LLM_WINDOW_OVERLAP", "30"))
+# 同时发出的请求数、每秒最多发出的请求数（0 表示不限）
+LLM_CONCURRENCY = int(os.environ.get("LLM_CONCURRENCY", "4"))
+LLM_RATE_LIMIT = float(os.environ.get("LLM_RATE_LIMIT", "2"))
+# 回复保留的文字条目（不计停顿）少于窗口核心的该比例时视为异常回复（空数组、被截断等）并重试，
+# 重试后仍然如此时该窗口保留原文不删；0 表示不检查
+LLM_MIN_KEEP_RATIO = float(os.environ.get("LLM_MIN_KEEP_RATIO", "0.2"))
+# 单个窗口失败后的重试次数，单次请求超时（秒）
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", "3"))
+LLM_TIMEOUT = float(os.environ.get("LLM_TIMEOUT", "120"))
+# LLM 窗口结果缓存：按窗口内容 + 模型 + 接口地址 + 提示词版本，超过 TTL（秒）视为失效，超出上限按 LRU 淘汰
+LLM_CACHE_DIR = os.environ.get("LLM_CACHE_DIR", os.path.join(DEFAULT_CACHE_ROOT, "llm"))
+LLM_CACHE_MAX_MB = int(os.environ.get("LLM_CACHE_MAX_MB", "64"))
+LLM_CACHE_TTL = float(os.environ.get("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+# optimize_transcript 使用的默认接口（桌面端从 config.json 读取，不使用这些值）
+LLM_API_KEY = os.environ.get("LLM_API_KEY", "")
+LLM_MODEL = os.environ.get("LLM_MODEL", "gpt-4o-mini")
+LLM_BASE_URL = os.environ.get("LLM_BASE_URL", "https://api.openai.com/v1")
+
+# 规则自动粗剪（/autocut）：删除时长超过 AUTOCUT_MAX_GAP 秒的停顿、口头禅（逗号分隔），
+# 以及紧邻重复的词或短语（最长 AUTOCUT_MAX_REPEAT 个词，0 表示不检查重复）
+AUTOCUT_MAX_GAP = float(os.environ.get("AUTOCUT_MAX_GAP", "0.5"))
+AUTOCUT_FILLERS = os.environ.get("AUTOCUT_FILLERS", "嗯,啊,呃,额,那个,就是")
+AUTOCUT_MAX_REPEAT = int(os.environ.get("AUTOCUT_MAX_REPEAT", "3"))
@@ -0,0 +1,139 @@
+"""
+磁盘LRU缓存模块
+
+每个缓存条目是缓存目录下的一个文件，文件名由 key 的哈希决定。
+命中时刷新文件的 mtime，总大小超过上限时按 mtime 从旧到新淘汰。
+"""
+import os
+import json
+import hashlib
+import threading
+from typing import Any, Optional, Iterable
+
+DEFAULT_CACHE_ROOT = os.environ.get("AIVIDEOCUT_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".aivideocut", "cache"))
+
+
+def make_key(*parts: Any) -> str:
+    """
+    把任意可 JSON 序列化的参数组合成稳定的缓存 key。
+    """
+    raw = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def file_identity(path: str) -> list:
+    """
+    源文件身份：绝对路径 + 大小 + 修改时间，文件被替换或修改后自动失效。
+    """
+    st = os.stat(path)
+    return [os.path.abspath(path), st.st_size, st.st_mtime_ns]
+
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """
+    分块计算文件内容的 sha256，内存占用与文件大小无关
+    """
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class DiskLRUCache:
+    def __init__(self, cache_dir: str, max_bytes: int, suffix: str = ""):
+        """
+        :param cache_dir: 缓存目录，不存在时自动创建
+        :param max_bytes: 缓存总大小上限（字节）
+        :param suffix: 缓存文件扩展名，如 ".mp4"
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + self.suffix)
+
+    def temp_path_for(self, key: str) -> str:
+        # 写入中的文件带 .part 后缀，不会被当作命中
+        return self.path_for(key) + f".{os.getpid()}.{threading.get_ident()}.part"
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        命中时返回缓存文件路径并刷新其访问时间，未命中返回 None。
+        """
+        path = self.path_for(key)
+        try:
+            os.utime(path, None)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put_file(self, key: str, src_path: str, evict: bool = True) -> str:
+        """
+        把已写好的文件移动进缓存，返回缓存文件路径。
+        批量写入时可以传 evict=False，等全部用完后再调用 evict()，避免刚写入的条目被淘汰。
+        """
+        path = self.path_for(key)
+        os.replace(src_path, path)
+        if evict:
+            self.evict()
+        return path
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        path = self.get(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put_bytes(self, key: str, data: bytes) -> str:
+        tmp_path = self.temp_path_for(key)
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        return self.put_file(key, tmp_path)
+
+    def _entries(self) -> Iterable[os.DirEntry]:
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.is_file() and not entry.name.endswith(".part"):
+                    yield entry
+
+    def size(self) -> int:
+        return sum(entry.stat().st_size for entry in self._entries())
+
+    def evict(self):
+        """
+        按 LRU 淘汰，直到总大小不超过上限。
+        """
+        with self._lock:
+            entries = []
+            total = 0
+            for entry in self._entries():
+                st = entry.stat()
+                entries.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+            if total <= self.max_bytes:
+                return
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except FileNotFoundError:
+                    pass
+
+    def clear(self):
+        with self._lock:
+            for entry in list(self._entries()):
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
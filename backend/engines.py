@@ -0,0 +1,235 @@
+"""
+ASR 引擎：统一的加载/转录接口和输出格式，stable-ts、openai-whisper、faster-whisper 可按请求切换。
+所有引擎的转录结果都是分段列表（时间相对于输入音频开头）：
+[{"start": float, "end": float, "text": str, "words": [{"word": str, "start": float, "end": float}]}]
+"""
+import importlib.util
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import config
+from model_registry import ModelRegistry
+from audio_io import SAMPLE_RATE
+
+# whisper 一次解码 30 秒音频，批量解码时更长的窗口会被截断
+BATCH_MAX_SECONDS = 30.0
+
+
+def offset_segments(segments: List[Dict[str, Any]], offset: float) -> List[Dict[str, Any]]:
+    """
+    把分段及其中词的时间整体平移 offset 秒（分块转录时映射回全局时间轴）
+    """
+    if not offset:
+        return segments
+    return [
+        {
+            **segment,
+            "start": segment["start"] + offset,
+            "end": segment["end"] + offset,
+            "words": [{**word, "start": word["start"] + offset, "end": word["end"] + offset}
+                      for word in segment["words"]],
+        }
+        for segment in segments
+    ]
+
+
+class ASREngine:
+    """
+    引擎基类。子类实现 load 和 transcribe，transcribe 接收 16kHz 单声道 float32 数组
+    """
+    name = ""
+    # 需要导入的 Python 包，用于判断引擎在当前环境是否可用
+    package = ""
+    # 转录参数，参与转录结果缓存的 key
+    options: Dict[str, Any] = {}
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self.model = self.load(model_name)
+
+    @classmethod
+    def available(cls) -> bool:
+        return importlib.util.find_spec(cls.package) is not None
+
+    def load(self, model_name: str) -> Any:
+        raise NotImplementedError
+
+    def transcribe(self, audio: np.ndarray) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def transcribe_batch(self, pieces: List[np.ndarray]) -> List[List[Dict[str, Any]]]:
+        """
+        转录多个音频窗口，默认逐个执行；支持批量解码的引擎可以覆盖
+        """
+        return [self.transcribe(piece) for piece in pieces]
+
+
+class StableWhisperEngine(ASREngine):
+    name = "stable-ts"
+    package = "stable_whisper"
+    options = dict(
+        vad=True,  # 使用 VAD 进行语音检测
+        word_timestamps=True,  # 启用词级别时间戳
+        language="zh",  # 设置语言为中文
+    )
+
+    def load(self, model_name: str):
+        # 延迟导入：import stable_whisper 会连带加载 torch，放到真正需要模型时再做
+        import stable_whisper
+        return stable_whisper.load_model(model_name)
+
+    def transcribe(self, audio: np.ndarray) -> List[Dict[str, Any]]:
+        result = self.model.transcribe(audio, **self.options)
+        return [
+            {
+                "start": segment.start,
+                "end": segment.end,
+                "text": segment.text,
+                "words": [
+                    {"word": word.word, "start": word.start, "end": word.end}
+                    for word in segment.words
+                ] if hasattr(segment, 'words') else []
+            }
+            for segment in result.segments
+        ]
+
+
+class WhisperEngine(ASREngine):
+    name = "whisper"
+    package = "whisper"
+    options = dict(
+        word_timestamps=True,
+        verbose=None,
+        language="zh",
+        condition_on_previous_text=False,
+    )
+
+    def load(self, model_name: str):
+        import whisper
+        return whisper.load_model(model_name)
+
+    def transcribe(self, audio: np.ndarray) -> List[Dict[str, Any]]:
+        result = self.model.transcribe(audio, **self.options)
+        return [
+            {
+                "start": seg["start"],
+                "end": seg["end"],
+                "text": seg["text"],
+                "words": [
+                    {"word": word["word"], "start": word["start"], "end": word["end"]}
+                    for word in seg.get("words", [])
+                ]
+            }
+            for seg in result.get("segments", [])
+        ]
+
+
+class FasterWhisperEngine(ASREngine):
+    """
+    CTranslate2 推理的 whisper，CPU 上默认 int8 量化，吞吐明显高于 PyTorch 实现
+    """
+    name = "faster-whisper"
+    package = "faster_whisper"
+    options = dict(
+        word_timestamps=True,
+        language="zh",
+        vad_filter=True,
+        beam_size=5,
+        condition_on_previous_text=False,
+    )
+    # 批量解码管线，首次批量转录时基于已加载的模型创建
+    _pipeline = None
+
+    def load(self, model_name: str):
+        from faster_whisper import WhisperModel
+        return WhisperModel(
+            model_name,
+            device=config.FASTER_WHISPER_DEVICE,
+            compute_type=config.FASTER_WHISPER_COMPUTE_TYPE,
+            cpu_threads=config.FASTER_WHISPER_CPU_THREADS,
+        )
+
+    @staticmethod
+    def _segment_dicts(segments) -> List[Dict[str, Any]]:
+        return [
+            {
+                "start": seg.start,
+                "end": seg.end,
+                "text": seg.text,
+                "words": [
+                    {"word": word.word, "start": word.start, "end": word.end}
+                    for word in (seg.words or [])
+                ]
+            }
+            for seg in segments
+        ]
+
+    def transcribe(self, audio: np.ndarray) -> List[Dict[str, Any]]:
+        # 返回的是生成器，迭代时才真正解码
+        segments, _ = self.model.transcribe(audio, **self.options)
+        return self._segment_dicts(segments)
+
+    def transcribe_batch(self, pieces: List[np.ndarray]) -> List[List[Dict[str, Any]]]:
+        """
+        多个窗口拼接后交给 BatchedInferencePipeline，每个窗口作为一个 clip，一次前向解码整批。
+        按 ASR_WINDOW_SECONDS 切出的窗口不超过 30 秒，因此不再需要 VAD；结果按起点归回各窗口并平移到窗口内时间。
+        超过 30 秒的窗口（整段转录）批量解码会被截断，单独转录
+        """
+        long = [i for i, piece in enumerate(pieces) if len(piece) > BATCH_MAX_SECONDS * SAMPLE_RATE]
+        if long:
+            short = [i for i in range(len(pieces)) if i not in long]
+            results = dict(zip(short, self.transcribe_batch([pieces[i] for i in short]) if short else []))
+            results.update((i, self.transcribe(pieces[i])) for i in long)
+            return [results[i] for i in range(len(pieces))]
+        if len(pieces) <= 1:
+            return [self.transcribe(piece) for piece in pieces]
+        from faster_whisper import BatchedInferencePipeline
+        if self._pipeline is None:
+            self._pipeline = BatchedInferencePipeline(model=self.model)
+        offsets = np.cumsum([0] + [len(piece) for piece in pieces])
+        clips = [{"start": float(offsets[i]) / SAMPLE_RATE, "end": float(offsets[i + 1]) / SAMPLE_RATE}
+                 for i in range(len(pieces))]
+        options = {k: v for k, v in self.options.items()
+                   if k not in ("vad_filter", "condition_on_previous_text")}
+        segments, _ = self._pipeline.transcribe(np.concatenate(pieces), clip_timestamps=clips,
+                                                batch_size=len(pieces), **options)
+        results: List[List[Dict[str, Any]]] = [[] for _ in pieces]
+        for segment in self._segment_dicts(segments):
+            index = int(np.searchsorted(offsets, segment["start"] * SAMPLE_RATE, side="right")) - 1
+            index = min(max(index, 0), len(pieces) - 1)
+            results[index].append(segment)
+        return [offset_segments(result, -float(offsets[i]) / SAMPLE_RATE)
+                for i, result in enumerate(results)]
+
+
+ENGINES = {cls.name: cls for cls in (StableWhisperEngine, WhisperEngine, FasterWhisperEngine)}
+
+
+def engine_key(engine: Optional[str] = None, model_name: Optional[str] = None) -> str:
+    """
+    注册表中的模型名：引擎:模型，例如 faster-whisper:medium
+    """
+    return f"{engine or config.ASR_ENGINE}:{model_name or config.ASR_MODEL}"
+
+
+def parse_engine_key(key: str) -> Tuple[str, str]:
+    # 不带引擎前缀时使用默认引擎，兼容 ASR_WARMUP_MODELS=large-v3 这样的旧写法
+    engine, sep, model_name = key.partition(":")
+    if not sep:
+        return config.ASR_ENGINE, key
+    return engine, model_name
+
+
+def create_engine(key: str) -> ASREngine:
+    engine, model_name = parse_engine_key(key)
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown ASR engine: {engine}")
+    return ENGINES[engine](model_name)
+
+
+def engines_info() -> Dict[str, bool]:
+    # 各引擎在当前环境是否已安装
+    return {name: cls.available() for name, cls in ENGINES.items()}
+
+
+# 进程内共享的引擎注册表，按 引擎:模型 懒加载，空闲超时后卸载
+engine_registry = ModelRegistry(create_engine, idle_timeout=config.MODEL_IDLE_TIMEOUT)
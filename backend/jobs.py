@@ -0,0 +1,143 @@
+"""
+异步 ASR 任务：提交后立即返回任务 id，后台转录，可查询进度并流式获取已识别的分段
+"""
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+
+class ASRJob:
+    def __init__(self, filename: str):
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        self.status = "queued"  # queued / running / done / error
+        self.progress = 0.0  # 0 ~ 100
+        self.segments: List[Dict[str, Any]] = []
+        self.result: Optional[List[Dict[str, Any]]] = None
+        self.error: Optional[str] = None
+        self.cache = "miss"
+        self.created = time.time()
+        self.updated = self.created
+        self._cond = threading.Condition()
+
+    def _touch(self):
+        self.updated = time.time()
+        self._cond.notify_all()
+
+    def set_running(self):
+        with self._cond:
+            self.status = "running"
+            self._touch()
+
+    def set_progress(self, fraction: float):
+        with self._cond:
+            self.progress = round(min(max(fraction, 0.0), 1.0) * 100, 1)
+            self._touch()
+
+    def add_segments(self, segments: List[Dict[str, Any]]):
+        with self._cond:
+            self.segments.extend(segments)
+            self._touch()
+
+    def finish(self, result: List[Dict[str, Any]]):
+        with self._cond:
+            # 最终结果以完整列表为准，流式阶段未发出的分段在这里补齐
+            self.segments = list(result)
+            self.result = result
+            self.progress = 100.0
+            self.status = "done"
+            self._touch()
+
+    def fail(self, error: str):
+        with self._cond:
+            self.error = error
+            self.status = "error"
+            self._touch()
+
+    def info(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "job_id": self.id,
+                "filename": self.filename,
+                "status": self.status,
+                "progress": self.progress,
+                "segments": len(self.segments),
+                "cache": self.cache,
+                "error": self.error,
+            }
+
+    def events(self, poll_timeout: float = 15.0) -> Iterator[Dict[str, Any]]:
+        """
+        按顺序产出事件：已识别的分段、进度变化，最后是 done 或 error。
+        从头开始重放，客户端断线重连后可以拿到完整结果。
+        """
+        sent = 0
+        last_progress = None
+        while True:
+            with self._cond:
+                if sent >= len(self.segments) and self.progress == last_progress and self.status in ("queued", "running"):
+                    self._cond.wait(poll_timeout)
+                new_segments = self.segments[sent:]
+                sent = len(self.segments)
+                progress, status, error = self.progress, self.status, self.error
+            for segment in new_segments:
+                yield {"type": "segment", "segment": segment}
+            progress_changed = progress != last_progress
+            if progress_changed:
+                last_progress = progress
+                yield {"type": "progress", "progress": progress}
+            if status == "done":
+                yield {"type": "done", "segments": sent}
+                return
+            if status == "error":
+                yield {"type": "error", "error": error}
+                return
+            if not new_segments and not progress_changed:
+                # 长时间无更新时发送心跳，防止代理断开空闲连接
+                yield {"type": "heartbeat"}
+
+
+class JobManager:
+    def __init__(self, max_workers: int = 1, ttl: float = 3600):
+        """
+        :param max_workers: 同时执行的转录任务数
+        :param ttl: 结束的任务保留多久（秒）后清理
+        """
+        self.ttl = ttl
+        self._jobs: Dict[str, ASRJob] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def submit(self, filename: str, fn: Callable[[ASRJob], List[Dict[str, Any]]]) -> ASRJob:
+        """
+        提交任务，fn(job) 在后台线程执行并返回最终分段列表
+        """
+        self._cleanup()
+        job = ASRJob(filename)
+        with self._lock:
+            self._jobs[job.id] = job
+
+        def run():
+            job.set_running()
+            try:
+                job.finish(fn(job))
+            except Exception as e:
+                print(f"[Jobs] job {job.id} failed: {e}")
+                job.fail(str(e))
+
+        self._executor.submit(run)
+        return job
+
+    def get(self, job_id: str) -> Optional[ASRJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _cleanup(self):
+        now = time.time()
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.status in ("done", "error") and now - job.updated > self.ttl]
+            for job_id in expired:
+                del self._jobs[job_id]
@@ -1,12 +1,265 @@
 """
 LLM文字优化模块
+
+分窗口模式：把词列表按句子边界切成带重叠上下文的窗口，多个窗口通过共享连接池的客户端并发请求，
+模型只返回应保留条目的编号，最后按窗口拼回全局下标。
+每个窗口的结果按内容缓存在磁盘上，小改动后重新优化只需请求变化的窗口。
 """
-from typing import List
+import re
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, List, Optional, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+import config
+from disk_cache import DiskLRUCache, make_key
+from word_store import is_gap_text
+
+# 提示词版本：修改 build_prompt 或回复格式后加一，旧的缓存结果随之失效
+PROMPT_VERSION = 1
+
+_llm_cache = None
+
+
+def _get_llm_cache() -> DiskLRUCache:
+    global _llm_cache
+    if _llm_cache is None:
+        _llm_cache = DiskLRUCache(config.LLM_CACHE_DIR, config.LLM_CACHE_MAX_MB * 1024 * 1024, suffix=".json")
+    return _llm_cache
 
-def optimize_transcript(text: str) -> str:
+
+def optimize_transcript(text: str, api_key: str = None, model: str = None, base_url: str = None) -> str:
     """
     调用LLM对文字稿进行优化，只做删减，不做添加或改写。
-    返回优化后的文字稿。
+    逐字作为条目走分窗口优化（带缓存），返回优化后的文字稿。
+    """
+    keep = optimize_words([{"word": c} for c in text], api_key or config.LLM_API_KEY,
+                          model or config.LLM_MODEL, base_url or config.LLM_BASE_URL)
+    return "".join(text[i] for i in keep)
+
+
+def split_windows(texts: List[str], size: int, overlap: int) -> List[Tuple[int, int, int, int]]:
+    """
+    把词列表切成窗口，返回 [(上下文起点, 核心起点, 核心终点, 上下文终点), ...]。
+    核心区间互不重叠且覆盖全部词，尽量在窗口后半段最后一个停顿处切开，保持句子完整；
+    前后各带 overlap 个词作为上下文，上下文部分的判断不采用
+    """
+    n = len(texts)
+    size = max(size, 1)
+    windows = []
+    a = 0
+    while a < n:
+        b = min(a + size, n)
+        if b < n:
+            for i in range(b - 1, a + size // 2, -1):
+                if is_gap_text(texts[i]):
+                    b = i + 1
+                    break
+        windows.append((max(0, a - overlap), a, b, min(n, b + overlap)))
+        a = b
+    return windows
+
+
+def build_prompt(items: List[str], core: Tuple[int, int]) -> str:
+    lines = "\n".join(f"{i}\t{w}" for i, w in enumerate(items))
+    return (
+        "你是一个视频剪辑助手。下面是口播ASR识别结果，每行一个条目：编号<TAB>文字（单字、词组或形如[0.350 sec]的停顿）。\n"
+        "你的任务：删除口头禅、重复、说错后重说的部分和多余的停顿，让保留下来的条目按原顺序连起来通顺简洁。"
+        "每个条目只能整体保留或整体删除，不能修改、合并、拆分或调整顺序。\n"
+        f"只需判断编号 {core[0]} 到 {core[1] - 1} 的条目，其余条目只是上下文。\n"
+        "请只返回应保留条目的编号组成的JSON数组，例如 [0,1,2,5]，不要有多余解释。\n"
+        "条目：\n" + lines
+    )
+
+
+def min_keep(items: List[str]) -> int:
+    # 一个窗口核心区间的回复至少应保留的条目数，停顿可以全部删掉，不计入
+    return int(sum(not is_gap_text(t) for t in items) * config.LLM_MIN_KEEP_RATIO)
+
+
+def parse_indices(text: str, lo: int, hi: int) -> List[int]:
+    """
+    从模型回复中取出编号数组，只保留 [lo, hi) 内的编号；找不到数组时抛出 ValueError 以便重试
+    """
+    match = re.search(r"\[[\d\s,]*\]", text)
+    if not match:
+        raise ValueError(f"no index array in LLM reply: {text[:200]}")
+    return sorted({i for i in json.loads(match.group(0)) if lo <= i < hi})
+
+
+class RateLimiter:
+    """
+    多线程共享的限速器：相邻两次放行至少间隔 1/rate 秒
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            t = max(now, self._next)
+            self._next = t + self.interval
+        if t > now:
+            time.sleep(t - now)
+
+
+class LLMClient:
+    """
+    OpenAI 兼容的 chat/completions 接口，连接池在各窗口的请求间复用，可多线程共享
+    """
+
+    def __init__(self, api_key: str, model: str, base_url: str, concurrency: int = None,
+                 rate_limit: float = None, max_retries: int = None, timeout: float = None):
+        self.api_key = api_key
+        self.model = model
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = concurrency or config.LLM_CONCURRENCY
+        self.max_retries = config.LLM_MAX_RETRIES if max_retries is None else max_retries
+        self.timeout = timeout or config.LLM_TIMEOUT
+        self.limiter = RateLimiter(config.LLM_RATE_LIMIT if rate_limit is None else rate_limit)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def close(self):
+        self.session.close()
+
+    def chat(self, prompt: str) -> str:
+        self.limiter.wait()
+        resp = self.session.post(
+            self.base_url + "/chat/completions",
+            json={
+                "model": self.model,
+                "messages": [
+                    {"role": "system", "content": "You are a helpful assistant."},
+                    {"role": "user", "content": prompt},
+                ],
+                "temperature": 0,
+                "stream": False,
+            },
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            timeout=self.timeout,
+        )
+        resp.raise_for_status()
+        return resp.json()["choices"][0]["message"]["content"].strip()
+
+    def optimize_window(self, items: List[str], core: Tuple[int, int]) -> Optional[List[int]]:
+        """
+        请求一个窗口，返回核心区间内应保留条目的窗口内编号。
+        网络错误、限流（429）、服务端错误和无法解析的回复按指数退避重试，其他 4xx 直接失败。
+        保留条目少于 min_keep 的回复（如空数组）同样重试，最后一次仍然如此时返回 None，由调用方保留原文
+        """
+        prompt = build_prompt(items, core)
+        least = min_keep(items[core[0]:core[1]])
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(min(0.5 * 2 ** attempt, 10.0))
+            short = False
+            try:
+                keep = parse_indices(self.chat(prompt), *core)
+                if len(keep) >= least:
+                    return keep
+                short = True
+                last_error = ValueError(f"reply keeps only {len(keep)} of {core[1] - core[0]} items")
+            except requests.HTTPError as e:
+                status = e.response.status_code if e.response is not None else 0
+                if 400 <= status < 500 and status != 429:
+                    raise
+                last_error = e
+            except (requests.RequestException, ValueError, KeyError, IndexError) as e:
+                last_error = e
+            print(f"[LLM] window {core} attempt {attempt + 1} failed: {last_error}")
+        if short:
+            print(f"[LLM] window {core} keeps too few items after retries, leaving it unchanged")
+            return None
+        raise RuntimeError(f"LLM请求失败（已重试{self.max_retries}次）: {last_error}")
+
+
+def window_cache_key(texts: List[str], model: str, base_url: str) -> str:
+    # 只按核心区间的内容计算，相邻窗口的改动只影响上下文，不会让本窗口失效
+    return make_key("llm-window", PROMPT_VERSION, model, base_url.rstrip("/"), texts)
+
+
+def _cache_load(cache: DiskLRUCache, key: str) -> Optional[List[int]]:
+    data = cache.get_bytes(key)
+    if data is None:
+        return None
+    # 损坏或旧格式的条目按未命中处理，重新请求后会被覆盖
+    try:
+        entry = json.loads(data)
+        if config.LLM_CACHE_TTL > 0 and time.time() - entry["created"] > config.LLM_CACHE_TTL:
+            return None
+        return [int(i) for i in entry["keep"]]
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+def optimize_words(words: List[dict], api_key: str, model: str, base_url: str,
+                   window_items: int = None, overlap: int = None, concurrency: int = None,
+                   rate_limit: float = None, max_retries: int = None,
+                   on_progress: Optional[Callable[[int, int], None]] = None,
+                   use_cache: bool = True, cache: Optional[DiskLRUCache] = None) -> List[int]:
+    """
+    分窗口并发优化，返回应保留的词在 words 中的下标（升序）。
+    已缓存的窗口直接使用缓存结果，只请求未命中的窗口；cache 为空时使用默认的 LLM 缓存。
+    on_progress(已完成窗口数, 窗口总数) 在调用线程中回调，可以直接更新界面
     """
-    # TODO: 调用OpenAI等LLM接口实现
-    pass 
\ No newline at end of file
+    texts = [w["word"] for w in words]
+    windows = split_windows(texts, window_items or config.LLM_WINDOW_ITEMS,
+                            config.LLM_WINDOW_OVERLAP if overlap is None else overlap)
+    cache = (cache or _get_llm_cache()) if use_cache else None
+    keep = []
+    pending = []
+    for lo, c0, c1, hi in windows:
+        key = window_cache_key(texts[c0:c1], model, base_url) if cache is not None else None
+        # 缓存中保存的是相对核心区间起点的编号
+        cached = _cache_load(cache, key) if cache is not None else None
+        if cached is not None:
+            keep.extend(c0 + i for i in cached)
+        else:
+            pending.append((lo, c0, c1, hi, key))
+    done = len(windows) - len(pending)
+    if on_progress is not None and done:
+        on_progress(done, len(windows))
+    if pending:
+        client = LLMClient(api_key, model, base_url, concurrency, rate_limit, max_retries)
+        try:
+            with ThreadPoolExecutor(max_workers=client.concurrency) as pool:
+                futures = {
+                    pool.submit(client.optimize_window, texts[lo:hi], (c0 - lo, c1 - lo)): (lo, c0, c1, key)
+                    for lo, c0, c1, hi, key in pending
+                }
+                try:
+                    for future in as_completed(futures):
+                        lo, c0, c1, key = futures[future]
+                        indices = future.result()
+                        if indices is None:
+                            # 回复删得过多，保留该窗口的原文，不写缓存，下次重新请求
+                            keep.extend(range(c0, c1))
+                        else:
+                            result = [lo + i for i in indices]
+                            keep.extend(result)
+                            if cache is not None:
+                                entry = {"created": time.time(), "keep": [i - c0 for i in result]}
+                                cache.put_bytes(key, json.dumps(entry).encode("utf-8"))
+                        done += 1
+                        if on_progress is not None:
+                            on_progress(done, len(windows))
+                except BaseException:
+                    for future in futures:
+                        future.cancel()
+                    raise
+        finally:
+            client.close()
+    print(f"[LLM] {len(windows)} windows ({len(windows) - len(pending)} cached), "
+          f"kept {len(keep)}/{len(texts)} words")
+    return sorted(keep)
@@ -1,14 +1,32 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, BackgroundTasks, Request
+from fastapi.responses import JSONResponse, FileResponse, Response, StreamingResponse
 import os
-import tempfile
-from asr_service import asr_service
+import json
+import queue
+import threading
+from typing import Optional
+import config
+from asr_service import asr_service, model_registry, scheduler
+from engines import ENGINES, engines_info
+from disk_cache import DiskLRUCache
+from jobs import JobManager
+from uploads import UploadManager, UploadTooLarge, save_upload, resolve_local_path, local_file_sha256
 import traceback
 from fastapi.middleware.cors import CORSMiddleware
-from moviepy.editor import VideoFileClip
+from audio_io import SAMPLE_RATE, load_audio, iter_wav, open_wav_stream
+from word_store import WordStore, BINARY_MEDIA_TYPE
+from autocut import autocut_store, cut_list
 
 app = FastAPI()
 
+# 转录结果缓存：同一份音频重复上传时直接返回
+transcript_cache = DiskLRUCache(config.TRANSCRIPT_CACHE_DIR, config.TRANSCRIPT_CACHE_MAX_MB * 1024 * 1024, suffix=".json")
+# 异步转录任务
+job_manager = JobManager(max_workers=config.ASR_JOB_WORKERS)
+# 可续传的分块上传会话
+UPLOAD_MAX_BYTES = config.UPLOAD_MAX_MB * 1024 * 1024 or None
+upload_manager = UploadManager(max_size=UPLOAD_MAX_BYTES)
+
 # 添加CORS中间件，允许所有来源跨域访问
 app.add_middleware(
     CORSMiddleware,
@@ -16,50 +34,319 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-ASR-Cache"],
 )
 
+@app.on_event("startup")
+def warmup_models():
+    # 模型在后台线程预热，不阻塞服务启动；空闲模型定期卸载
+    asr_service.start_reaper()
+    if config.ASR_WARMUP_MODELS:
+        threading.Thread(target=asr_service.warmup, args=(config.ASR_WARMUP_MODELS,), daemon=True).start()
+
 @app.get("/ping")
 def ping():
     return {"message": "pong"}
 
+@app.get("/models")
+def list_models():
+    return {
+        "default": asr_service.model_name,
+        "default_engine": asr_service.engine,
+        "allowed": config.ASR_ALLOWED_MODELS,
+        # 引擎名称 -> 当前环境是否已安装
+        "engines": engines_info(),
+        "loaded": model_registry.loaded(),
+    }
+
+@app.post("/models/warmup")
+def warmup_model(model: Optional[str] = Form(None), engine: Optional[str] = Form(None)):
+    model_name = check_model_name(model)
+    engine_name = check_engine(engine)
+    threading.Thread(target=asr_service.warmup, args=([f"{engine_name}:{model_name}"],), daemon=True).start()
+    return {"model": model_name, "engine": engine_name, "status": "loading"}
+
+def check_model_name(model: Optional[str]) -> str:
+    model_name = model or asr_service.model_name
+    if model_name not in config.ASR_ALLOWED_MODELS:
+        raise HTTPException(status_code=400, detail=f"Unsupported model: {model_name}")
+    return model_name
+
+def check_engine(engine: Optional[str]) -> str:
+    engine_name = engine or asr_service.engine
+    if engine_name not in ENGINES:
+        raise HTTPException(status_code=400, detail=f"Unsupported engine: {engine_name}")
+    if not ENGINES[engine_name].available():
+        raise HTTPException(status_code=400, detail=f"Engine not installed: {engine_name}")
+    return engine_name
+
+def check_format(fmt: Optional[str]) -> str:
+    # 转录结果格式：json（默认）或 binary（列式 WordStore 编码，长转录体积和解析时间都小得多）
+    fmt = fmt or "json"
+    if fmt not in ("json", "binary"):
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {fmt}")
+    return fmt
+
+def transcript_response(result, cache_status: str, fmt: str) -> Response:
+    headers = {"X-ASR-Cache": cache_status}
+    if fmt == "binary":
+        return Response(content=WordStore.from_segments(result).to_bytes(), media_type=BINARY_MEDIA_TYPE,
+                        headers=headers)
+    return JSONResponse(content={"result": result}, headers=headers)
+
+def receive_input(file: Optional[UploadFile], upload_id: Optional[str], path: Optional[str], tag: str):
+    """
+    取得待处理的文件，三选一：
+    - path：本机直读，文件必须位于 LOCAL_PATH_ROOTS 内，不复制
+    - upload_id：已完成的分块上传会话
+    - file：multipart 上传，分块流式写盘
+    返回: (文件路径, sha256, 文件名, 是否为临时文件)，临时文件由调用方用 release_input 删除
+    """
+    if path:
+        try:
+            real_path = resolve_local_path(path, config.LOCAL_PATH_ROOTS)
+        except PermissionError as e:
+            raise HTTPException(status_code=403, detail=str(e))
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail=f"File not found: {path}")
+        print(f"[{tag}] Using local file: {real_path}")
+        return real_path, local_file_sha256(real_path), os.path.basename(real_path), False
+    if upload_id:
+        try:
+            tmp_path, sha256, filename = upload_manager.take(upload_id)
+        except KeyError:
+            raise HTTPException(status_code=404, detail=f"Upload not found or not completed: {upload_id}")
+        print(f"[{tag}] Using chunked upload {upload_id}: {filename}")
+        return tmp_path, sha256, filename, True
+    if file is None:
+        raise HTTPException(status_code=400, detail="One of file, upload_id or path is required")
+    print(f"[{tag}] Received file: {file.filename}, content_type: {file.content_type}")
+    try:
+        tmp_path, sha256, size = save_upload(file, suffix=os.path.splitext(file.filename)[-1],
+                                             max_size=UPLOAD_MAX_BYTES)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    print(f"[{tag}] Saved temp file: {tmp_path} ({size} bytes)")
+    return tmp_path, sha256, file.filename, True
+
+def release_input(path: str, is_temp: bool):
+    # 只删除服务端自己写的临时文件，本机直读的源文件不动
+    if is_temp and os.path.exists(path):
+        os.remove(path)
+        print(f"[Input] Temp file removed: {path}")
+
+@app.post("/uploads")
+def create_upload(filename: str = Form(...), size: Optional[int] = Form(None)):
+    # 创建分块上传会话，之后用 PUT /uploads/{id}?offset=N 依次上传原始字节
+    try:
+        return upload_manager.create(filename, size).info()
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def get_upload_or_404(upload_id: str):
+    session = upload_manager.get(upload_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Upload not found: {upload_id}")
+    return session
+
+@app.get("/uploads/{upload_id}")
+def upload_status(upload_id: str):
+    # 断线后查询已接收的字节数，从该 offset 续传
+    return get_upload_or_404(upload_id).info()
+
+@app.put("/uploads/{upload_id}")
+async def upload_chunk(upload_id: str, request: Request, offset: int = 0):
+    session = get_upload_or_404(upload_id)
+    length = request.headers.get("content-length", "")
+    try:
+        await upload_manager.append(session, offset, request.stream(), int(length) if length.isdigit() else None)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return session.info()
+
+@app.post("/uploads/{upload_id}/complete")
+def complete_upload(upload_id: str):
+    session = get_upload_or_404(upload_id)
+    try:
+        upload_manager.complete(session)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return session.info()
+
 @app.post("/asr")
-def asr_transcribe(file: UploadFile = File(...)):
-    print(f"[ASR] Received file: {file.filename}, content_type: {file.content_type}")
+def asr_transcribe(file: Optional[UploadFile] = File(None), upload_id: Optional[str] = Form(None),
+                   path: Optional[str] = Form(None), model: Optional[str] = Form(None),
+                   engine: Optional[str] = Form(None), format: Optional[str] = Form(None)):
+    model_name = check_model_name(model)
+    engine_name = check_engine(engine)
+    fmt = check_format(format)
+    tmp_path, content_hash, _, is_temp = receive_input(file, upload_id, path, "ASR")
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[-1]) as tmp:
-            tmp.write(file.file.read())
-            tmp_path = tmp.name
-        print(f"[ASR] Saved temp file: {tmp_path}")
         try:
-            result = asr_service.transcribe(tmp_path)
+            cache_key = asr_service.cache_key(content_hash, model_name, engine=engine_name)
+            cached = transcript_cache.get_bytes(cache_key)
+            if cached is not None:
+                print(f"[ASR] Cache hit: {cache_key}")
+                if fmt == "json":
+                    return Response(content=cached, media_type="application/json", headers={"X-ASR-Cache": "hit"})
+                return transcript_response(json.loads(cached)["result"], "hit", fmt)
+            result = asr_service.transcribe(tmp_path, model_name=model_name, content_hash=content_hash,
+                                            queue_timeout=config.ASR_QUEUE_TIMEOUT, engine=engine_name)
             print(f"[ASR] Transcription result: {result[:2]} ... total {len(result)} segments")
         finally:
-            os.remove(tmp_path)
-            print(f"[ASR] Temp file removed: {tmp_path}")
-        return JSONResponse(content={"result": result})
+            release_input(tmp_path, is_temp)
+        transcript_cache.put_bytes(cache_key, json.dumps({"result": result}, ensure_ascii=False).encode("utf-8"))
+        return transcript_response(result, "miss", fmt)
+    except queue.Full as e:
+        print(f"[ASR] {e}")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "10"})
     except Exception as e:
         print("[ASR] ERROR during transcription:")
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"ASR error: {e}")
 
 @app.post("/extract-audio")
-def extract_audio(file: UploadFile = File(...), background_tasks: BackgroundTasks = None):
-    print(f"[ExtractAudio] Received file: {file.filename}, content_type: {file.content_type}")
-    suffix = os.path.splitext(file.filename)[-1]
-    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-        tmp.write(file.file.read())
-        video_path = tmp.name
-    audio_path = video_path + ".wav"
+def extract_audio(background_tasks: BackgroundTasks, file: Optional[UploadFile] = File(None),
+                  upload_id: Optional[str] = Form(None), path: Optional[str] = Form(None),
+                  sample_rate: Optional[int] = Form(None), mono_16k: bool = False):
+    """
+    分离音轨并以 WAV 流式返回，不落地临时 WAV。
+    默认保留源文件的采样率和声道，sample_rate 指定输出采样率（保留声道）；
+    查询参数 mono_16k=true 时输出 16kHz 单声道，与 ASR 共用同一份解码缓存。
+    """
+    video_path, content_hash, filename, is_temp = receive_input(file, upload_id, path, "ExtractAudio")
+    out_name = os.path.splitext(os.path.basename(filename))[0] + ".wav"
+    headers = {"Content-Disposition": f'attachment; filename="{out_name}"'}
     try:
-        clip = VideoFileClip(video_path)
-        clip.audio.write_audiofile(audio_path)
-        clip.close()
-        print(f"[ExtractAudio] Audio extracted: {audio_path}")
-        if background_tasks is not None:
-            background_tasks.add_task(os.remove, video_path)
-            background_tasks.add_task(os.remove, audio_path)
-        return FileResponse(audio_path, filename=os.path.basename(audio_path), media_type="audio/wav")
+        if not mono_16k:
+            try:
+                stream = open_wav_stream(video_path, sample_rate)
+            except Exception:
+                release_input(video_path, is_temp)
+                raise
+            # ffmpeg 边解码边输出，源文件在响应结束后才能删除
+            background_tasks.add_task(release_input, video_path, is_temp)
+            return StreamingResponse(stream, media_type="audio/wav", headers=headers)
+        try:
+            audio = load_audio(video_path, content_hash)
+        finally:
+            release_input(video_path, is_temp)
+        print(f"[ExtractAudio] Audio decoded: {len(audio) / SAMPLE_RATE:.1f}s")
+        return StreamingResponse(iter_wav(audio), media_type="audio/wav", headers=headers)
     except Exception as e:
         print("[ExtractAudio] ERROR:", e)
         traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Extract audio error: {e}") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Extract audio error: {e}")
+
+def run_asr_job(job, tmp_path: str, content_hash: str, model_name: str, is_temp: bool = True,
+                engine: Optional[str] = None):
+    # 后台执行：先查缓存，未命中则按块转录并把分段实时写入任务
+    try:
+        chunk_seconds = config.ASR_JOB_CHUNK_SECONDS
+        cache_key = asr_service.cache_key(content_hash, model_name, chunk_seconds, engine)
+        cached = transcript_cache.get_bytes(cache_key)
+        if cached is not None:
+            job.cache = "hit"
+            return json.loads(cached)["result"]
+        result = asr_service.transcribe(
+            tmp_path,
+            chunk_seconds=chunk_seconds,
+            model_name=model_name,
+            on_progress=job.set_progress,
+            on_segments=job.add_segments,
+            content_hash=content_hash,
+            engine=engine,
+        )
+        transcript_cache.put_bytes(cache_key, json.dumps({"result": result}, ensure_ascii=False).encode("utf-8"))
+        return result
+    finally:
+        release_input(tmp_path, is_temp)
+
+@app.post("/asr/jobs", status_code=202)
+def asr_submit_job(file: Optional[UploadFile] = File(None), upload_id: Optional[str] = Form(None),
+                   path: Optional[str] = Form(None), model: Optional[str] = Form(None),
+                   engine: Optional[str] = Form(None)):
+    model_name = check_model_name(model)
+    engine_name = check_engine(engine)
+    tmp_path, content_hash, filename, is_temp = receive_input(file, upload_id, path, "ASRJob")
+    try:
+        job = job_manager.submit(filename, lambda job: run_asr_job(job, tmp_path, content_hash, model_name, is_temp,
+                                                                   engine_name))
+    except Exception:
+        # 任务没提交成功，临时文件不会再被 run_asr_job 清理
+        release_input(tmp_path, is_temp)
+        raise
+    return job.info()
+
+def get_job_or_404(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job
+
+@app.get("/asr/queue")
+def asr_queue_stats():
+    # 推理调度器状态：排队请求数、待处理窗口数、排队等待时间、批大小与吞吐
+    return scheduler.stats()
+
+@app.get("/asr/jobs/{job_id}")
+def asr_job_status(job_id: str):
+    return get_job_or_404(job_id).info()
+
+@app.get("/asr/jobs/{job_id}/result")
+def asr_job_result(job_id: str, format: Optional[str] = None):
+    fmt = check_format(format)
+    job = get_job_or_404(job_id)
+    if job.status == "error":
+        raise HTTPException(status_code=500, detail=f"ASR error: {job.error}")
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail=f"Job not finished: {job.status}")
+    return transcript_response(job.result, job.cache, fmt)
+
+@app.get("/asr/jobs/{job_id}/stream")
+def asr_job_stream(job_id: str):
+    # NDJSON：每行一个事件，segment / progress / heartbeat，最后是 done 或 error
+    job = get_job_or_404(job_id)
+    lines = (json.dumps(event, ensure_ascii=False) + "\n" for event in job.events())
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
+@app.post("/autocut")
+async def autocut_transcript(request: Request, job_id: Optional[str] = None, max_gap: Optional[float] = None,
+                             fillers: Optional[str] = None, max_repeat: Optional[int] = None):
+    """
+    规则自动粗剪，返回建议删除的词。转录结果二选一：
+    - job_id：已完成的异步转录任务
+    - 请求体：/asr 返回的 JSON（{"result": [...]} 或分段列表），或 binary 格式的 WordStore
+    fillers 为逗号分隔的口头禅，未给出的参数使用 AUTOCUT_* 配置
+    """
+    if job_id:
+        job = get_job_or_404(job_id)
+        if job.status != "done":
+            raise HTTPException(status_code=409, detail=f"Job not finished: {job.status}")
+        segments = job.result
+    else:
+        body = await request.body()
+        segments = None
+    try:
+        if segments is not None:
+            store = WordStore.from_segments(segments)
+        elif request.headers.get("content-type", "").startswith(BINARY_MEDIA_TYPE):
+            store = WordStore.from_bytes(body)
+        else:
+            data = json.loads(body)
+            store = WordStore.from_segments(data["result"] if isinstance(data, dict) else data)
+    except (ValueError, KeyError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid transcript: {e}")
+    reasons = autocut_store(store, max_gap=max_gap, fillers=fillers, max_repeat=max_repeat)
+    cuts = cut_list(store, reasons)
+    print(f"[AutoCut] {len(cuts)} cuts, {int((reasons != 0).sum())}/{len(store)} words")
+    return {
+        "words": len(store),
+        "remove": reasons.nonzero()[0].tolist(),
+        "cuts": cuts,
+        "removed_seconds": round(sum(c["end"] - c["start"] for c in cuts), 3),
+    }
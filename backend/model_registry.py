@@ -0,0 +1,106 @@
+"""
+模型注册表：按名称懒加载模型，支持预热和空闲卸载
+"""
+import gc
+import time
+import threading
+from typing import Any, Callable, Dict, Iterable, List
+
+
+class ModelRegistry:
+    def __init__(self, loader: Callable[[str], Any], idle_timeout: float = 0):
+        """
+        :param loader: 按模型名称加载模型的函数
+        :param idle_timeout: 模型空闲多久（秒）后卸载，0 表示从不卸载
+        """
+        self.loader = loader
+        self.idle_timeout = idle_timeout
+        self._models: Dict[str, Any] = {}
+        self._last_used: Dict[str, float] = {}
+        self._in_use: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+
+    def get(self, name: str) -> Any:
+        """
+        获取模型，首次使用时加载。同名模型并发请求只加载一次。
+        """
+        with self._lock:
+            model = self._models.get(name)
+            if model is not None:
+                self._last_used[name] = time.time()
+                return model
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+        with load_lock:
+            with self._lock:
+                model = self._models.get(name)
+            if model is None:
+                print(f"[Models] loading {name} ...")
+                t0 = time.time()
+                model = self.loader(name)
+                print(f"[Models] {name} loaded in {time.time() - t0:.1f}s")
+                with self._lock:
+                    self._models[name] = model
+            with self._lock:
+                self._last_used[name] = time.time()
+            return model
+
+    def acquire(self, name: str) -> Any:
+        """
+        获取模型并标记为使用中，使用中的模型不会被空闲卸载。需与 release 配对。
+        """
+        model = self.get(name)
+        with self._lock:
+            self._in_use[name] = self._in_use.get(name, 0) + 1
+        return model
+
+    def release(self, name: str):
+        with self._lock:
+            self._in_use[name] = max(0, self._in_use.get(name, 0) - 1)
+            self._last_used[name] = time.time()
+
+    def warmup(self, names: Iterable[str]):
+        """
+        预先加载模型，通常在服务启动时于后台线程调用
+        """
+        for name in names:
+            try:
+                self.get(name)
+            except Exception as e:
+                print(f"[Models] warmup {name} failed: {e}")
+
+    def loaded(self) -> Dict[str, float]:
+        # 已加载的模型及其最后使用时间
+        with self._lock:
+            return {name: self._last_used.get(name, 0.0) for name in self._models}
+
+    def unload(self, name: str) -> bool:
+        with self._lock:
+            if self._in_use.get(name):
+                return False
+            model = self._models.pop(name, None)
+            self._last_used.pop(name, None)
+        if model is None:
+            return False
+        del model
+        gc.collect()
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
+        print(f"[Models] {name} unloaded")
+        return True
+
+    def unload_idle(self) -> List[str]:
+        """
+        卸载空闲超过 idle_timeout 的模型，返回被卸载的模型名称
+        """
+        if self.idle_timeout <= 0:
+            return []
+        now = time.time()
+        with self._lock:
+            idle = [name for name, t in self._last_used.items()
+                    if now - t > self.idle_timeout and not self._in_use.get(name)]
+        return [name for name in idle if self.unload(name)]
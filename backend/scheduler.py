@@ -0,0 +1,214 @@
+"""
+推理调度器：所有单进程转录请求都排进同一个有界队列，由唯一的推理线程执行，
+多个请求的窗口轮流组成批次送入模型，避免各请求各自调用模型、争抢 CPU 线程
+"""
+import time
+import queue
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+from model_registry import ModelRegistry
+
+
+class InferenceRequest:
+    def __init__(self, model_name: str, audio: np.ndarray, spans: Sequence[Tuple[int, int]]):
+        """
+        :param audio: 整段音频（可以是 memmap），窗口在执行时才切片，排队期间不占额外内存
+        :param spans: 各窗口的 [起, 止) 采样点下标
+        """
+        self.model_name = model_name
+        self.audio = audio
+        self.spans = list(spans)
+        self.next_window = 0  # 下一个待调度的窗口
+        self.results: Dict[int, Any] = {}
+        self.error: Optional[BaseException] = None
+        self.cancelled = False
+        self.submitted = time.time()
+
+    @property
+    def pending(self) -> int:
+        return len(self.spans) - self.next_window
+
+    def window(self, i: int) -> np.ndarray:
+        start, end = self.spans[i]
+        return np.array(self.audio[start:end], dtype=np.float32)
+
+
+class InferenceScheduler:
+    def __init__(self, registry: ModelRegistry,
+                 batch_fn: Callable[[Any, List[np.ndarray]], List[Any]],
+                 batch_size: int = 4, max_queue: int = 16, sample_rate: int = 16000):
+        """
+        :param registry: 模型注册表，执行批次期间持有模型
+        :param batch_fn: batch_fn(model, 音频窗口列表) -> 与窗口一一对应的结果列表
+        :param batch_size: 每批最多几个窗口
+        :param max_queue: 最多同时排队/执行的请求数，超出时 submit 等待，超时抛 queue.Full
+        """
+        self.registry = registry
+        self.batch_fn = batch_fn
+        self.batch_size = max(1, batch_size)
+        self.max_queue = max(1, max_queue)
+        self.sample_rate = sample_rate
+        self._requests: List[InferenceRequest] = []  # 已提交、结果未取完的请求
+        self._rotation: Deque[InferenceRequest] = deque()  # 还有窗口待调度的请求，轮转保证公平
+        self._cond = threading.Condition()
+        self._worker = None
+        # 统计
+        self._waits: Deque[float] = deque(maxlen=200)
+        self._windows_done = 0
+        self._batches = 0
+        self._audio_seconds = 0.0
+        self._busy_seconds = 0.0
+
+    def submit(self, model_name: str, audio: np.ndarray, spans: Sequence[Tuple[int, int]],
+               timeout: Optional[float] = None) -> InferenceRequest:
+        """
+        提交一个请求的全部窗口。队列已满时最多等待 timeout 秒，仍无空位则抛 queue.Full
+        """
+        request = InferenceRequest(model_name, audio, spans)
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            while len(self._requests) >= self.max_queue:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    raise queue.Full(f"ASR queue is full ({self.max_queue} requests)")
+                self._cond.wait(remaining)
+            self._requests.append(request)
+            if request.spans:
+                self._rotation.append(request)
+            self._ensure_worker()
+            self._cond.notify_all()
+        return request
+
+    def results(self, request: InferenceRequest) -> Iterator[Tuple[int, Any]]:
+        """
+        按窗口顺序产出 (窗口下标, 结果)。调用方中途退出时取消剩余窗口
+        """
+        try:
+            for i in range(len(request.spans)):
+                with self._cond:
+                    while i not in request.results and request.error is None:
+                        self._cond.wait()
+                    if request.error is not None:
+                        raise request.error
+                    result = request.results.pop(i)
+                yield i, result
+        finally:
+            self._finish(request)
+
+    def run(self, model_name: str, audio: np.ndarray, spans: Sequence[Tuple[int, int]],
+            timeout: Optional[float] = None) -> Iterator[Tuple[int, Any]]:
+        return self.results(self.submit(model_name, audio, spans, timeout))
+
+    def _finish(self, request: InferenceRequest):
+        with self._cond:
+            request.cancelled = True
+            if request in self._rotation:
+                self._rotation.remove(request)
+            if request in self._requests:
+                self._requests.remove(request)
+            self._cond.notify_all()
+
+    def _ensure_worker(self):
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._loop, daemon=True)
+            self._worker.start()
+
+    def _next_batch(self) -> Tuple[str, List[Tuple[InferenceRequest, int]]]:
+        """
+        轮转取窗口：以队首请求的模型为准，同模型的请求每轮各取一个窗口，直到凑满一批。
+        取完后把轮转位置移到最后一个被服务的请求之后，下一批从其后继开始
+        """
+        model_name = self._rotation[0].model_name
+        batch: List[Tuple[InferenceRequest, int]] = []
+        served = 0
+        while len(batch) < self.batch_size:
+            took = False
+            for idx, request in enumerate(self._rotation):
+                if request.model_name != model_name or request.pending == 0:
+                    continue
+                batch.append((request, request.next_window))
+                request.next_window += 1
+                served = idx
+                took = True
+                if len(batch) >= self.batch_size:
+                    break
+            if not took:
+                break
+        self._rotation.rotate(-(served + 1))
+        for request in [r for r in self._rotation if r.pending == 0]:
+            self._rotation.remove(request)
+        return model_name, batch
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._rotation:
+                    self._cond.wait()
+                model_name, batch = self._next_batch()
+            started = time.time()
+            for request, i in batch:
+                if i == 0:
+                    # 排队等待时间：请求提交到它的第一个窗口开始执行
+                    self._waits.append(started - request.submitted)
+            pieces = [request.window(i) for request, i in batch]
+            try:
+                outputs = self._execute(model_name, pieces)
+            except Exception as e:
+                if len(batch) == 1:
+                    print(f"[Scheduler] window failed: {e}")
+                    self._fail(batch[0][0], e)
+                    continue
+                # 一个窗口出错不应连累同批其他请求：逐个重试，只让失败的窗口所属的请求报错
+                print(f"[Scheduler] batch of {len(batch)} failed ({e}), retrying windows one by one")
+                outputs = []
+                for (request, _), piece in zip(batch, pieces):
+                    try:
+                        outputs.append(self._execute(model_name, [piece])[0])
+                    except Exception as e:
+                        print(f"[Scheduler] window failed: {e}")
+                        self._fail(request, e)
+                        outputs.append(None)
+            elapsed = time.time() - started
+            with self._cond:
+                for (request, i), output in zip(batch, outputs):
+                    if not request.cancelled and request.error is None:
+                        request.results[i] = output
+                self._windows_done += len(batch)
+                self._batches += 1
+                self._audio_seconds += sum(len(p) for p in pieces) / self.sample_rate
+                self._busy_seconds += elapsed
+                self._cond.notify_all()
+
+    def _execute(self, model_name: str, pieces: List[np.ndarray]) -> List[Any]:
+        # 执行期间持有模型，防止被空闲卸载
+        model = self.registry.acquire(model_name)
+        try:
+            return self.batch_fn(model, pieces)
+        finally:
+            self.registry.release(model_name)
+
+    def _fail(self, request: InferenceRequest, error: BaseException):
+        with self._cond:
+            request.error = error
+            if request in self._rotation:
+                self._rotation.remove(request)
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            waits = list(self._waits)
+            return {
+                "requests": len(self._requests),
+                "max_queue": self.max_queue,
+                "queued_windows": sum(r.pending for r in self._rotation),
+                "batch_size": self.batch_size,
+                "batches": self._batches,
+                "windows": self._windows_done,
+                "avg_batch": round(self._windows_done / self._batches, 2) if self._batches else 0.0,
+                "wait_avg": round(sum(waits) / len(waits), 3) if waits else 0.0,
+                "wait_max": round(max(waits), 3) if waits else 0.0,
+                # 每秒推理时间处理的音频秒数
+                "realtime_factor": round(self._audio_seconds / self._busy_seconds, 2) if self._busy_seconds else 0.0,
+            }
@@ -0,0 +1,233 @@
+"""
+上传处理：分块流式写盘并同步计算 sha256，内存占用与文件大小无关；
+大文件支持可续传的分块上传（创建会话 -> 按 offset 追加 -> 完成）
+"""
+import os
+import time
+import uuid
+import hashlib
+import tempfile
+import threading
+from typing import Dict, List, Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+from disk_cache import file_identity, file_sha256
+
+# 每次从上传流读取的字节数；分块上传时攒够这么多再交给线程池写盘
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLarge(ValueError):
+    """上传超出声明的大小或服务端上限"""
+
+
+def save_upload(file, suffix: str = "", max_size: Optional[int] = None) -> Tuple[str, str, int]:
+    """
+    把 UploadFile 分块写入临时文件，边写边计算哈希。
+    超过 max_size 字节时删除临时文件并抛 UploadTooLarge
+    返回: (临时文件路径, sha256, 字节数)
+    """
+    h = hashlib.sha256()
+    size = 0
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+        try:
+            while True:
+                chunk = file.file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_size is not None and size > max_size:
+                    raise UploadTooLarge(f"upload exceeds {max_size} bytes")
+                tmp.write(chunk)
+                h.update(chunk)
+        except BaseException:
+            tmp.close()
+            os.remove(tmp.name)
+            raise
+        tmp_path = tmp.name
+    return tmp_path, h.hexdigest(), size
+
+
+def resolve_local_path(path: str, roots: List[str]) -> str:
+    """
+    本机直读模式：校验客户端传来的路径位于允许的目录内（解析符号链接后判断），返回真实路径。
+    不在白名单内抛 PermissionError，文件不存在抛 FileNotFoundError。
+    """
+    if not roots:
+        raise PermissionError("local path mode is disabled")
+    real = os.path.realpath(path)
+    for root in roots:
+        real_root = os.path.realpath(root)
+        try:
+            inside = os.path.commonpath([real, real_root]) == real_root
+        except ValueError:
+            # Windows 上不同盘符的路径没有公共前缀
+            continue
+        if inside:
+            break
+    else:
+        raise PermissionError(f"path not in allowed directories: {path}")
+    if not os.path.isfile(real):
+        raise FileNotFoundError(path)
+    return real
+
+
+# 本机文件的哈希按 (路径, 大小, 修改时间) 记忆，同一文件重复提交时不必重新读取
+_local_hash_cache: Dict[str, str] = {}
+_local_hash_lock = threading.Lock()
+
+
+def local_file_sha256(path: str) -> str:
+    identity = repr(file_identity(path))
+    with _local_hash_lock:
+        cached = _local_hash_cache.get(identity)
+    if cached is not None:
+        return cached
+    sha256 = file_sha256(path)
+    with _local_hash_lock:
+        _local_hash_cache[identity] = sha256
+    return sha256
+
+
+class UploadSession:
+    def __init__(self, filename: str, size: Optional[int] = None):
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        self.size = size  # 客户端声明的总大小，可为空
+        self.offset = 0
+        self.sha256: Optional[str] = None
+        self.updated = time.time()
+        self.lock = threading.Lock()
+        self._hasher = hashlib.sha256()
+        fd, self.path = tempfile.mkstemp(prefix="upload_", suffix=os.path.splitext(filename)[-1])
+        os.close(fd)
+
+    @property
+    def complete(self) -> bool:
+        return self.sha256 is not None
+
+    def info(self) -> Dict:
+        return {
+            "upload_id": self.id,
+            "filename": self.filename,
+            "offset": self.offset,
+            "size": self.size,
+            "complete": self.complete,
+            "sha256": self.sha256,
+        }
+
+
+def _write_chunks(session: UploadSession, f, chunks: List[bytes]):
+    for chunk in chunks:
+        f.write(chunk)
+        session._hasher.update(chunk)
+        session.offset += len(chunk)
+
+
+class UploadManager:
+    def __init__(self, ttl: float = 24 * 3600, max_size: Optional[int] = None):
+        """
+        :param ttl: 会话多久（秒）无活动后清理，连同已上传的临时文件
+        :param max_size: 单个上传的字节数上限，None 表示不限
+        """
+        self.ttl = ttl
+        self.max_size = max_size
+        self._sessions: Dict[str, UploadSession] = {}
+        self._lock = threading.Lock()
+
+    def create(self, filename: str, size: Optional[int] = None) -> UploadSession:
+        if size is not None and size < 0:
+            raise ValueError(f"invalid upload size: {size}")
+        if size is not None and self.max_size is not None and size > self.max_size:
+            raise UploadTooLarge(f"upload of {size} bytes exceeds the {self.max_size} byte limit")
+        self._cleanup()
+        session = UploadSession(filename, size)
+        with self._lock:
+            self._sessions[session.id] = session
+        return session
+
+    def get(self, upload_id: str) -> Optional[UploadSession]:
+        with self._lock:
+            return self._sessions.get(upload_id)
+
+    def limit(self, session: UploadSession) -> Optional[int]:
+        # 会话最多接收的字节数：声明了大小时按声明，否则按服务端上限
+        return session.size if session.size is not None else self.max_size
+
+    async def append(self, session: UploadSession, offset: int, stream, length: Optional[int] = None) -> int:
+        """
+        从请求体流追加数据。offset 必须等于服务端已接收的字节数，否则抛 ValueError，
+        客户端应先查询 offset 再从该位置续传。中途断开时已写入的部分仍然有效。
+        超出 limit(session) 的数据不写入，抛 UploadTooLarge；
+        length 为请求声明的长度，超出时读流之前就拒绝。
+        写盘和哈希在线程池中执行，不阻塞事件循环
+        """
+        # 运行在事件循环里，不能阻塞等锁；同一会话的并发写入直接拒绝
+        if not session.lock.acquire(blocking=False):
+            raise ValueError("another chunk is being uploaded")
+        try:
+            if session.complete:
+                raise ValueError("upload already completed")
+            if offset != session.offset:
+                raise ValueError(f"offset mismatch: expected {session.offset}, got {offset}")
+            limit = self.limit(session)
+            if limit is not None and length is not None and offset + length > limit:
+                raise UploadTooLarge(f"chunk ends at byte {offset + length}, upload is limited to {limit} bytes")
+            f = await run_in_threadpool(open, session.path, "ab")
+            try:
+                pending: List[bytes] = []
+                buffered = 0
+                async for chunk in stream:
+                    if not chunk:
+                        continue
+                    if limit is not None and session.offset + buffered + len(chunk) > limit:
+                        raise UploadTooLarge(f"upload is limited to {limit} bytes")
+                    pending.append(chunk)
+                    buffered += len(chunk)
+                    if buffered >= UPLOAD_CHUNK_SIZE:
+                        await run_in_threadpool(_write_chunks, session, f, pending)
+                        pending, buffered = [], 0
+                if pending:
+                    await run_in_threadpool(_write_chunks, session, f, pending)
+            finally:
+                await run_in_threadpool(f.close)
+            session.updated = time.time()
+            return session.offset
+        finally:
+            session.lock.release()
+
+    def complete(self, session: UploadSession) -> UploadSession:
+        if not session.lock.acquire(blocking=False):
+            raise ValueError("another chunk is being uploaded")
+        try:
+            if session.size is not None and session.offset != session.size:
+                raise ValueError(f"incomplete upload: {session.offset}/{session.size} bytes")
+            if session.sha256 is None:
+                session.sha256 = session._hasher.hexdigest()
+            session.updated = time.time()
+            return session
+        finally:
+            session.lock.release()
+
+    def take(self, upload_id: str) -> Tuple[str, str, str]:
+        """
+        取走已完成的上传，文件归调用方负责删除。
+        返回: (文件路径, sha256, 原始文件名)
+        """
+        with self._lock:
+            session = self._sessions.get(upload_id)
+            if session is None or not session.complete:
+                raise KeyError(upload_id)
+            del self._sessions[upload_id]
+        return session.path, session.sha256, session.filename
+
+    def _cleanup(self):
+        now = time.time()
+        with self._lock:
+            expired = [s for s in self._sessions.values() if now - s.updated > self.ttl]
+            for session in expired:
+                del self._sessions[session.id]
+        for session in expired:
+            try:
+                os.remove(session.path)
+            except FileNotFoundError:
+                pass
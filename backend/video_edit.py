@@ -1,14 +1,523 @@
 """
 视频剪辑模块
+
+导出采用 smart render：完整落在保留区间内的 GOP 直接流拷贝，
+只有剪切点所在的不完整 GOP 才重新编码，导出耗时取决于剪切点数量而不是视频长度。
 """
-from typing import List, Tuple
+import os
+import json
+import shutil
+import subprocess
+import tempfile
+from fractions import Fraction
+from concurrent.futures import ThreadPoolExecutor
+from bisect import bisect_left, bisect_right
+from typing import List, Tuple, Dict, Any, Optional
+from disk_cache import DiskLRUCache, make_key, file_identity
+
+FFMPEG = os.environ.get("FFMPEG_BIN", "ffmpeg")
+FFPROBE = os.environ.get("FFPROBE_BIN", "ffprobe")
+
+# 能与源码流无缝拼接的重编码器，键为 ffprobe 的 codec_name
+SMART_ENCODERS = {"h264": "libx264", "hevc": "libx265"}
+# 时间比较容差（秒），短于该值的片段直接丢弃
+TIME_EPS = 1e-3
+# 并行导出时每个分块的目标时长（秒，按输出时间计）
+CHUNK_SECONDS = 30.0
+# 拼接前允许的音视频时长差（秒）：AAC 按 1024 个采样成帧，总时长可能多出不到一个音频帧
+SYNC_TOLERANCE = 0.05
+# 区间渲染缓存的片段格式：音频存为 PCM，拼接时按采样精确相接后统一编码一次 AAC。
+# 每段各自编码 AAC 会在拼接处留下编码器延迟和补齐的采样，区间越多音画偏差越大
+CACHE_PART_VERSION = 2
+# 拷贝片段与重编码片段混合时的样本描述：参数集随码流携带，每段按自己的 SPS/PPS 解码。
+# concat 的 auto_convert 只会给 H.264 插入码流内参数集，其他编码参数集不同时改为完整重编码
+INBAND_TAGS = {"h264": "avc3"}
+
+
+def _run(cmd: List[str]) -> bytes:
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if proc.returncode != 0:
+        err = proc.stderr.decode("utf-8", errors="replace")[-2000:]
+        raise RuntimeError(f"{os.path.basename(cmd[0])} 执行失败: {err}")
+    return proc.stdout
+
+
+def probe_streams(video_path: str) -> Dict[str, Any]:
+    """
+    读取首个视频流和音频流的参数。
+    返回: {"video": {...} 或 None, "audio": {...} 或 None}
+    """
+    out = _run([FFPROBE, "-v", "error", "-show_streams", "-of", "json", video_path])
+    info = {"video": None, "audio": None}
+    for stream in json.loads(out.decode("utf-8")).get("streams", []):
+        kind = stream.get("codec_type")
+        if kind in info and info[kind] is None:
+            info[kind] = stream
+    return info
+
+
+def probe_stream_params(path: str) -> Dict[str, Any]:
+    """
+    读取首个视频流中决定能否无缝拼接的参数，extradata_hash 为参数集（avcC/hvcC）的摘要
+    """
+    out = _run([
+        FFPROBE, "-v", "error", "-select_streams", "v:0", "-show_data_hash", "md5",
+        "-show_entries", "stream=codec_name,profile,level,width,height,pix_fmt,extradata_hash", "-of", "json", path,
+    ])
+    streams = json.loads(out.decode("utf-8")).get("streams", [])
+    return streams[0] if streams else {}
+
+
+def _stream_end(path: str, stream: str, demuxer_args: Optional[List[str]] = None) -> float:
+    """
+    读取 packet 头计算某个流最后一帧的结束时间（秒），不解码；demuxer_args 如 concat 列表所需的参数
+    """
+    out = _run([FFPROBE, "-v", "error"] + (demuxer_args or []) + [
+        "-select_streams", stream, "-show_entries", "packet=pts_time,duration_time", "-of", "csv=p=0", path,
+    ])
+    end = 0.0
+    for line in out.decode("utf-8").splitlines():
+        try:
+            pts, duration = (float(x) for x in line.strip().split(",")[:2])
+        except ValueError:
+            continue
+        end = max(end, pts + duration)
+    return end
+
+
+def frame_rate(video: Optional[Dict[str, Any]]) -> Optional[Fraction]:
+    # 视频流帧率（r_frame_rate），未知时返回 None
+    try:
+        rate = Fraction((video or {}).get("r_frame_rate") or "0/1")
+    except (ValueError, ZeroDivisionError):
+        return None
+    return rate if rate > 0 else None
+
+
+def snap_segments(segments: List[Tuple[float, float]], video: Optional[Dict[str, Any]]) -> List[Tuple[float, float]]:
+    """
+    把区间端点取整到最近的帧时刻（以视频流的 start_time 为原点），相接的区间合并，不足一帧的区间丢弃。
+    音视频都按取整后的区间裁剪：每段视频的帧数乘帧长正好等于该段音频时长，剪切点再多也不会累积偏差
+    """
+    rate = frame_rate(video)
+    if rate is None:
+        return list(segments)
+    fps = float(rate)
+    origin = float(video.get("start_time") or 0.0)
+    snapped = []
+    for start, end in segments:
+        a = origin + round((start - origin) * fps) / fps
+        b = origin + round((end - origin) * fps) / fps
+        if b - a < 0.5 / fps:
+            continue
+        if snapped and a <= snapped[-1][1] + TIME_EPS:
+            snapped[-1] = (snapped[-1][0], max(b, snapped[-1][1]))
+        else:
+            snapped.append((a, b))
+    return snapped
+
+
+def _frame_count(video: Dict[str, Any], start: float, end: float) -> Optional[int]:
+    rate = frame_rate(video)
+    return int(round((end - start) * rate)) if rate is not None else None
+
+
+def probe_keyframes(video_path: str) -> List[float]:
+    """
+    读取视频流所有关键帧的时间戳（秒，升序）。只读 packet 头，不解码。
+    """
+    out = _run([
+        FFPROBE, "-v", "error", "-select_streams", "v:0",
+        "-show_entries", "packet=pts_time,flags", "-of", "csv=p=0", video_path,
+    ])
+    keyframes = []
+    for line in out.decode("utf-8").splitlines():
+        parts = line.strip().split(",")
+        if len(parts) < 2 or "K" not in parts[1]:
+            continue
+        try:
+            keyframes.append(float(parts[0]))
+        except ValueError:
+            continue
+    keyframes.sort()
+    return keyframes
+
+
+def plan_smart_render(segments: List[Tuple[float, float]], keyframes: List[float]) -> List[Tuple[str, float, float]]:
+    """
+    把保留区间拆成流拷贝/重编码片段。
+    segments: [(start, end), ...]，按时间升序且互不重叠
+    keyframes: 关键帧时间戳（升序），为空时全部重编码
+    返回: [("copy" | "encode", start, end), ...]
+    """
+    plan = []
+    for start, end in segments:
+        if end - start <= TIME_EPS:
+            continue
+        # 区间内第一个和最后一个关键帧
+        i = bisect_left(keyframes, start - TIME_EPS)
+        j = bisect_right(keyframes, end + TIME_EPS) - 1
+        if i < len(keyframes) and i <= j and keyframes[j] - keyframes[i] > TIME_EPS:
+            k1, k2 = max(keyframes[i], start), min(keyframes[j], end)
+            if k1 - start > TIME_EPS:
+                plan.append(("encode", start, k1))
+            plan.append(("copy", k1, k2))
+            if end - k2 > TIME_EPS:
+                plan.append(("encode", k2, end))
+        else:
+            plan.append(("encode", start, end))
+    return plan
+
+
+def _encoder_args(video: Dict[str, Any], crf: int, preset: str) -> List[str]:
+    """
+    生成与源视频流参数一致的编码参数，保证重编码片段可以与拷贝片段直接拼接。
+    """
+    encoder = SMART_ENCODERS.get(video.get("codec_name"), "libx264")
+    args = ["-c:v", encoder, "-preset", preset, "-crf", str(crf)]
+    if video.get("pix_fmt"):
+        args += ["-pix_fmt", video["pix_fmt"]]
+    profile = (video.get("profile") or "").lower()
+    if encoder == "libx264" and profile in ("baseline", "constrained baseline", "main", "high", "high 10"):
+        args += ["-profile:v", profile.replace("constrained ", "").replace(" ", "")]
+        # level 也与源一致，拼接后的码流只声明一个 level
+        level = video.get("level") or 0
+        if isinstance(level, int) and level >= 10:
+            args += ["-level:v", f"{level / 10:g}"]
+    rate = video.get("r_frame_rate")
+    if rate and rate != "0/0":
+        args += ["-r", rate]
+    return args
+
+
+def _timescale_args(video: Dict[str, Any]) -> List[str]:
+    # 所有片段使用相同的 mp4 时间基，concat 拷贝时时间戳才能连续
+    time_base = video.get("time_base") or ""
+    if "/" in time_base:
+        return ["-video_track_timescale", time_base.split("/")[1]]
+    return []
+
+
+def _render_part(video_path: str, mode: str, start: float, end: float, out_path: str,
+                 video: Dict[str, Any], crf: int, preset: str):
+    """
+    start、end 已取整到帧时刻时按帧数裁剪：片段正好包含 [start, end) 内的帧，时长与对应的音频一致
+    """
+    frames = _frame_count(video, start, end)
+    if frames is None:
+        cmd = [FFMPEG, "-y", "-v", "error", "-ss", f"{start:.6f}", "-i", video_path, "-t", f"{end - start:.6f}"]
+    else:
+        half = 0.5 / float(frame_rate(video))
+        # 拷贝时定位点略晚于关键帧，不会因为时间戳的舍入退到前一个 GOP；
+        # 重编码时略早于首帧，精确定位保留从 start 开始的帧
+        seek = start + half / 2 if mode == "copy" else max(0.0, start - half)
+        cmd = [FFMPEG, "-y", "-v", "error", "-ss", f"{seek:.6f}", "-i", video_path, "-frames:v", str(frames)]
+    cmd += ["-map", "0:v:0", "-an"]
+    if mode == "copy":
+        cmd += ["-c:v", "copy", "-avoid_negative_ts", "make_zero"]
+    else:
+        # 首帧时间戳归零，否则按 -r 输出时会在开头补出重复帧
+        cmd += ["-vf", "setpts=PTS-STARTPTS"] + _encoder_args(video, crf, preset)
+    cmd += _timescale_args(video) + [out_path]
+    _run(cmd)
+
+
+def _parameters_compatible(video: Dict[str, Any], source: Dict[str, Any], part: Dict[str, Any]) -> bool:
+    """
+    重编码片段能否与源码流的拷贝片段拼在一起：profile、level、分辨率和像素格式必须相同；
+    参数集不同时只有 H.264 可以靠码流内参数集（INBAND_TAGS）拼接
+    """
+    for key in ("codec_name", "profile", "level", "width", "height", "pix_fmt"):
+        if source.get(key) != part.get(key):
+            print(f"[VideoEdit] re-encoded {key} {part.get(key)} != source {source.get(key)}")
+            return False
+    return source.get("extradata_hash") == part.get("extradata_hash") or video.get("codec_name") in INBAND_TAGS
+
+
+def _render_audio(video_path: str, segments: List[Tuple[float, float]], out_path: str):
+    """
+    一次性按保留区间裁剪并编码音轨。音频编码开销很小，整体重编码可以保证采样级对齐。
+    """
+    filters = []
+    labels = []
+    for i, (start, end) in enumerate(segments):
+        filters.append(f"[0:a:0]atrim=start={start:.6f}:end={end:.6f},asetpts=PTS-STARTPTS[a{i}]")
+        labels.append(f"[a{i}]")
+    filters.append("".join(labels) + f"concat=n={len(segments)}:v=0:a=1[aout]")
+    script_path = out_path + ".filter"
+    with open(script_path, "w", encoding="utf-8") as f:
+        f.write(";\n".join(filters))
+    _run([FFMPEG, "-y", "-v", "error", "-i", video_path, "-filter_complex_script", script_path,
+          "-map", "[aout]", "-c:a", "aac", "-b:a", "192k", out_path])
+
+
+def split_balanced_chunks(segments: List[Tuple[float, float]], chunk_seconds: float = CHUNK_SECONDS) -> List[List[Tuple[float, float]]]:
+    """
+    把保留区间切成输出时长尽量相等的分块，分块边界可以落在区间中间。
+    分块方式只取决于 segments 和 chunk_seconds，与并行进程数无关，保证导出结果确定。
+    返回: [[(start, end), ...], ...]
+    """
+    total = sum(e - s for s, e in segments)
+    if total <= TIME_EPS:
+        return []
+    n_chunks = max(1, int(round(total / max(chunk_seconds, TIME_EPS))))
+    target = total / n_chunks
+    chunks = []
+    current = []
+    acc = 0.0
+    for start, end in segments:
+        while end - start > TIME_EPS:
+            # 最后一块吸收剩余的全部时长，避免浮点误差产生碎片
+            room = target - acc if len(chunks) < n_chunks - 1 else end - start
+            take = min(end - start, room)
+            current.append((start, start + take))
+            acc += take
+            start += take
+            if len(chunks) < n_chunks - 1 and acc >= target - TIME_EPS:
+                chunks.append(current)
+                current = []
+                acc = 0.0
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _render_chunk(video_path: str, chunk: List[Tuple[float, float]], out_path: str,
+                  video: Dict[str, Any], crf: int, preset: str, threads: int):
+    """
+    把一个分块内的若干子区间重编码成一个无音频的视频片段（在独立的 ffmpeg 进程中运行）。
+    只打开一次输入，按帧时间选出 [start, end) 内的帧再连续编号，子区间端点已取整到帧时刻时，
+    输出帧数正好等于各子区间帧数之和，与按同样区间裁剪的音轨等长。
+    """
+    rate = frame_rate(video)
+    half = 0.5 / float(rate) if rate is not None else 0.0
+    # 定位到分块起点稍前，只解码分块覆盖的范围；t 为相对定位点的时间
+    seek = max(0.0, chunk[0][0] - half)
+    span = chunk[-1][1] - seek
+    terms = "+".join(f"between(t,{start - seek - half:.6f},{end - seek - half - 1e-6:.6f})" for start, end in chunk)
+    pts = f"N/({rate.numerator}/{rate.denominator})/TB" if rate is not None else "N/FRAME_RATE/TB"
+    cmd = [FFMPEG, "-y", "-v", "error", "-ss", f"{seek:.6f}", "-t", f"{span:.6f}", "-i", video_path]
+    cmd += ["-filter_complex", f"[0:v:0]select='{terms}',setpts={pts}[vout]", "-map", "[vout]", "-an"]
+    # 固定编码线程数，x264 的输出才与调度无关
+    cmd += _encoder_args(video, crf, preset) + ["-threads", str(threads)]
+    cmd += _timescale_args(video) + [out_path]
+    _run(cmd)
+    return out_path
+
+
+def render_segments_parallel(video_path: str, segments: List[Tuple[float, float]], output_path: str,
+                             workers: Optional[int] = None, chunk_seconds: float = CHUNK_SECONDS,
+                             crf: int = 18, preset: str = "veryfast", threads_per_chunk: int = 1) -> str:
+    """
+    完整重编码导出：保留区间按时长均分成分块，由多个 ffmpeg 进程并行编码，
+    再按分块顺序无损拼接。分块和编码参数都与 workers 无关，相同输入得到相同输出。
+    segments: [(start1, end1), (start2, end2), ...]
+    workers: 并行进程数，默认使用全部 CPU 核
+    返回导出文件路径
+    """
+    segments = [(float(s), float(e)) for s, e in segments if e - s > TIME_EPS]
+    if not segments:
+        raise ValueError("没有需要保留的时间区间")
+    streams = probe_streams(video_path)
+    video, audio = streams["video"], streams["audio"]
+    if video is None:
+        # 纯音频没有可并行的视频编码，走普通导出
+        return cut_video_by_segments(video_path, segments, output_path, crf=crf, preset=preset)
+    workers = max(1, workers or os.cpu_count() or 1)
+    segments = snap_segments(segments, video)
+    if not segments:
+        raise ValueError("没有需要保留的时间区间")
+    # 分块边界可能落在区间中间，再取整一次：相邻分块的同一个边界取整到同一帧
+    chunks = [c for c in (snap_segments(c, video) for c in split_balanced_chunks(segments, chunk_seconds)) if c]
+    print(f"[VideoEdit] parallel render: {len(chunks)} chunks on {workers} workers")
+    work_dir = tempfile.mkdtemp(prefix="parallel_render_")
+    try:
+        part_paths = [os.path.join(work_dir, f"chunk_{i:05d}.mp4") for i in range(len(chunks))]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # 每个任务启动一个 ffmpeg 子进程编码；音轨和视频分块同时进行
+            audio_future = None
+            audio_path = None
+            if audio is not None:
+                audio_path = os.path.join(work_dir, "audio.m4a")
+                audio_future = pool.submit(_render_audio, video_path, segments, audio_path)
+            futures = [
+                pool.submit(_render_chunk, video_path, chunk, path, video, crf, preset, threads_per_chunk)
+                for chunk, path in zip(chunks, part_paths)
+            ]
+            for future in futures:
+                future.result()
+            if audio_future is not None:
+                audio_future.result()
+        _concat_parts(part_paths, audio_path, output_path, work_dir)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return output_path
+
+
+def _render_range(video_path: str, start: float, end: float, out_path: str,
+                  video: Optional[Dict[str, Any]], audio: Optional[Dict[str, Any]], crf: int, preset: str):
+    """
+    把单个保留区间连同音轨重编码成独立片段，片段之间可以直接 concat 拷贝。
+    start、end 已取整到帧时刻：视频保留 [start, end) 内的帧，音频裁剪同样的时长，片段内音画等长。
+    用 trim 滤镜而不是 -frames:v 截断视频，后者会让音频在最后一个完整的音频帧处提前结束
+    """
+    rate = frame_rate(video) if video is not None else None
+    if rate is None:
+        cmd = [FFMPEG, "-y", "-v", "error", "-ss", f"{start:.6f}", "-i", video_path, "-t", f"{end - start:.6f}"]
+    else:
+        # 定位点略早于首帧；帧时间相对定位点为 offset + k / fps，按半帧为界选出 [start, end) 内的帧
+        half = 0.5 / float(rate)
+        seek = max(0.0, start - half)
+        offset = start - seek
+        cmd = [FFMPEG, "-y", "-v", "error", "-ss", f"{seek:.6f}", "-t", f"{end - seek:.6f}", "-i", video_path]
+    if video is not None:
+        cmd += ["-map", "0:v:0"]
+        if rate is not None:
+            cmd += ["-vf", f"trim=start={offset - half:.6f}:end={offset + end - start - half:.6f},setpts=PTS-STARTPTS"]
+        cmd += _encoder_args(video, crf, preset) + _timescale_args(video)
+    if audio is not None:
+        cmd += ["-map", "0:a:0"]
+        if rate is not None:
+            cmd += ["-af", f"atrim=start={offset:.6f}:end={offset + end - start:.6f},asetpts=PTS-STARTPTS"]
+        # 固定采样率和声道，保证各片段音频参数一致
+        cmd += ["-c:a", "pcm_s16le"]
+        if audio.get("sample_rate"):
+            cmd += ["-ar", str(audio["sample_rate"])]
+        if audio.get("channels"):
+            cmd += ["-ac", str(audio["channels"])]
+    cmd += ["-f", "mov", out_path]
+    _run(cmd)
+
+
+def render_segments_cached(video_path: str, segments: List[Tuple[float, float]], output_path: str,
+                           cache: DiskLRUCache, workers: Optional[int] = None,
+                           crf: int = 18, preset: str = "veryfast") -> str:
+    """
+    按保留区间逐段渲染并缓存，再无损拼接。
+    缓存 key 为源文件身份 + 精确的 (start, end) + 编码参数，编辑后只有变化的区间需要重新渲染，
+    预览和导出共用同一份缓存。
+    返回导出文件路径
+    """
+    segments = [(float(s), float(e)) for s, e in segments if e - s > TIME_EPS]
+    if not segments:
+        raise ValueError("没有需要保留的时间区间")
+    streams = probe_streams(video_path)
+    video, audio = streams["video"], streams["audio"]
+    if video is None and audio is None:
+        raise ValueError("未找到可剪辑的音视频流")
+    # 按帧时刻取整后再计算缓存 key，拼接后的总时长等于各区间取整后的时长之和
+    segments = snap_segments(segments, video)
+    if not segments:
+        raise ValueError("没有需要保留的时间区间")
+    identity = file_identity(video_path)
+    keys = [make_key("render", CACHE_PART_VERSION, identity, start, end, crf, preset) for start, end in segments]
+    part_paths = [cache.get(key) for key in keys]
+    missing = [i for i, path in enumerate(part_paths) if path is None]
+    print(f"[VideoEdit] cached render: {len(segments) - len(missing)}/{len(segments)} ranges hit")
+
+    def render(i):
+        start, end = segments[i]
+        tmp_path = cache.temp_path_for(keys[i])
+        try:
+            _render_range(video_path, start, end, tmp_path, video, audio, crf, preset)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        # 拼接完成前不淘汰，避免本次要用的片段被删掉
+        return cache.put_file(keys[i], tmp_path, evict=False)
+
+    if missing:
+        with ThreadPoolExecutor(max_workers=max(1, workers or os.cpu_count() or 1)) as pool:
+            for i, path in zip(missing, pool.map(render, missing)):
+                part_paths[i] = path
+    work_dir = tempfile.mkdtemp(prefix="cached_render_")
+    try:
+        _concat_parts(part_paths, None, output_path, work_dir, encode_audio=audio is not None)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        cache.evict()
+    return output_path
+
+
+def _concat_parts(part_paths: List[str], audio_path: Optional[str], output_path: str, work_dir: str,
+                  video_tag: Optional[str] = None, encode_audio: bool = False):
+    """
+    无损拼接片段，audio_path 不为空时混入单独渲染的音轨。拼接前检查音视频时长一致，不一致时报错而不是输出音画不同步的文件。
+    video_tag: 片段的参数集不同时使用的样本描述（见 INBAND_TAGS）
+    encode_audio: 片段自带 PCM 音频，拼接后编码为 AAC
+    """
+    list_path = os.path.join(work_dir, "parts.txt")
+    with open(list_path, "w", encoding="utf-8") as f:
+        for path in part_paths:
+            escaped = path.replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+    # auto_convert：H.264 片段转为在每个关键帧前携带自己的 SPS/PPS
+    demuxer_args = ["-f", "concat", "-safe", "0", "-auto_convert", "1"]
+    if audio_path or encode_audio:
+        video_end = _stream_end(list_path, "v:0", demuxer_args)
+        audio_end = _stream_end(audio_path, "a:0") if audio_path else _stream_end(list_path, "a:0", demuxer_args)
+        if video_end and abs(video_end - audio_end) > SYNC_TOLERANCE:
+            raise RuntimeError(f"音视频时长不一致：视频 {video_end:.3f}s，音频 {audio_end:.3f}s")
+    cmd = [FFMPEG, "-y", "-v", "error"] + demuxer_args + ["-i", list_path]
+    if audio_path:
+        cmd += ["-i", audio_path, "-map", "0:v:0", "-map", "1:a:0"]
+    cmd += ["-c", "copy"]
+    if encode_audio:
+        cmd += ["-c:a", "aac", "-b:a", "192k"]
+    if video_tag:
+        cmd += ["-tag:v", video_tag]
+    cmd += ["-movflags", "+faststart", output_path]
+    _run(cmd)
+
 
-def cut_video_by_segments(video_path: str, segments: List[Tuple[float, float]], output_path: str) -> str:
+def cut_video_by_segments(video_path: str, segments: List[Tuple[float, float]], output_path: str,
+                          crf: int = 18, preset: str = "veryfast") -> str:
     """
     根据给定的时间区间segments，剪切视频并导出。
     segments: [(start1, end1), (start2, end2), ...]
     output_path: 导出文件路径
     返回导出文件路径
     """
-    # TODO: 使用moviepy/ffmpeg实现视频剪辑
-    pass 
\ No newline at end of file
+    segments = [(float(s), float(e)) for s, e in segments if e - s > TIME_EPS]
+    if not segments:
+        raise ValueError("没有需要保留的时间区间")
+    streams = probe_streams(video_path)
+    video, audio = streams["video"], streams["audio"]
+    if video is None and audio is None:
+        raise ValueError("未找到可剪辑的音视频流")
+    segments = snap_segments(segments, video)
+    if not segments:
+        raise ValueError("没有需要保留的时间区间")
+    work_dir = tempfile.mkdtemp(prefix="smart_render_")
+    try:
+        audio_path = None
+        if audio is not None:
+            audio_path = os.path.join(work_dir, "audio.m4a")
+            _render_audio(video_path, segments, audio_path)
+        if video is None:
+            # 纯音频文件，直接输出裁剪后的音轨
+            shutil.move(audio_path, output_path)
+            return output_path
+        keyframes = probe_keyframes(video_path) if video.get("codec_name") in SMART_ENCODERS else []
+        plan = plan_smart_render(segments, keyframes)
+        n_copy = sum(1 for mode, _, _ in plan if mode == "copy")
+        print(f"[VideoEdit] smart render: {len(plan)} parts, {n_copy} stream-copied")
+        mixed = 0 < n_copy < len(plan)
+        source_params = probe_stream_params(video_path) if mixed else None
+        part_paths = []
+        for i, (mode, start, end) in enumerate(plan):
+            part_path = os.path.join(work_dir, f"part_{i:05d}.mp4")
+            _render_part(video_path, mode, start, end, part_path, video, crf, preset)
+            part_paths.append(part_path)
+            if mode == "encode" and source_params is not None:
+                # 用第一个重编码片段检查能否与拷贝片段拼接，不能时整体重编码
+                if not _parameters_compatible(video, source_params, probe_stream_params(part_path)):
+                    print("[VideoEdit] smart render: stream parameters differ, falling back to full re-encode")
+                    return render_segments_parallel(video_path, segments, output_path, crf=crf, preset=preset)
+                source_params = None
+        video_tag = INBAND_TAGS.get(video.get("codec_name")) if mixed else None
+        _concat_parts(part_paths, audio_path, output_path, work_dir, video_tag)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return output_path
@@ -0,0 +1,165 @@
+"""
+列式转录结果：词和分段的起止时间、标志位存为 NumPy 数组，文字统一放进去重后的字符串表，
+后端和桌面端共用。提供紧凑的二进制编码，用于 /asr 的 binary 响应格式
+"""
+import json
+import struct
+from typing import Any, Dict, List
+import numpy as np
+
+BINARY_MEDIA_TYPE = "application/x-aivideocut-words"
+MAGIC = b"AVCW"
+VERSION = 1
+# 词标志位
+FLAG_GAP = 1
+
+
+def is_gap_text(text: str) -> bool:
+    # 空隙分段的文本形如 "[0.350 sec]"
+    return text.startswith("[") and text.endswith("sec]")
+
+
+class WordStore:
+    def __init__(self, word_start: np.ndarray, word_end: np.ndarray, word_text: np.ndarray, word_flags: np.ndarray,
+                 seg_start: np.ndarray, seg_end: np.ndarray, seg_text: np.ndarray, seg_offset: np.ndarray,
+                 strings: List[str]):
+        """
+        :param seg_offset: 长度为分段数 + 1，第 i 个分段的词为 [seg_offset[i], seg_offset[i+1])
+        :param strings: 字符串表，word_text / seg_text 为其中的下标
+        """
+        self.word_start = word_start
+        self.word_end = word_end
+        self.word_text = word_text
+        self.word_flags = word_flags
+        self.seg_start = seg_start
+        self.seg_end = seg_end
+        self.seg_text = seg_text
+        self.seg_offset = seg_offset
+        self.strings = strings
+
+    def __len__(self):
+        return len(self.word_start)
+
+    @property
+    def n_segments(self) -> int:
+        return len(self.seg_start)
+
+    @property
+    def duration(self) -> float:
+        return float(self.word_end.max()) if len(self.word_end) else 0.0
+
+    @classmethod
+    def from_segments(cls, segments: List[Dict[str, Any]]) -> "WordStore":
+        """
+        从 ASRService.transcribe 的分段列表构建
+        """
+        table: Dict[str, int] = {}
+        strings: List[str] = []
+
+        def intern(text: str) -> int:
+            idx = table.get(text)
+            if idx is None:
+                idx = table[text] = len(strings)
+                strings.append(text)
+            return idx
+
+        n_words = sum(len(seg["words"]) for seg in segments)
+        word_start = np.empty(n_words, dtype=np.float64)
+        word_end = np.empty(n_words, dtype=np.float64)
+        word_text = np.empty(n_words, dtype=np.uint32)
+        word_flags = np.zeros(n_words, dtype=np.uint8)
+        seg_offset = np.zeros(len(segments) + 1, dtype=np.uint32)
+        i = 0
+        for s, seg in enumerate(segments):
+            flag = FLAG_GAP if is_gap_text(seg["text"]) else 0
+            for w in seg["words"]:
+                word_start[i] = w["start"]
+                word_end[i] = w["end"]
+                word_text[i] = intern(w["word"])
+                word_flags[i] = flag
+                i += 1
+            seg_offset[s + 1] = i
+        seg_start = np.array([seg["start"] for seg in segments], dtype=np.float64)
+        seg_end = np.array([seg["end"] for seg in segments], dtype=np.float64)
+        seg_text = np.array([intern(seg["text"]) for seg in segments], dtype=np.uint32)
+        return cls(word_start, word_end, word_text, word_flags, seg_start, seg_end, seg_text, seg_offset, strings)
+
+    def words(self) -> List[Dict[str, Any]]:
+        """
+        展开为桌面端使用的词列表：[{"word", "start", "end", "is_gap"}]
+        """
+        strings = self.strings
+        return [{"word": strings[t], "start": s, "end": e, "is_gap": bool(f & FLAG_GAP)}
+                for t, s, e, f in zip(self.word_text.tolist(), self.word_start.tolist(),
+                                      self.word_end.tolist(), self.word_flags.tolist())]
+
+    def to_segments(self) -> List[Dict[str, Any]]:
+        # 还原为与 /asr JSON 相同的分段列表
+        strings = self.strings
+        words = [{"word": strings[t], "start": s, "end": e}
+                 for t, s, e in zip(self.word_text.tolist(), self.word_start.tolist(), self.word_end.tolist())]
+        offsets = self.seg_offset.tolist()
+        return [{"start": s, "end": e, "text": strings[t], "words": words[offsets[i]:offsets[i + 1]]}
+                for i, (s, e, t) in enumerate(zip(self.seg_start.tolist(), self.seg_end.tolist(),
+                                                  self.seg_text.tolist()))]
+
+    def to_bytes(self) -> bytes:
+        """
+        二进制格式：MAGIC + 头部长度(uint32) + JSON 头部 + 各数组的小端原始字节 + UTF-8 字符串表
+        """
+        encoded = [s.encode("utf-8") for s in self.strings]
+        string_offset = np.zeros(len(encoded) + 1, dtype=np.uint32)
+        np.cumsum([len(b) for b in encoded], out=string_offset[1:])
+        header = json.dumps({"version": VERSION, "words": len(self), "segments": self.n_segments,
+                             "strings": len(encoded)}).encode("utf-8")
+        # 8 字节的数组放在前面，之后的数组依次变窄
+        arrays = [self.word_start, self.word_end, self.seg_start, self.seg_end,
+                  self.word_text, self.seg_text, self.seg_offset, string_offset, self.word_flags]
+        parts = [MAGIC, struct.pack("<I", len(header)), header]
+        parts.extend(np.ascontiguousarray(a, dtype=a.dtype.newbyteorder("<")).tobytes() for a in arrays)
+        parts.append(b"".join(encoded))
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "WordStore":
+        """
+        载荷不完整或字段不合法时抛出 ValueError
+        """
+        if len(data) < 8 or data[:4] != MAGIC:
+            raise ValueError("not a word store payload")
+        (header_len,) = struct.unpack_from("<I", data, 4)
+        pos = 8 + header_len
+        if pos > len(data):
+            raise ValueError("truncated word store header")
+        header = json.loads(data[8:pos].decode("utf-8"))
+        if not isinstance(header, dict):
+            raise ValueError("invalid word store header")
+        if header.get("version") != VERSION:
+            raise ValueError(f"unsupported word store version: {header.get('version')}")
+        n, m, k = (header.get(key) for key in ("words", "segments", "strings"))
+        if not all(isinstance(v, int) and v >= 0 for v in (n, m, k)):
+            raise ValueError("invalid word store header")
+
+        def take(dtype: str, count: int) -> np.ndarray:
+            nonlocal pos
+            size = np.dtype(dtype).itemsize * count
+            if pos + size > len(data):
+                raise ValueError("truncated word store payload")
+            arr = np.frombuffer(data, dtype=dtype, count=count, offset=pos)
+            pos += size
+            return arr
+
+        word_start, word_end = take("<f8", n), take("<f8", n)
+        seg_start, seg_end = take("<f8", m), take("<f8", m)
+        word_text, seg_text = take("<u4", n), take("<u4", m)
+        seg_offset, string_offset = take("<u4", m + 1), take("<u4", k + 1)
+        word_flags = take("u1", n)
+        blob = data[pos:]
+        bounds = string_offset.tolist()
+        offsets = seg_offset.tolist()
+        if (np.any(np.diff(string_offset.astype(np.int64)) < 0) or bounds[0] != 0 or bounds[-1] != len(blob)
+                or np.any(np.diff(seg_offset.astype(np.int64)) < 0) or offsets[0] != 0 or offsets[-1] != n
+                or (n and int(word_text.max()) >= k) or (m and int(seg_text.max()) >= k)):
+            raise ValueError("inconsistent word store payload")
+        strings = [blob[bounds[i]:bounds[i + 1]].decode("utf-8") for i in range(k)]
+        return cls(word_start, word_end, word_text, word_flags, seg_start, seg_end, seg_text, seg_offset, strings)
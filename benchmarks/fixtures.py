@@ -0,0 +1,166 @@
+"""
+合成口播测试素材：测试图案视频 + 按"词"排布的语音，并生成对应的 ASR 结果和剪辑方案，
+完全离线、按随机种子可复现
+"""
+import os
+import json
+import wave
+import random
+import subprocess
+from typing import Any, Dict, List
+import numpy as np
+
+SAMPLE_RATE = 16000
+# 合成"词"使用的汉字
+CHARS = "我们今天来聊一下这个视频剪辑的工具怎么用其实非常简单只需要上传然后等待识别完成就可以"
+# 口头禅，剪辑时优先删除
+FILLERS = ["嗯", "啊", "那个", "就是"]
+
+
+def _plan_words(duration: float, word_rate: float, pause_rate: float, rng: random.Random) -> List[Dict[str, Any]]:
+    """
+    生成词的时间排布：词长 0.15~0.35s，词间 0.02~0.06s；
+    每个词之后以 pause_rate 的概率插入 0.4~1.2s 的停顿
+    """
+    words = []
+    t = 0.3
+    mean_len = 1.0 / word_rate
+    while True:
+        length = rng.uniform(0.6, 1.4) * mean_len * 0.8
+        if t + length > duration - 0.3:
+            break
+        if rng.random() < 0.08:
+            text = rng.choice(FILLERS)
+        else:
+            text = "".join(rng.choice(CHARS) for _ in range(rng.choice((1, 1, 2))))
+        words.append({"word": text, "start": round(t, 3), "end": round(t + length, 3)})
+        t += length + rng.uniform(0.02, 0.06)
+        if rng.random() < pause_rate:
+            t += rng.uniform(0.4, 1.2)
+    return words
+
+
+def _synth_tone(words: List[Dict[str, Any]], duration: float, rng: random.Random) -> np.ndarray:
+    # 每个词是一段带包络的谐波音，音高随机，词之间为低电平噪声
+    audio = (np.random.default_rng(rng.randrange(1 << 30)).standard_normal(int(duration * SAMPLE_RATE)) * 0.002)
+    for w in words:
+        a, b = int(w["start"] * SAMPLE_RATE), int(w["end"] * SAMPLE_RATE)
+        t = np.arange(b - a) / SAMPLE_RATE
+        f0 = rng.uniform(110, 240)
+        tone = sum(np.sin(2 * np.pi * f0 * k * t) / k for k in (1, 2, 3))
+        envelope = np.sin(np.pi * np.linspace(0, 1, b - a))
+        audio[a:b] += 0.3 * tone * envelope
+    return np.clip(audio, -1.0, 1.0).astype(np.float32)
+
+
+def _write_wav(path: str, audio: np.ndarray):
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes((audio * 32767).astype("<i2").tobytes())
+
+
+def _to_segments(words: List[Dict[str, Any]], sentence_gap: float = 0.3) -> List[Dict[str, Any]]:
+    """
+    按停顿把词分句，并在句子之间插入空隙分段，格式与后端 /asr 返回一致
+    """
+    sentences = []
+    for w in words:
+        if sentences and w["start"] - sentences[-1][-1]["end"] < sentence_gap:
+            sentences[-1].append(w)
+        else:
+            sentences.append([w])
+    segments = []
+    last_end = None
+    for sentence in sentences:
+        start, end = sentence[0]["start"], sentence[-1]["end"]
+        if last_end is not None and start > last_end:
+            gap = f"[{start - last_end:.3f} sec]"
+            segments.append({"start": last_end, "end": start, "text": gap,
+                             "words": [{"word": gap, "start": last_end, "end": start}]})
+        segments.append({"start": start, "end": end, "text": "".join(w["word"] for w in sentence),
+                         "words": [dict(w) for w in sentence]})
+        last_end = end
+    return segments
+
+
+def _plan_edit(segments: List[Dict[str, Any]], cut_density: float, rng: random.Random) -> List[Dict[str, Any]]:
+    """
+    模拟用户剪辑：删除所有空隙分段和口头禅，再随机删除 cut_density 比例的词
+    返回保留下来的词（编辑后的 editable_words）
+    """
+    kept = []
+    for seg in segments:
+        is_gap = seg["text"].startswith("[") and seg["text"].endswith("sec]")
+        for w in seg["words"]:
+            if is_gap or w["word"] in FILLERS or rng.random() < cut_density:
+                continue
+            kept.append(w)
+    return kept
+
+
+def keep_ranges_of(words: List[Dict[str, Any]]) -> List[List[float]]:
+    # 与桌面端 MainWindow.get_keep_ranges 相同的合并规则
+    keep_ranges = []
+    for w in words:
+        if not keep_ranges or abs(w["start"] - keep_ranges[-1][1]) > 1e-3:
+            keep_ranges.append([w["start"], w["end"]])
+        else:
+            keep_ranges[-1][1] = w["end"]
+    return keep_ranges
+
+
+def make_fixture(out_dir: str, duration: float = 60.0, cut_density: float = 0.1, word_rate: float = 4.0,
+                 pause_rate: float = 0.15, width: int = 1280, height: int = 720, fps: int = 30,
+                 speech: str = "tone", seed: int = 0) -> Dict[str, Any]:
+    """
+    生成一份素材，已存在且参数相同时直接复用。
+    :param cut_density: 剪辑时额外删除的词的比例（空隙和口头禅总是删除）
+    :param pause_rate: 每个词之后出现停顿的概率，决定空隙分段的密度
+    :param speech: tone 为合成音节；flite 用 ffmpeg 的 flite 滤镜朗读（需 ffmpeg 编译时启用 libflite）
+    :return: {"video", "audio", "segments", "edited_words", "keep_ranges", "params"}
+    """
+    params = dict(duration=duration, cut_density=cut_density, word_rate=word_rate, pause_rate=pause_rate,
+                  width=width, height=height, fps=fps, speech=speech, seed=seed)
+    os.makedirs(out_dir, exist_ok=True)
+    meta_path = os.path.join(out_dir, "fixture.json")
+    if os.path.exists(meta_path):
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta["params"] == params and os.path.exists(meta["video"]):
+            return meta
+
+    rng = random.Random(seed)
+    words = _plan_words(duration, word_rate, pause_rate, rng)
+    audio_path = os.path.join(out_dir, "speech.wav")
+    video_path = os.path.join(out_dir, "talking_head.mp4")
+    if speech == "flite":
+        text = "".join(w["word"] for w in words)
+        audio_input = ["-f", "lavfi", "-i", f"flite=text='{text}':voice=slt"]
+    else:
+        _write_wav(audio_path, _synth_tone(words, duration, rng))
+        audio_input = ["-i", audio_path]
+    # 测试图案 + 中间一个随语音跳动的色块代替人脸；GOP 2 秒，接近常见手机录制
+    cmd = ["ffmpeg", "-y", "-v", "error",
+           "-f", "lavfi", "-i", f"testsrc2=size={width}x{height}:rate={fps}:duration={duration}",
+           *audio_input,
+           "-filter_complex", f"[0:v]drawbox=x=iw/2-120:y=ih/2-150:w=240:h=300:color=0xd8a080@1:t=fill[v]",
+           "-map", "[v]", "-map", "1:a",
+           "-c:v", "libx264", "-preset", "veryfast", "-g", str(fps * 2), "-pix_fmt", "yuv420p",
+           "-c:a", "aac", "-b:a", "128k", "-t", str(duration), video_path]
+    subprocess.run(cmd, check=True)
+
+    segments = _to_segments(words)
+    edited_words = _plan_edit(segments, cut_density, rng)
+    meta = {
+        "params": params,
+        "video": video_path,
+        "audio": audio_path if speech != "flite" else None,
+        "segments": segments,
+        "edited_words": edited_words,
+        "keep_ranges": keep_ranges_of(edited_words),
+    }
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    return meta
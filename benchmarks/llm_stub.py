@@ -0,0 +1,99 @@
+"""
+本地 LLM 替身：OpenAI 兼容的 /chat/completions 接口，按 backend/llm.py 的编号提示词回复，
+删除口头禅、停顿和紧邻的重复条目。可注入延迟和随机失败，用于测试分窗口并发、限速与重试，无需联网
+
+    python benchmarks/llm_stub.py --port 8001 --latency 0.5 --fail-rate 0.1
+    # 桌面端 config.json 中设置 "BASE_URL": "http://127.0.0.1:8001/v1"
+"""
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Tuple
+
+from fixtures import FILLERS
+
+ITEM_RE = re.compile(r"^(\d+)\t(.*)$", re.M)
+RANGE_RE = re.compile(r"编号 (\d+) 到 (\d+)")
+
+
+def decide(prompt: str) -> List[int]:
+    items = [(int(i), w) for i, w in ITEM_RE.findall(prompt)]
+    match = RANGE_RE.search(prompt)
+    lo, hi = (int(match.group(1)), int(match.group(2))) if match else (0, len(items) - 1)
+    keep = []
+    prev = None
+    for i, w in items:
+        is_gap = w.startswith("[") and w.endswith("sec]")
+        if lo <= i <= hi and not is_gap and w not in FILLERS and w != prev:
+            keep.append(i)
+        prev = w
+    return keep
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    fail_rate = 0.0
+    calls = 0
+    _lock = threading.Lock()
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def reply(self, prompt: str) -> str:
+        # 回复内容，子类可以覆盖以模拟格式错误的回复
+        return json.dumps(decide(prompt))
+
+    def do_POST(self):
+        with StubHandler._lock:
+            StubHandler.calls += 1
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        time.sleep(self.latency)
+        if not self.path.endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        if random.random() < self.fail_rate:
+            self.send_error(503, "injected failure")
+            return
+        prompt = body["messages"][-1]["content"]
+        reply = {"choices": [{"message": {"role": "assistant", "content": self.reply(prompt)}}]}
+        data = json.dumps(reply).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def start_stub(port: int = 0, latency: float = 0.0, fail_rate: float = 0.0,
+               handler_cls: type = StubHandler) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    在后台线程启动替身服务，返回 (server, base_url)；用完调用 server.shutdown()。
+    handler_cls 可以是覆盖了 reply 的 StubHandler 子类
+    """
+    handler = type("Handler", (handler_cls,), {"latency": latency, "fail_rate": fail_rate})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 LLM 替身服务")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的固定延迟（秒）")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="随机返回 503 的比例")
+    args = parser.parse_args()
+    server, base_url = start_stub(args.port, args.latency, args.fail_rate)
+    print(f"[LLMStub] listening on {base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,512 @@
+"""
+端到端性能基准：生成合成素材，逐项计时上传、音频解码、ASR、对齐、导出、预览、
+LLM 分窗口优化、时间轴缩略图和编辑器刷新，结果写入 JSON，并可与基线对比找出性能回退。
+
+用法：
+    python benchmarks/run.py --duration 120 --repeat 3
+    python benchmarks/run.py --save-baseline          # 把本次结果存为基线
+    python benchmarks/run.py --cases export_smart,preview_edit --threshold 0.1
+"""
+import os
+import io
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import importlib.util
+import statistics
+import subprocess
+import contextlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.join(ROOT, "benchmarks")
+sys.path.append(os.path.join(ROOT, "backend"))
+sys.path.append(os.path.join(ROOT, "desktop_python"))
+from fixtures import make_fixture, keep_ranges_of
+
+DEFAULT_WORK_DIR = os.path.join(os.path.expanduser("~"), ".aivideocut", "bench")
+DEFAULT_OUT = os.path.join(BENCH_DIR, "results.json")
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+
+
+class SkipBenchmark(Exception):
+    """当前环境无法运行该项（缺少依赖等），记为 skipped"""
+
+
+class Context:
+    def __init__(self, fixture: Dict[str, Any], work_dir: str, args):
+        self.fixture = fixture
+        self.work_dir = work_dir
+        self.args = args
+
+    @property
+    def video(self) -> str:
+        return self.fixture["video"]
+
+    @property
+    def all_words(self) -> List[Dict[str, Any]]:
+        return [w for seg in self.fixture["segments"] for w in seg["words"]]
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.work_dir, name)
+
+
+# 基准项：名称 -> fn(ctx) 返回 (每次计时前的准备函数或 None, 被计时的函数)
+CASES: "OrderedDict[str, Callable[[Context], Tuple[Optional[Callable], Callable]]]" = OrderedDict()
+
+
+def case(name: str):
+    def register(fn):
+        CASES[name] = fn
+        return fn
+    return register
+
+
+def _require(module: str):
+    try:
+        return __import__(module)
+    except ImportError as e:
+        raise SkipBenchmark(f"{module} unavailable: {e}")
+
+
+def _require_ffprobe():
+    # 导出和预览依赖 ffprobe 读取时长、帧率和编码参数
+    from video_edit import FFPROBE
+    if shutil.which(FFPROBE) is None:
+        raise SkipBenchmark(f"ffprobe not found: {FFPROBE}")
+
+
+_qt_app = None
+
+
+def _qt():
+    # 无显示器环境下使用 offscreen 平台
+    global _qt_app
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    widgets = _require("PyQt5.QtWidgets").QtWidgets
+    _qt_app = widgets.QApplication.instance() or widgets.QApplication([])
+    return _qt_app
+
+
+def _desktop_main():
+    # backend 和 desktop_python 都有 main.py，桌面端的按文件路径单独加载
+    module = sys.modules.get("desktop_main")
+    if module is None:
+        spec = importlib.util.spec_from_file_location("desktop_main", os.path.join(ROOT, "desktop_python", "main.py"))
+        module = importlib.util.module_from_spec(spec)
+        try:
+            spec.loader.exec_module(module)
+        except ImportError as e:
+            raise SkipBenchmark(f"desktop client unavailable: {e}")
+        sys.modules["desktop_main"] = module
+    return module
+
+
+@case("upload")
+def bench_upload(ctx: Context):
+    # 进程内调用后端的分块上传接口，不经过网络，衡量写盘与哈希的开销
+    testclient = _require("fastapi.testclient").testclient
+    import main as backend_main
+    client = testclient.TestClient(backend_main.app)
+    chunk_size = 8 * 1024 * 1024
+
+    def run():
+        size = os.path.getsize(ctx.video)
+        upload_id = client.post("/uploads", data={"filename": os.path.basename(ctx.video), "size": size}).json()["upload_id"]
+        offset = 0
+        with open(ctx.video, "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                client.put(f"/uploads/{upload_id}", params={"offset": offset}, content=chunk).raise_for_status()
+                offset += len(chunk)
+        client.post(f"/uploads/{upload_id}/complete").raise_for_status()
+        path, _, _ = backend_main.upload_manager.take(upload_id)
+        os.remove(path)
+
+    return None, run
+
+
+@case("audio_decode")
+def bench_audio_decode(ctx: Context):
+    from audio_io import decode_audio
+    return None, lambda: decode_audio(ctx.video)
+
+
+@case("audio_load_cached")
+def bench_audio_load_cached(ctx: Context):
+    # 解码缓存命中时的读取（内存映射 .npy）
+    from audio_io import load_audio
+    load_audio(ctx.video)
+    return None, lambda: float(load_audio(ctx.video)[::1000].sum())
+
+
+@case("asr")
+def bench_asr(ctx: Context):
+    from engines import ENGINES
+    from asr_service import asr_service
+    engine = ctx.args.asr_engine or asr_service.engine
+    if engine not in ENGINES or not ENGINES[engine].available():
+        raise SkipBenchmark(f"ASR engine not installed: {engine}")
+    kwargs = dict(model_name=ctx.args.asr_model, engine=engine, chunk_seconds=ctx.args.asr_chunk_seconds)
+    # 模型加载不计入
+    asr_service.warmup([f"{engine}:{ctx.args.asr_model}"])
+    return None, lambda: asr_service.transcribe(ctx.video, **kwargs)
+
+
+@case("align")
+def bench_align(ctx: Context):
+    # 模拟 LLM 返回删减后的词序列，与原始 ASR 词对齐
+    from align import align_words
+    llm_words = [{"word": w["word"]} for w in ctx.fixture["edited_words"]]
+    orig_words = ctx.all_words
+    return None, lambda: align_words(llm_words, orig_words)
+
+
+@case("autocut")
+def bench_autocut(ctx: Context):
+    # 规则自动粗剪：从分段列表构建列式结构并给出编辑列表（/autocut 的路径）
+    from word_store import WordStore
+    from autocut import autocut_store, cut_list
+    segments = ctx.fixture["segments"]
+
+    def run():
+        store = WordStore.from_segments(segments)
+        cut_list(store, autocut_store(store))
+
+    return None, run
+
+
+@case("llm_optimize")
+def bench_llm_optimize(ctx: Context):
+    # 分窗口并发请求本地 LLM 替身，每个请求带固定延迟，衡量并发和拼接的效果
+    from llm import optimize_words
+    from llm_stub import start_stub
+    server, base_url = start_stub(latency=ctx.args.llm_latency)
+    words = ctx.all_words
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            optimize_words(words, "stub", "stub", base_url, window_items=ctx.args.llm_window, rate_limit=0,
+                           use_cache=False)
+
+    return None, run
+
+
+@case("llm_reoptimize")
+def bench_llm_reoptimize(ctx: Context):
+    # 优化过一次后删掉中间一个词再优化：只有变化的窗口需要重新请求
+    from disk_cache import DiskLRUCache
+    from llm import optimize_words
+    from llm_stub import start_stub
+    server, base_url = start_stub(latency=ctx.args.llm_latency)
+    words = ctx.all_words
+    edited = words[:len(words) // 2] + words[len(words) // 2 + 1:]
+    cache_dir = ctx.path("llm_cache")
+    state = {}
+
+    def optimize(ws):
+        with contextlib.redirect_stdout(io.StringIO()):
+            optimize_words(ws, "stub", "stub", base_url, window_items=ctx.args.llm_window, rate_limit=0,
+                           cache=state["cache"])
+
+    def setup():
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        state["cache"] = DiskLRUCache(cache_dir, 64 * 1024 * 1024, suffix=".json")
+        optimize(words)
+
+    return setup, lambda: optimize(edited)
+
+
+@case("export_smart")
+def bench_export_smart(ctx: Context):
+    _require_ffprobe()
+    from video_edit import cut_video_by_segments
+    out = ctx.path("export_smart.mp4")
+    return None, lambda: cut_video_by_segments(ctx.video, ctx.fixture["keep_ranges"], out)
+
+
+@case("export_parallel")
+def bench_export_parallel(ctx: Context):
+    _require_ffprobe()
+    from video_edit import render_segments_parallel
+    out = ctx.path("export_parallel.mp4")
+    return None, lambda: render_segments_parallel(ctx.video, ctx.fixture["keep_ranges"], out)
+
+
+def _fresh_cache(name: str, ctx: Context):
+    from disk_cache import DiskLRUCache
+    cache_dir = ctx.path(name)
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    return DiskLRUCache(cache_dir, 4 * 1024 ** 3, suffix=".mov")
+
+
+@case("preview_cold")
+def bench_preview_cold(ctx: Context):
+    # 首次预览：所有保留区间都要渲染
+    _require_ffprobe()
+    from video_edit import render_segments_cached
+    out = ctx.path("preview_cold.mp4")
+    state = {}
+
+    def setup():
+        state["cache"] = _fresh_cache("preview_cold_cache", ctx)
+
+    return setup, lambda: render_segments_cached(ctx.video, ctx.fixture["keep_ranges"], out, state["cache"])
+
+
+@case("preview_edit")
+def bench_preview_edit(ctx: Context):
+    # 增量预览：缓存已有上一版的区间，再删掉中间一个词后重新预览
+    _require_ffprobe()
+    from video_edit import render_segments_cached
+    words = ctx.fixture["edited_words"]
+    if len(words) < 3:
+        raise SkipBenchmark("fixture too short")
+    edited = words[:len(words) // 2] + words[len(words) // 2 + 1:]
+    out = ctx.path("preview_edit.mp4")
+    state = {}
+
+    def setup():
+        state["cache"] = _fresh_cache("preview_edit_cache", ctx)
+        render_segments_cached(ctx.video, ctx.fixture["keep_ranges"], out, state["cache"])
+
+    return setup, lambda: render_segments_cached(ctx.video, keep_ranges_of(edited), out, state["cache"])
+
+
+@case("thumbnails")
+def bench_thumbnails(ctx: Context):
+    # 时间轴帧带：从开始提取到所有缩略图就绪（不使用磁盘缓存）
+    app = _qt()
+    from timeline_widget import TimelineWidget
+    duration = ctx.fixture["params"]["duration"]
+    timeout = 600
+    widget = TimelineWidget()
+    widget.resize(1200, 60)
+
+    def setup():
+        from thumbnails import get_thumb_cache
+        get_thumb_cache().clear()
+
+    def run():
+        widget.set_video(ctx.video, duration)
+        deadline = time.time() + timeout
+        while not widget.thumb_job.complete:
+            if widget.thumb_job.error:
+                raise RuntimeError(widget.thumb_job.error)
+            if time.time() > deadline:
+                raise TimeoutError("thumbnail extraction timed out")
+            app.processEvents()
+            time.sleep(0.005)
+        widget.repaint()
+
+    return setup, run
+
+
+@case("editor_refresh")
+def bench_editor_refresh(ctx: Context):
+    # 整段重建编辑器（ASR 完成、撤销时的路径）
+    app = _qt()
+    from editor_widget import EditorWidget
+    editor = EditorWidget()
+    words = ctx.all_words
+
+    def run():
+        editor.refresh(words)
+        app.processEvents()
+
+    return None, run
+
+
+@case("editor_delete")
+def bench_editor_delete(ctx: Context):
+    # 删除中间的一个词（on_word_deleted 的路径），只应更新被删除的行
+    app = _qt()
+    from editor_widget import EditorWidget
+    editor = EditorWidget()
+    editor.resize(400, 600)
+
+    def setup():
+        editor.refresh(list(ctx.all_words))
+        app.processEvents()
+
+    def run():
+        editor.remove_rows([editor.count() // 2])
+        app.processEvents()
+
+    return setup, run
+
+
+def run_case(name: str, ctx: Context, repeat: int) -> Dict[str, Any]:
+    try:
+        setup, fn = CASES[name](ctx)
+        runs = []
+        for _ in range(repeat):
+            if setup is not None:
+                setup()
+            t0 = time.perf_counter()
+            fn()
+            runs.append(time.perf_counter() - t0)
+    except SkipBenchmark as e:
+        return {"status": "skipped", "reason": str(e)}
+    except Exception as e:
+        return {"status": "error", "error": f"{type(e).__name__}: {e}"}
+    return {
+        "status": "ok",
+        "runs": [round(r, 6) for r in runs],
+        "median": round(statistics.median(runs), 6),
+        "min": round(min(runs), 6),
+        "mean": round(statistics.mean(runs), 6),
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float,
+            min_delta: float = 0.005, selected: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    按中位数与基线对比，变慢超过 threshold（比例）且超过 min_delta 秒记为回退，
+    毫秒以下的项只看比例容易被计时噪声误判。
+    本次出错的项记为 error；基线中正常、本次选中却没有结果（缺失或被跳过）的项记为 missing，
+    两者和回退一样视为失败，避免回退被报错或跳过掩盖
+    """
+    rows = []
+    base_results = baseline.get("results", {})
+    for name, current in results["results"].items():
+        base = base_results.get(name)
+        base_median = base["median"] if base and base.get("status") == "ok" else None
+        if current.get("status") == "error":
+            rows.append({"case": name, "baseline": base_median, "current": None, "change": None,
+                         "verdict": "error", "detail": current.get("error")})
+            continue
+        if current.get("status") != "ok":
+            if base_median is not None:
+                rows.append({"case": name, "baseline": base_median, "current": None, "change": None,
+                             "verdict": "missing", "detail": current.get("reason")})
+            continue
+        if base_median is None:
+            continue
+        ratio = current["median"] / base["median"] if base["median"] > 0 else 1.0
+        delta = abs(current["median"] - base["median"])
+        if ratio > 1 + threshold and delta > min_delta:
+            verdict = "regression"
+        elif ratio < 1 - threshold and delta > min_delta:
+            verdict = "improvement"
+        else:
+            verdict = "ok"
+        rows.append({"case": name, "baseline": base["median"], "current": current["median"],
+                     "change": round(ratio - 1, 4), "verdict": verdict})
+    for name, base in base_results.items():
+        if name in results["results"] or base.get("status") != "ok":
+            continue
+        if selected is not None and name not in selected:
+            continue
+        rows.append({"case": name, "baseline": base["median"], "current": None, "change": None,
+                     "verdict": "missing", "detail": "not in current run"})
+    return rows
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="AIVideoCut 端到端性能基准")
+    parser.add_argument("--cases", default=",".join(CASES), help="逗号分隔的基准项，默认全部")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--duration", type=float, default=60.0, help="素材时长（秒）")
+    parser.add_argument("--cut-density", type=float, default=0.1, help="剪辑时额外删除的词的比例")
+    parser.add_argument("--pause-rate", type=float, default=0.15, help="每个词之后出现停顿的概率")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--speech", choices=("tone", "flite"), default="tone")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--asr-engine", default=None, help="默认使用后端配置的 ASR_ENGINE")
+    parser.add_argument("--asr-model", default="tiny")
+    parser.add_argument("--asr-chunk-seconds", type=float, default=0)
+    parser.add_argument("--llm-window", type=int, default=100, help="llm_optimize 每个窗口的词数")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="LLM 替身每个请求的延迟（秒）")
+    parser.add_argument("--work-dir", default=DEFAULT_WORK_DIR, help="素材和中间文件目录")
+    parser.add_argument("--out", default=DEFAULT_OUT)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="把本次结果写入基线文件")
+    parser.add_argument("--threshold", type=float, default=0.15, help="变慢超过该比例判为回退")
+    parser.add_argument("--min-delta", type=float, default=0.005, help="变化小于该秒数时不判为回退")
+    args = parser.parse_args(argv)
+
+    names = [n for n in args.cases.split(",") if n]
+    unknown = [n for n in names if n not in CASES]
+    if unknown:
+        parser.error(f"unknown cases: {unknown}, available: {list(CASES)}")
+
+    os.makedirs(args.work_dir, exist_ok=True)
+    # 基准使用独立的缓存目录，不影响也不受日常使用的缓存影响
+    os.environ.setdefault("AIVIDEOCUT_CACHE_DIR", os.path.join(args.work_dir, "cache"))
+    fixture_dir = os.path.join(args.work_dir, f"fixture_{int(args.duration)}s_seed{args.seed}")
+    print(f"[Bench] preparing fixture in {fixture_dir}")
+    fixture = make_fixture(fixture_dir, duration=args.duration, cut_density=args.cut_density,
+                           pause_rate=args.pause_rate, width=args.width, height=args.height,
+                           fps=args.fps, speech=args.speech, seed=args.seed)
+    ctx = Context(fixture, args.work_dir, args)
+
+    results = {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "repeat": args.repeat,
+            "fixture": fixture["params"],
+            "words": len(ctx.all_words),
+            "keep_ranges": len(fixture["keep_ranges"]),
+        },
+        "results": {},
+    }
+    for name in names:
+        print(f"[Bench] {name} ...", flush=True)
+        result = run_case(name, ctx, args.repeat)
+        results["results"][name] = result
+        if result["status"] == "ok":
+            print(f"[Bench] {name}: median {result['median']:.3f}s (min {result['min']:.3f}s)")
+        else:
+            print(f"[Bench] {name}: {result['status']} - {result.get('reason') or result.get('error')}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"[Bench] results written to {args.out}")
+
+    exit_code = 0
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"[Bench] baseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("fixture") != fixture["params"]:
+            print("[Bench] warning: baseline was recorded with different fixture parameters")
+        rows = compare(results, baseline, args.threshold, args.min_delta, selected=names)
+        print(f"{'case':<20}{'baseline':>10}{'current':>10}{'change':>9}  verdict")
+        for row in rows:
+            if row["change"] is None:
+                base = "-" if row["baseline"] is None else f"{row['baseline']:.3f}"
+                print(f"{row['case']:<20}{base:>10}{'-':>10}{'-':>9}  {row['verdict']} ({row['detail']})")
+            else:
+                print(f"{row['case']:<20}{row['baseline']:>10.3f}{row['current']:>10.3f}{row['change']:>+9.1%}  {row['verdict']}")
+        if any(row["verdict"] in ("regression", "error", "missing") for row in rows):
+            exit_code = 1
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""
+剪辑历史：识别结果作为不可变的基础词表，删除只在墓碑位图上做标记，
+每次操作只记录被删除词在基础词表中的下标，撤销/重做的内存和耗时都只与本次删除的词数有关。
+可见行号与基础下标之间用树状数组（Fenwick）互相换算，O(log n)
+"""
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+# 默认最多保留的撤销步数，更早的操作直接丢弃（已删除的词保持删除）
+EDIT_HISTORY_LIMIT = 500
+
+
+class Fenwick:
+    """
+    0/1 计数的树状数组：prefix(i) 为前 i 个位置的存活数，select(k) 为第 k 个（从 0 开始）存活位置
+    """
+
+    def __init__(self, flags: np.ndarray):
+        n = len(flags)
+        tree = [0] * (n + 1)
+        for i, v in enumerate(flags.tolist(), 1):
+            tree[i] += v
+            j = i + (i & -i)
+            if j <= n:
+                tree[j] += tree[i]
+        self.n = n
+        self.tree = tree
+        self.top = 1 << max(n.bit_length() - 1, 0) if n else 0
+
+    def add(self, i: int, delta: int):
+        i += 1
+        while i <= self.n:
+            self.tree[i] += delta
+            i += i & -i
+
+    def prefix(self, i: int) -> int:
+        s = 0
+        while i > 0:
+            s += self.tree[i]
+            i -= i & -i
+        return s
+
+    def select(self, k: int) -> int:
+        pos = 0
+        step = self.top
+        while step:
+            nxt = pos + step
+            if nxt <= self.n and self.tree[nxt] <= k:
+                pos = nxt
+                k -= self.tree[nxt]
+            step >>= 1
+        return pos
+
+
+class EditHistory:
+    def __init__(self, limit: int = EDIT_HISTORY_LIMIT):
+        self.limit = limit
+        self.reset([])
+
+    def reset(self, words: List[Dict]):
+        # 新的识别结果作为基础词表，清空历史
+        self.base = list(words)
+        self.alive = np.ones(len(self.base), dtype=bool)
+        self.fenwick = Fenwick(self.alive)
+        self.undo_stack = deque(maxlen=self.limit)
+        self.redo_stack = []
+
+    def visible_words(self) -> List[Dict]:
+        return [self.base[i] for i in np.flatnonzero(self.alive)]
+
+    def base_index(self, row: int) -> int:
+        return self.fenwick.select(row)
+
+    def row_of(self, base_idx: int) -> int:
+        return self.fenwick.prefix(base_idx)
+
+    def can_undo(self) -> bool:
+        return bool(self.undo_stack)
+
+    def can_redo(self) -> bool:
+        return bool(self.redo_stack)
+
+    def _kill(self, base_idxs: np.ndarray):
+        self.alive[base_idxs] = False
+        for b in base_idxs.tolist():
+            self.fenwick.add(b, -1)
+
+    def delete_rows(self, rows: List[int]) -> np.ndarray:
+        """
+        删除当前可见的若干行，记入历史并清空重做栈，返回被删除词的基础下标（升序）
+        """
+        count = self.fenwick.prefix(self.fenwick.n)
+        rows = sorted({r for r in rows if 0 <= r < count})
+        # 先把所有行号换算成基础下标，再统一标记，避免换算过程中行号变化
+        base_idxs = np.array([self.base_index(r) for r in rows], dtype=np.int64)
+        if len(base_idxs):
+            self._kill(base_idxs)
+            self.undo_stack.append(base_idxs)
+            self.redo_stack.clear()
+        return base_idxs
+
+    def undo(self) -> Optional[List[Tuple[int, Dict]]]:
+        """
+        恢复最近一次删除，返回 [(恢复后的可见行号, 词), ...]（行号升序），按顺序插入即可还原
+        """
+        if not self.undo_stack:
+            return None
+        base_idxs = self.undo_stack.pop()
+        self.alive[base_idxs] = True
+        for b in base_idxs.tolist():
+            self.fenwick.add(b, 1)
+        self.redo_stack.append(base_idxs)
+        return [(self.row_of(b), self.base[b]) for b in base_idxs.tolist()]
+
+    def redo(self) -> Optional[List[int]]:
+        """
+        重新执行最近撤销的删除，返回删除前这些词的可见行号
+        """
+        if not self.redo_stack:
+            return None
+        base_idxs = self.redo_stack.pop()
+        rows = [self.row_of(b) for b in base_idxs.tolist()]
+        self._kill(base_idxs)
+        self.undo_stack.append(base_idxs)
+        return rows
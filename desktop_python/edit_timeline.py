@@ -0,0 +1,53 @@
+from bisect import bisect_right
+
+
+class EditTimeline:
+    """
+    剪辑时间轴：由保留区间组成，负责源视频时间和剪辑后时间的互相换算。
+    keep_ranges: [[start, end], ...]，按时间升序且互不重叠（秒）
+    """
+    def __init__(self, keep_ranges):
+        self.ranges = [(float(s), float(e)) for s, e in keep_ranges if e > s]
+        self.starts = [s for s, _ in self.ranges]
+        # offsets[i]：第 i 个保留区间在剪辑后时间轴上的起点
+        self.offsets = []
+        total = 0.0
+        for s, e in self.ranges:
+            self.offsets.append(total)
+            total += e - s
+        self.duration = total
+
+    def __bool__(self):
+        return bool(self.ranges)
+
+    def range_index_at(self, t):
+        # 源时间 t 所在的保留区间下标，不在任何区间内返回 -1
+        i = bisect_right(self.starts, t) - 1
+        if i >= 0 and t < self.ranges[i][1]:
+            return i
+        return -1
+
+    def next_range_index(self, t):
+        # 源时间 t 之后（含 t 所在区间）的第一个保留区间下标，没有返回 -1
+        i = self.range_index_at(t)
+        if i >= 0:
+            return i
+        i = bisect_right(self.starts, t)
+        return i if i < len(self.ranges) else -1
+
+    def to_edit_time(self, t):
+        # 源时间 -> 剪辑后时间，落在删除区间内的时间对齐到下一个保留区间的起点
+        i = self.next_range_index(t)
+        if i < 0:
+            return self.duration
+        start, _ = self.ranges[i]
+        return self.offsets[i] + max(0.0, t - start)
+
+    def to_source_time(self, edit_t):
+        # 剪辑后时间 -> 源时间
+        if not self.ranges:
+            return 0.0
+        edit_t = min(max(edit_t, 0.0), self.duration)
+        i = max(0, bisect_right(self.offsets, edit_t) - 1)
+        start, end = self.ranges[i]
+        return min(end, start + edit_t - self.offsets[i])
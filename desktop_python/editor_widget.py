@@ -1,52 +1,154 @@
-from PyQt5.QtWidgets import QListWidget, QListWidgetItem, QListView
+from PyQt5.QtWidgets import QListView, QAbstractItemView
 from PyQt5.QtGui import QFont, QColor
-from PyQt5.QtCore import Qt, pyqtSignal
+from PyQt5.QtCore import Qt, pyqtSignal, QAbstractListModel, QModelIndex, QItemSelection, QItemSelectionModel
+from word_index import WordIndex
 
-class EditorWidget(QListWidget):
+# 批量布局时每批的行数，长文稿也不会一次性阻塞界面
+LAYOUT_BATCH_SIZE = 500
+
+
+class WordListModel(QAbstractListModel):
+    """
+    以 editable_words 列表为数据源的只读模型，视图只为可见的行取数据
+    """
+    GAP_BACKGROUND = QColor('#eee')
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.words = []
+        self.word_index = WordIndex()  # 与 words 同步的时间索引
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.words)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.words):
+            return None
+        w = self.words[index.row()]
+        if role == Qt.DisplayRole:
+            return w['word']
+        if role == Qt.BackgroundRole and w.get('is_gap'):
+            return self.GAP_BACKGROUND
+        return None
+
+    def set_words(self, words):
+        self.beginResetModel()
+        self.words = words
+        self.word_index.rebuild(words)
+        self.endResetModel()
+
+    def append_words(self, words):
+        if not words:
+            return
+        first = len(self.words)
+        self.beginInsertRows(QModelIndex(), first, first + len(words) - 1)
+        self.words.extend(words)
+        self.word_index.append(words)
+        self.endInsertRows()
+
+    def insert_rows(self, items):
+        """
+        items: [(行号, 词), ...]，行号升序且为插入完成后的位置；连续的行合并为一次 beginInsertRows
+        """
+        pos = 0
+        while pos < len(items):
+            first = items[pos][0]
+            run = [items[pos][1]]
+            pos += 1
+            while pos < len(items) and items[pos][0] == first + len(run):
+                run.append(items[pos][1])
+                pos += 1
+            self.beginInsertRows(QModelIndex(), first, first + len(run) - 1)
+            self.words[first:first] = run
+            self.word_index.insert(first, run)
+            self.endInsertRows()
+
+    def remove_rows(self, idxs):
+        """
+        删除给定下标的行（会修改 words 列表本身），连续的下标合并为一次 beginRemoveRows，
+        代价只与删除的行数有关
+        """
+        idxs = sorted({i for i in idxs if 0 <= i < len(self.words)}, reverse=True)
+        self.word_index.remove(idxs)
+        pos = 0
+        while pos < len(idxs):
+            last = first = idxs[pos]
+            pos += 1
+            while pos < len(idxs) and idxs[pos] == first - 1:
+                first = idxs[pos]
+                pos += 1
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self.words[first:last + 1]
+            self.endRemoveRows()
+
+
+class EditorWidget(QListView):
     wordClicked = pyqtSignal(float)  # 新增：点击字时发射该字的起始时间
     wordDeleted = pyqtSignal(list)  # 新增：发射被删除的索引列表
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.setSelectionMode(QListWidget.ExtendedSelection)
+        self.word_model = WordListModel(self)
+        self.setModel(self.word_model)
+        self.setSelectionMode(QAbstractItemView.ExtendedSelection)
         self.setFont(QFont("PingFang SC", 16))
         self.setMinimumHeight(120)
         self.setViewMode(QListView.IconMode)
+        self.setMovement(QListView.Static)
         self.setFlow(QListView.LeftToRight)
         self.setWrapping(True)
         self.setResizeMode(QListView.Adjust)
+        self.setLayoutMode(QListView.Batched)
+        self.setBatchSize(LAYOUT_BATCH_SIZE)
         self.setSpacing(2)
         self.setSelectionRectVisible(True)
-        self.editable_words = []
-        self.itemClicked.connect(self._on_item_clicked)
+        self.clicked.connect(self._on_index_clicked)
+
+    @property
+    def editable_words(self):
+        return self.word_model.words
+
+    def count(self):
+        return self.word_model.rowCount()
 
     def refresh(self, editable_words, cursor_pos=None, selection_len=0):
-        self.clear()
-        self.editable_words = editable_words  # 保存用于高亮
-        for idx, w in enumerate(editable_words):
-            item = QListWidgetItem(w['word'])
-            if w.get('is_gap'):
-                item.setBackground(QColor('#eee'))
-            self.addItem(item)
-        if cursor_pos is not None:
-            self.setCurrentRow(min(max(cursor_pos, 0), self.count()-1))
+        # 整体替换（加载识别结果、撤销），单个删除请用 remove_rows
+        self.word_model.set_words(editable_words)  # 保存用于高亮
+        if cursor_pos is not None and self.count() > 0:
+            cursor_pos = min(max(cursor_pos, 0), self.count() - 1)
+            self.setCurrentIndex(self.word_model.index(cursor_pos))
             if selection_len > 0:
-                for i in range(cursor_pos, min(cursor_pos+selection_len, self.count())):
-                    self.item(i).setSelected(True)
+                last = min(cursor_pos + selection_len, self.count()) - 1
+                selection = QItemSelection(self.word_model.index(cursor_pos), self.word_model.index(last))
+                self.selectionModel().select(selection, QItemSelectionModel.Select)
 
-    def _on_item_clicked(self, item):
-        idx = self.row(item)
+    def append_words(self, words):
+        # 流式识别时在末尾追加新识别出的词
+        self.word_model.append_words(words)
+
+    def insert_rows(self, items):
+        # 撤销删除时插回对应的行
+        self.word_model.insert_rows(items)
+
+    def remove_rows(self, idxs):
+        self.word_model.remove_rows(idxs)
+
+    def _on_index_clicked(self, index):
+        idx = index.row()
         if 0 <= idx < len(self.editable_words):
             time = self.editable_words[idx]['start']
             self.wordClicked.emit(time)
 
     def highlight_word_at(self, time):
-        # 找到当前时间属于哪个字
-        for i, w in enumerate(self.editable_words):
-            if w['start'] <= time < w['end']:
-                self.setCurrentRow(i)
-                self.scrollToItem(self.item(i))
-                return
-        self.setCurrentRow(-1)
+        # 二分查找当前时间属于哪个字；播放时每 100ms 调用一次，高亮没变时不重复滚动
+        row = self.word_model.word_index.word_at(time)
+        if row == self.currentIndex().row():
+            return
+        if row < 0:
+            self.setCurrentIndex(QModelIndex())
+            return
+        index = self.word_model.index(row)
+        self.setCurrentIndex(index)
+        self.scrollTo(index)
 
     def keyPressEvent(self, event):
         if event.key() in (Qt.Key_Delete, Qt.Key_Backspace):
@@ -55,4 +157,4 @@ class EditorWidget(QListWidget):
                 idxs = sorted([i.row() for i in selected], reverse=True)
                 self.wordDeleted.emit(idxs)
                 return
-        super().keyPressEvent(event) 
\ No newline at end of file
+        super().keyPressEvent(event)
@@ -20,18 +20,70 @@ from PyQt5.QtGui import QPainter, QColor, QPen, QFont, QTextCursor, QTextCharFor
 from moviepy.editor import VideoFileClip, concatenate_videoclips
 import os
 import signal
-import copy
+# 复用 backend 目录下不依赖模型的纯工具模块（剪辑、缓存等），需在导入本地控件前加入路径
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
 from timeline_widget import TimelineWidget
 from editor_widget import EditorWidget
 from video_player import VideoPlayerWidget
 from frame_preview import FramePreviewWidget
+from edit_timeline import EditTimeline
+from edit_history import EditHistory, EDIT_HISTORY_LIMIT
 import threading
 import numpy as np
 import tempfile
 import re
 import json  # 新增
+from video_edit import cut_video_by_segments, render_segments_parallel, render_segments_cached
+from disk_cache import DiskLRUCache, DEFAULT_CACHE_ROOT
+from word_store import WordStore
+from llm import optimize_words
+from align import align_words, MIN_MATCH_RATIO
+from autocut import autocut_words
 
 ASR_API = 'http://localhost:8000/asr'
+ASR_JOBS_API = 'http://localhost:8000/asr/jobs'
+UPLOAD_API = 'http://localhost:8000/uploads'
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), 'config.json')
+
+def load_config():
+    # 读取config.json，不存在或格式错误时返回空配置
+    if not os.path.exists(CONFIG_PATH):
+        return {}
+    try:
+        with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"[LOG] 读取config.json失败: {e}")
+        return {}
+
+def upload_file_chunked(file_path, retries=3):
+    # 分块上传：内存中只保留一个分块，网络中断时从服务端已接收的位置续传
+    size = os.path.getsize(file_path)
+    resp = requests.post(UPLOAD_API, data={'filename': os.path.basename(file_path), 'size': size})
+    resp.raise_for_status()
+    upload_id = resp.json()['upload_id']
+    offset = 0
+    failures = 0
+    with open(file_path, 'rb') as f:
+        while offset < size:
+            f.seek(offset)
+            chunk = f.read(UPLOAD_CHUNK_SIZE)
+            try:
+                resp = requests.put(f'{UPLOAD_API}/{upload_id}', params={'offset': offset}, data=chunk)
+                resp.raise_for_status()
+                offset = resp.json()['offset']
+                failures = 0
+            except requests.RequestException as e:
+                failures += 1
+                if failures > retries:
+                    raise
+                print(f"[LOG] 分块上传失败，准备续传: {e}")
+                status = requests.get(f'{UPLOAD_API}/{upload_id}')
+                status.raise_for_status()
+                offset = status.json()['offset']
+    requests.post(f'{UPLOAD_API}/{upload_id}/complete').raise_for_status()
+    return upload_id
 
 def safe_str(s):
     if isinstance(s, bytes):
@@ -56,14 +108,24 @@ class MainWindow(QMainWindow):
         self.resize(1100, 800)
         self.video_path = None
         self.asr_result = []
+        self.word_store = None  # 列式的识别结果
+        self.editable_words = []
         self.words = []  # [{word, start, end, is_gap}]
         self.deleted_ranges = []
         self.selected_edit_idx = (-1, -1)  # (行, 列)
-        self.undo_stack = []  # 撤销栈
         self.last_open_dir = os.path.expanduser('~')
         self.last_manual_seek_time = None
         self.user_clicked_word = False  # 新增：标记是否用户点击了文字
         self._last_preview_tempfile = None  # 记录上一次预览的临时文件路径
+        # 保留区间渲染缓存，预览和导出共用
+        config = load_config()
+        self.render_cache = DiskLRUCache(
+            config.get('RENDER_CACHE_DIR', os.path.join(DEFAULT_CACHE_ROOT, 'render')),
+            int(config.get('RENDER_CACHE_MAX_MB', 2048)) * 1024 * 1024,
+            suffix='.mov'
+        )
+        # 撤销/重做历史：只记录每次删除的词下标，不复制整个词表
+        self.history = EditHistory(int(config.get('EDIT_HISTORY_LIMIT', EDIT_HISTORY_LIMIT)))
         self.init_ui()
 
     def init_ui(self):
@@ -87,13 +149,30 @@ class MainWindow(QMainWindow):
         tool_btn_layout.addWidget(self.export_btn)
         self.undo_btn = QToolButton()
         self.undo_btn.setText('撤销（Ctrl+Z）')
+        self.undo_btn.setShortcut(QKeySequence.Undo)
         self.undo_btn.clicked.connect(self.undo)
         tool_btn_layout.addWidget(self.undo_btn)
+        self.redo_btn = QToolButton()
+        self.redo_btn.setText('重做（Ctrl+Shift+Z）')
+        self.redo_btn.setShortcut(QKeySequence.Redo)
+        self.redo_btn.clicked.connect(self.redo)
+        tool_btn_layout.addWidget(self.redo_btn)
+        self.virtual_btn = QToolButton()
+        self.virtual_btn.setText('实时预览剪辑')
+        self.virtual_btn.setCheckable(True)
+        self.virtual_btn.toggled.connect(self.toggle_virtual_preview)
+        tool_btn_layout.addWidget(self.virtual_btn)
         left_layout.addLayout(tool_btn_layout)
         # 视频播放器和时间轴
         self.video_player = VideoPlayerWidget()
         left_layout.addWidget(self.video_player, 3)
         self.timeline = TimelineWidget(self)
+        config = load_config()
+        self.timeline.thumb_cache = DiskLRUCache(
+            config.get('THUMB_CACHE_DIR', os.path.join(DEFAULT_CACHE_ROOT, 'thumbs')),
+            int(config.get('THUMB_CACHE_MAX_MB', 512)) * 1024 * 1024,
+            suffix='.npy'
+        )
         print("[LOG] MainWindow: TimelineWidget created", self.timeline)
         self.timeline.jumpToPosition.connect(self.on_timeline_jump)
         print("[LOG] MainWindow: jumpToPosition signal connected")
@@ -102,7 +181,7 @@ class MainWindow(QMainWindow):
         # 全屏帧预览控件
         self.frame_preview = FramePreviewWidget(self)
         # 右键帧带全屏预览
-        self.timeline.fullResPreviewRequest = self.full_res_preview_request
+        self.timeline.fullResPreviewRequested.connect(self.full_res_preview_request)
         # 右侧：编辑器
         right_layout = QVBoxLayout()
         # 新增：大模型优化按钮
@@ -110,6 +189,11 @@ class MainWindow(QMainWindow):
         self.llm_btn.clicked.connect(self.llm_optimize)
         self.llm_btn.setEnabled(False)  # 初始不可用
         right_layout.addWidget(self.llm_btn)
+        # 规则自动粗剪：本地删除长停顿、口头禅和重复，不请求大模型
+        self.autocut_btn = QPushButton('自动粗剪')
+        self.autocut_btn.clicked.connect(self.auto_cut)
+        self.autocut_btn.setEnabled(False)
+        right_layout.addWidget(self.autocut_btn)
         right_layout.addWidget(QLabel('只能删除的编辑器（点击定位，Delete删除）：'))
         self.editor = EditorWidget()
         # --- 联动：点击文字跳转视频和帧带 ---
@@ -128,6 +212,8 @@ class MainWindow(QMainWindow):
         self.selected_idx = 0
         # 保持按钮状态同步
         self.video_player.player.stateChanged.connect(self.update_play_pause_btn)
+        # 虚拟预览时在状态栏显示剪辑后时间
+        self.video_player.editPositionChanged.connect(self.on_edit_position_changed)
 
     def open_file(self):
         file_path, _ = QFileDialog.getOpenFileName(
@@ -194,69 +280,64 @@ class MainWindow(QMainWindow):
                 ]
             }
         ]
-        self.words = []
-        for seg in self.asr_result:
-            is_gap = seg['text'].startswith('[') and seg['text'].endswith('sec]')
-            for w in seg['words']:
-                self.words.append({
-                    'word': w['word'],
-                    'start': w['start'],
-                    'end': w['end'],
-                    'is_gap': is_gap
-                })
-        # 初始化 editable_words
-        self.editable_words = []
-        for seg in self.asr_result:
-            for w in seg['words']:
-                self.editable_words.append(w)
-            self.editor.refresh(self.editable_words)
-        self.refresh_llm_btn()
-        # 设置时间轴
-        duration = 0
-        if self.words:
-            duration = max(w['end'] for w in self.words)
-        self.timeline.set_words(self.words, duration)
+        self.apply_asr_result(self.asr_result)
 
     def upload_and_asr(self, file_path):
         try:
-            with open(file_path, 'rb') as f:
-                files = {'file': (os.path.basename(file_path), f)}
-                resp = requests.post(ASR_API, files=files)
+            # 提交异步识别任务，再流式读取识别出的分段，边识别边显示
+            if load_config().get('LOCAL_BACKEND'):
+                # 后端在本机：只传文件路径，后端直接读取，省去上传和复制
+                resp = requests.post(ASR_JOBS_API, data={'path': os.path.abspath(file_path)})
+            else:
+                upload_id = upload_file_chunked(file_path)
+                resp = requests.post(ASR_JOBS_API, data={'upload_id': upload_id})
             resp.raise_for_status()
-            data = resp.json()['result']
-            print("[ASR识别返回完整结果]", data)  # 新增日志
-            self.asr_result = data
-            self.words = []
-            for seg in data:
-                is_gap = seg['text'].startswith('[') and seg['text'].endswith('sec]')
-                for w in seg['words']:
-                    self.words.append({
-                        'word': w['word'],
-                        'start': w['start'],
-                        'end': w['end'],
-                        'is_gap': is_gap
-                    })
-            # 初始化 editable_words
-            self.editable_words = []
-            for seg in self.asr_result:
-                for w in seg['words']:
-                    self.editable_words.append(w)
-            self.editor.refresh(self.editable_words)
-            self.refresh_llm_btn()
-            # 设置时间轴
-            duration = 0
-            if self.words:
-                duration = max(w['end'] for w in self.words)
-            self.timeline.set_words(self.words, duration)
+            job_id = resp.json()['job_id']
+            segments = []
+            shown = 0  # 编辑器中已显示的分段数
+            with requests.get(f'{ASR_JOBS_API}/{job_id}/stream', stream=True, timeout=(10, 120)) as stream:
+                stream.raise_for_status()
+                for line in stream.iter_lines():
+                    if not line:
+                        continue
+                    event = json.loads(line)
+                    if event['type'] == 'segment':
+                        segments.append(event['segment'])
+                    elif event['type'] == 'progress':
+                        # 每完成一块追加一次新识别出的词，已显示的行不重建
+                        self.asr_btn.setText(f"识别中 {event['progress']:.0f}%")
+                        if segments and shown == 0:
+                            self.editor.refresh([])
+                        self.editor.append_words([w for seg in segments[shown:] for w in seg['words']])
+                        shown = len(segments)
+                    elif event['type'] == 'error':
+                        raise Exception(event['error'])
+                    elif event['type'] == 'done':
+                        break
+                    QApplication.processEvents()
+            print("[ASR识别返回完整结果]", segments)  # 新增日志
+            self.apply_asr_result(segments)
         except Exception as e:
             QMessageBox.critical(self, 'ASR失败', f'语音识别失败: {e}')
         finally:
+            self.asr_btn.setText('AI口播识别')
             self.asr_btn.setEnabled(True)  # 无论成功失败都恢复按钮
 
-    def export_video(self):
-        if not self.video_path or not self.editable_words:
-            QMessageBox.warning(self, '导出失败', '请先选择视频并完成编辑')
-            return
+    def apply_asr_result(self, data):
+        # data: 后端返回的分段列表或二进制格式解出的 WordStore，统一转成列式结构后只展开一次词字典
+        store = data if isinstance(data, WordStore) else WordStore.from_segments(data)
+        self.asr_result = data
+        self.word_store = store
+        self.words = store.words()
+        # 初始化 editable_words：与 words 共用同一批词字典，只是一份可删除的列表
+        self.editable_words = list(self.words)
+        self.history.reset(self.editable_words)
+        self.editor.refresh(self.editable_words)
+        self.refresh_llm_btn()
+        # 设置时间轴
+        self.timeline.set_words(self.words, store.duration)
+
+    def get_keep_ranges(self):
         # 合并连续区间
         keep_ranges = []
         for w in self.editable_words:
@@ -264,23 +345,65 @@ class MainWindow(QMainWindow):
                 keep_ranges.append([w['start'], w['end']])
             else:
                 keep_ranges[-1][1] = w['end']
+        return keep_ranges
+
+    def export_video(self):
+        if not self.video_path or not self.editable_words:
+            QMessageBox.warning(self, '导出失败', '请先选择视频并完成编辑')
+            return
+        keep_ranges = self.get_keep_ranges()
         save_path, _ = QFileDialog.getSaveFileName(self, '保存剪辑后视频', '', 'MP4文件 (*.mp4)')
         if not save_path:
             return
+        config = load_config()
         try:
-            clip = VideoFileClip(self.video_path)
-            subclips = [clip.subclip(start, end) for start, end in keep_ranges]
-            final = concatenate_videoclips(subclips)
-            final.write_videofile(save_path, codec='libx264', audio_codec='aac')
+            export_mode = config.get('EXPORT_MODE', 'smart')
+            if export_mode == 'parallel':
+                # 完整重编码，按分块多进程并行
+                render_segments_parallel(self.video_path, keep_ranges, save_path,
+                                         workers=config.get('EXPORT_WORKERS'))
+            elif export_mode == 'cached':
+                # 复用预览时已渲染的区间，只渲染缓存中没有的部分
+                render_segments_cached(self.video_path, keep_ranges, save_path, self.render_cache,
+                                       workers=config.get('EXPORT_WORKERS'))
+            else:
+                # smart render：整GOP流拷贝，只重编码剪切点附近的帧
+                cut_video_by_segments(self.video_path, keep_ranges, save_path)
             QMessageBox.information(self, '导出成功', f'剪辑后视频已保存到：{save_path}')
         except Exception as e:
             QMessageBox.critical(self, '导出失败', f'剪辑失败: {e}')
 
+    def sync_edit_timeline(self):
+        # editable_words 变化后更新虚拟预览使用的保留区间
+        self.video_player.set_edit_timeline(EditTimeline(self.get_keep_ranges()))
+
+    def toggle_virtual_preview(self, enabled):
+        # 虚拟预览：直接播放原片，按保留区间实时跳过删除部分，无需渲染
+        if enabled:
+            if not self.video_path or not self.editable_words:
+                self.virtual_btn.setChecked(False)
+                return
+            current = self.video_player.player.media().canonicalUrl().toLocalFile()
+            if os.path.abspath(current or '') != os.path.abspath(self.video_path):
+                # 之前播放的是渲染出来的预览文件，切回原片
+                self.video_player.set_media(self.video_path)
+            self.sync_edit_timeline()
+        self.video_player.set_virtual_mode(enabled)
+
+    def on_edit_position_changed(self, edit_t):
+        edit_timeline = self.video_player.edit_timeline
+        if edit_timeline:
+            self.statusBar().showMessage(f'剪辑后 {edit_t:.1f}s / {edit_timeline.duration:.1f}s')
+
     def update_timeline(self):
         # 定时刷新时间轴播放进度
         if self.video_player.player and self.video_player.player.duration() > 0:
             pos = self.video_player.player.position() / 1000.0
             duration = self.video_player.player.duration() / 1000.0
+            edit_timeline = self.video_player.edit_timeline
+            if self.video_player.virtual_mode and edit_timeline:
+                # 经剪辑时间轴换算，跨过剪切点时落在删除区间里的位置对齐到下一个保留区间
+                pos = edit_timeline.to_source_time(edit_timeline.to_edit_time(pos))
             self.timeline.set_position(pos)
             self.timeline.duration = duration
             if self.editable_words:
@@ -306,23 +429,35 @@ class MainWindow(QMainWindow):
         self.editor.highlight_word_at(t)
 
     def undo(self):
-        if self.undo_stack:
-            self.editable_words = self.undo_stack.pop()
+        restored = self.history.undo()
+        if restored is None:
+            return
+        if self.editor.editable_words is self.editable_words:
+            self.editor.insert_rows(restored)
+        else:
+            self.editable_words = self.history.visible_words()
             self.editor.refresh(self.editable_words)
-            self.refresh_llm_btn()
-            # 撤销时不自动生成预览视频
+        self.refresh_llm_btn()
+        self.sync_edit_timeline()
+        # 撤销时不自动生成预览视频
+
+    def redo(self):
+        rows = self.history.redo()
+        if rows is None:
+            return
+        if self.editor.editable_words is self.editable_words:
+            self.editor.remove_rows(rows)
+        else:
+            self.editable_words = self.history.visible_words()
+            self.editor.refresh(self.editable_words)
+        self.refresh_llm_btn()
+        self.sync_edit_timeline()
 
     def preview_video(self):
         # 用当前editable_words生成剪辑后预览视频，并自动播放
         if not self.video_path or not self.editable_words:
             return
-        # 合并连续区间
-        keep_ranges = []
-        for w in self.editable_words:
-            if not keep_ranges or abs(w['start'] - keep_ranges[-1][1]) > 1e-3:
-                keep_ranges.append([w['start'], w['end']])
-            else:
-                keep_ranges[-1][1] = w['end']
+        keep_ranges = self.get_keep_ranges()
         if not keep_ranges:
             return
         # 清理上一次的临时文件
@@ -336,11 +471,11 @@ class MainWindow(QMainWindow):
         with tempfile.NamedTemporaryFile(suffix='.mp4', delete=False) as tmp:
             preview_path = tmp.name
         self._last_preview_tempfile = preview_path
-        clip = VideoFileClip(self.video_path)
-        subclips = [clip.subclip(start, end) for start, end in keep_ranges]
-        final = concatenate_videoclips(subclips)
-        final.write_videofile(preview_path, codec='libx264', audio_codec='aac', verbose=False, logger=None)
-        # 用 QMediaPlayer 播放临时文件
+        # 只渲染缓存中没有的区间，其余直接拼接
+        render_segments_cached(self.video_path, keep_ranges, preview_path, self.render_cache,
+                               workers=load_config().get('EXPORT_WORKERS'))
+        # 用 QMediaPlayer 播放临时文件（渲染结果已是剪辑后的内容，关闭虚拟预览）
+        self.virtual_btn.setChecked(False)
         self.video_player.player.setMedia(QMediaContent(QUrl.fromLocalFile(os.path.abspath(preview_path))))
         self.video_player.player.play()
 
@@ -389,65 +524,21 @@ class MainWindow(QMainWindow):
         self.editor.highlight_word_at(time_)
 
     def on_word_deleted(self, idxs):
-        # idxs: 被删除的索引列表（降序）
-        self.undo_stack.append(copy.deepcopy(self.editable_words))  # 撤销栈 push
-        for idx in idxs:
-            if 0 <= idx < len(self.editable_words):
-                self.editable_words.pop(idx)
-        self.editor.refresh(self.editable_words)
+        # idxs: 被删除的索引列表
+        if self.editor.editable_words is not self.editable_words:
+            # 编辑器显示的是识别中的临时内容，识别完成前不允许删除
+            return
+        self.history.delete_rows(idxs)
+        # 编辑器直接引用 editable_words，只删除对应的行，不重建整个列表
+        self.editor.remove_rows(idxs)
         self.refresh_llm_btn()
+        self.sync_edit_timeline()
         # 同步 timeline
         duration = 0
         if self.editable_words:
             duration = max(w['end'] for w in self.editable_words)
         self.timeline.set_words(self.editable_words, duration)
 
-    def clean_llm_text(self, llm_text):
-        # 只保留汉字
-        return ''.join(re.findall(r'[\u4e00-\u9fa5]', llm_text))
-
-    def align_words_by_chars(self, llm_text, asr_words):
-        """
-        llm_text: 大模型返回的纯文本（按字输出，已去除标点）
-        asr_words: [{'word': '可能', ...}, {'word': '问题', ...}, ...]
-        返回：保留的 asr_words 的下标列表
-        """
-        keep_idxs = []
-        i = 0  # asr_words指针
-        j = 0  # llm_text指针
-        while i < len(asr_words) and j < len(llm_text):
-            w = asr_words[i]['word']
-            # 跳过空隙词组
-            if w.startswith('[') and w.endswith(']'):
-                i += 1
-                continue
-            wlen = len(w)
-            if llm_text[j:j+wlen] == w:
-                keep_idxs.append(i)
-                j += wlen
-            else:
-                j += 1
-                continue
-            i += 1
-        return keep_idxs
-
-    def align_words_by_content(self, llm_words, orig_words):
-        """
-        llm_words: [{'word': '你好'}, ...]
-        orig_words: [{'word': '你好', 'start': ..., 'end': ...}, ...]
-        返回：保留的 orig_words 的结构化数据（带start/end）
-        """
-        result = []
-        j = 0
-        for i, w in enumerate(orig_words):
-            if j < len(llm_words) and w['word'] == llm_words[j]['word']:
-                result.append(w)
-                j += 1
-            if j >= len(llm_words):
-                break
-        print("优化后的结构化数据：", result)
-        return result
-
     def llm_optimize(self):
         # 读取API_KEY
         config_path = os.path.join(os.path.dirname(__file__), 'config.json')
@@ -472,30 +563,54 @@ class MainWindow(QMainWindow):
         self.llm_btn.setEnabled(False)
         self.llm_btn.setText('AI优化中...')
         try:
-            llm_text = llm_struct_optimize(words_struct, API_KEY, MODEL_NAME, BASE_URL)
-            print(safe_str("AI返回内容：" + llm_text))
-            json_str = extract_json(llm_text)
-
-            #QMessageBox.information(self, 'AI返回内容', safe_str(llm_text))
-
-            # 解析返回的结构化words数组
-            try:
-                llm_words = json.loads(json_str)
-                if not isinstance(llm_words, list) or not all(
-                    isinstance(w, dict) and "word" in w for w in llm_words
-                ):
-                    raise ValueError('返回内容不是结构化words数组')
-            except Exception as e:
-                debug_info = safe_str(f"原始words: {json.dumps(words_struct, ensure_ascii=False)}\nAI返回: {llm_text}\n解析异常: {e}")
-                print(debug_info)
-                QMessageBox.warning(self, 'AI优化文案', safe_str('AI返回内容解析失败，请重试或检查API返回。\n\n' + debug_info))
-                return
-            # 对齐，生成新 editable_words
-            new_editable_words = self.align_words_by_content(llm_words, orig_words)
-            self.undo_stack.append(copy.deepcopy(self.editable_words))
-            self.editable_words = new_editable_words
-            self.editor.refresh(self.editable_words)
+            if config.get('LLM_CHUNKED', True):
+                # 分窗口并发请求，模型只返回保留条目的编号，不需要再对齐
+                def on_progress(done, total):
+                    self.llm_btn.setText(f'AI优化中 {done}/{total}')
+                    QApplication.processEvents()
+                keep = optimize_words(
+                    words_struct, API_KEY, MODEL_NAME, BASE_URL,
+                    window_items=config.get('LLM_WINDOW_ITEMS'),
+                    concurrency=config.get('LLM_CONCURRENCY'),
+                    on_progress=on_progress,
+                )
+                new_editable_words = [orig_words[i] for i in keep]
+            else:
+                llm_text = llm_struct_optimize(words_struct, API_KEY, MODEL_NAME, BASE_URL)
+                print(safe_str("AI返回内容：" + llm_text))
+                json_str = extract_json(llm_text)
+
+                #QMessageBox.information(self, 'AI返回内容', safe_str(llm_text))
+
+                # 解析返回的结构化words数组，解析失败时按纯文本对齐
+                try:
+                    llm_words = json.loads(json_str)
+                    if not isinstance(llm_words, list) or not all(
+                        isinstance(w, dict) and "word" in w for w in llm_words
+                    ):
+                        raise ValueError('返回内容不是结构化words数组')
+                except Exception as e:
+                    print(safe_str(f"[Align] 解析结构化结果失败，按纯文本对齐: {e}"))
+                    llm_words = llm_text
+                # 对齐回原词下标，生成新 editable_words
+                keep, ratio = align_words(llm_words, orig_words)
+                print(f"[Align] kept {len(keep)}/{len(orig_words)} words, match ratio {ratio:.3f}")
+                if ratio < config.get('ALIGN_MIN_RATIO', MIN_MATCH_RATIO):
+                    QMessageBox.warning(self, 'AI优化文案', safe_str(
+                        f'AI返回内容与原文对齐失败（匹配率 {ratio:.0%}），模型可能改写了文字，请重试或检查API返回。'))
+                    return
+                new_editable_words = [orig_words[i] for i in keep]
+            # 优化结果是原词的子序列，记为一次删除，可整体撤销
+            kept = {id(w) for w in new_editable_words}
+            removed = [i for i, w in enumerate(orig_words) if id(w) not in kept]
+            self.history.delete_rows(removed)
+            if self.editor.editable_words is self.editable_words:
+                self.editor.remove_rows(removed)
+            else:
+                self.editable_words = self.history.visible_words()
+                self.editor.refresh(self.editable_words)
             self.refresh_llm_btn()
+            self.sync_edit_timeline()
             # 同步 timeline
             duration = 0
             if self.editable_words:
@@ -508,9 +623,27 @@ class MainWindow(QMainWindow):
             self.llm_btn.setEnabled(True)
             self.llm_btn.setText('AI优化文案')
 
+    def auto_cut(self):
+        # 在当前（可能已删改过的）词列表上按规则给出删除建议，作为一次删除记入历史，可整体撤销
+        if not self.editable_words or self.editor.editable_words is not self.editable_words:
+            return
+        config = load_config()
+        removed = autocut_words(
+            self.editable_words,
+            max_gap=config.get('AUTOCUT_MAX_GAP'),
+            fillers=config.get('AUTOCUT_FILLERS'),
+            max_repeat=config.get('AUTOCUT_MAX_REPEAT'),
+        )
+        print(f"[AutoCut] remove {len(removed)}/{len(self.editable_words)} words")
+        if not removed:
+            QMessageBox.information(self, '自动粗剪', '没有需要删除的停顿、口头禅或重复。')
+            return
+        self.on_word_deleted(removed)
+
     def refresh_llm_btn(self):
         # 只有有可用文字时才可用
         self.llm_btn.setEnabled(bool(self.editable_words))
+        self.autocut_btn.setEnabled(bool(self.editable_words))
 
 def llm_struct_optimize(words_struct, api_key, model_name, base_url=None):
     import json
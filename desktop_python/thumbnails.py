@@ -0,0 +1,326 @@
+"""
+时间轴缩略图：ffmpeg 单次解码整段视频，按固定间隔输出低分辨率帧，
+拼成精灵图（N 帧 x 高 x 宽 x RGB）按源文件缓存到磁盘。
+窗口缩放只从已有帧中取样并缩放绘制，不再重新解码；
+时间轴放大后使用按可见瓦片懒解码的多分辨率金字塔
+"""
+import os
+import time
+import threading
+import subprocess
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+import numpy as np
+from disk_cache import DiskLRUCache, DEFAULT_CACHE_ROOT, make_key, file_identity
+from video_edit import FFMPEG
+
+# 缩略图尺寸（像素），绘制时再按时间轴高度缩放
+THUMB_WIDTH = 96
+THUMB_HEIGHT = 54
+# 每段视频最多的帧数，超出时加大采样间隔
+MAX_THUMBS = 1200
+# 最小采样间隔（秒）
+MIN_INTERVAL = 1.0
+# 只解码关键帧：帧带精度为一个 GOP（通常 1~2 秒），解码耗时下降一个数量级以上
+KEYFRAMES_ONLY = True
+# 进度回调的最短间隔（秒）
+UPDATE_INTERVAL = 0.1
+
+# 默认缓存位置和上限，桌面端可在 config.json 中用 THUMB_CACHE_DIR / THUMB_CACHE_MAX_MB 覆盖
+THUMB_CACHE_DIR = os.path.join(DEFAULT_CACHE_ROOT, "thumbs")
+THUMB_CACHE_MAX_MB = 512
+
+_thumb_cache = None
+
+
+def get_thumb_cache() -> DiskLRUCache:
+    global _thumb_cache
+    if _thumb_cache is None:
+        _thumb_cache = DiskLRUCache(THUMB_CACHE_DIR, THUMB_CACHE_MAX_MB * 1024 * 1024, suffix=".npy")
+    return _thumb_cache
+
+
+def thumb_interval(duration: float) -> float:
+    return max(MIN_INTERVAL, duration / MAX_THUMBS)
+
+
+class ThumbnailJob:
+    """
+    一个源文件的缩略图提取任务。frames 预先分配，后台线程边解码边填充，
+    done 为已就绪的帧数，界面可以随时读取前 done 帧
+    """
+
+    def __init__(self, video_path: str, duration: float, cache: Optional[DiskLRUCache] = None,
+                 on_update: Optional[Callable[[], None]] = None):
+        self.video_path = video_path
+        self.duration = duration
+        self.interval = thumb_interval(duration)
+        self.count = max(1, int(np.ceil(duration / self.interval)))
+        self.frames = np.zeros((self.count, THUMB_HEIGHT, THUMB_WIDTH, 3), dtype=np.uint8)
+        self.done = 0
+        self.complete = False
+        self.error = None
+        self.cache = cache or get_thumb_cache()
+        self.on_update = on_update
+        self._cancelled = threading.Event()
+        self._proc = None
+        self._thread = None
+
+    @property
+    def cache_key(self) -> str:
+        return make_key("thumbs", file_identity(self.video_path), self.interval, THUMB_WIDTH, THUMB_HEIGHT)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        # 取消后解码进程立即结束，未完成的结果不写入缓存
+        self._cancelled.set()
+        proc = self._proc
+        if proc is not None and proc.poll() is None:
+            proc.kill()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def index_at(self, t: float) -> int:
+        """
+        时间 t 对应的帧下标，尚未解码到时返回 -1
+        """
+        idx = min(max(int(t / self.interval), 0), self.count - 1)
+        return idx if idx < self.done else -1
+
+    def _notify(self):
+        if self.on_update is not None and not self.cancelled:
+            self.on_update()
+
+    def _run(self):
+        try:
+            cached = self.cache.get(self.cache_key)
+            if cached is not None:
+                frames = np.load(cached, mmap_mode="r")
+                n = min(len(frames), self.count)
+                self.frames[:n] = frames[:n]
+                self.done = n
+            else:
+                self._decode()
+                if self.cancelled:
+                    return
+                if 0 < self.done < self.count:
+                    # 末尾之后没有关键帧时用最后一帧补齐
+                    self.frames[self.done:] = self.frames[self.done - 1]
+                    self.done = self.count
+                tmp_path = self.cache.temp_path_for(self.cache_key)
+                with open(tmp_path, "wb") as f:
+                    np.save(f, self.frames[:self.done])
+                self.cache.put_file(self.cache_key, tmp_path)
+            self.complete = True
+        except Exception as e:
+            self.error = str(e)
+            print(f"[Thumbs] extract failed: {e}")
+        self._notify()
+
+    def _decode(self):
+        """
+        单次解码：fps 滤镜按间隔取帧，缩放并补边到固定尺寸，原始 RGB 经管道读出
+        """
+        cmd = [FFMPEG, "-nostdin", "-v", "error"]
+        if KEYFRAMES_ONLY:
+            cmd += ["-skip_frame", "nokey"]
+        vf = (f"fps=1/{self.interval},"
+              f"scale={THUMB_WIDTH}:{THUMB_HEIGHT}:force_original_aspect_ratio=decrease,"
+              f"pad={THUMB_WIDTH}:{THUMB_HEIGHT}:(ow-iw)/2:(oh-ih)/2")
+        cmd += ["-i", self.video_path, "-an", "-sn", "-vf", vf, "-f", "rawvideo", "-pix_fmt", "rgb24", "-"]
+        frame_bytes = THUMB_WIDTH * THUMB_HEIGHT * 3
+        self._proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        last_notify = 0.0
+        try:
+            while self.done < self.count and not self.cancelled:
+                data = self._proc.stdout.read(frame_bytes)
+                if len(data) < frame_bytes:
+                    break
+                self.frames[self.done] = np.frombuffer(data, dtype=np.uint8).reshape(THUMB_HEIGHT, THUMB_WIDTH, 3)
+                self.done += 1
+                now = time.monotonic()
+                if now - last_notify >= UPDATE_INTERVAL:
+                    last_notify = now
+                    self._notify()
+        finally:
+            if self._proc.poll() is None:
+                self._proc.kill()
+            self._proc.stdout.close()
+            self._proc.wait()
+
+
+# 细节层级：第 0 层是整段视频的缩略图帧带（ThumbnailJob），之后每层采样间隔减半，
+# 直到 MIN_TILE_INTERVAL。第 1 层起按瓦片（每块 TILE_FRAMES 帧）在可见时才解码
+TILE_FRAMES = 16
+MIN_TILE_INTERVAL = 0.04
+# 同时解码瓦片的 ffmpeg 进程数
+TILE_WORKERS = 2
+# 内存中保留的瓦片数，超出按 LRU 丢弃（磁盘缓存仍在）
+TILE_MEMORY = 256
+
+
+class ThumbnailPyramid:
+    """
+    多分辨率缩略图金字塔。绘制线程只做内存查找，缺失的瓦片加入请求栈由后台线程解码，
+    取不到时回退到更粗的层级，绘制从不等待解码。
+    新请求优先（后进先出），已经滚出视野的请求在开始解码前丢弃
+    """
+
+    def __init__(self, strip: ThumbnailJob, cache: Optional[DiskLRUCache] = None,
+                 on_update: Optional[Callable[[], None]] = None):
+        self.strip = strip
+        self.video_path = strip.video_path
+        self.duration = strip.duration
+        self.cache = cache or get_thumb_cache()
+        self.on_update = on_update
+        self.intervals = [strip.interval]
+        while self.intervals[-1] / 2 >= MIN_TILE_INTERVAL:
+            self.intervals.append(self.intervals[-1] / 2)
+        self._tiles: "OrderedDict[Tuple[int, int], np.ndarray]" = OrderedDict()
+        self._stack: List[Tuple[int, int]] = []  # 待解码的瓦片，后进先出
+        self._pending = set()  # 已在栈中或正在解码
+        self._wanted = set()  # 本次绘制用到的瓦片
+        self._wanted_prev = set()  # 上一次完整绘制用到的瓦片
+        self._failed = set()  # 解码失败或超出时长的瓦片，不再请求
+        self._procs = set()
+        self._cond = threading.Condition()
+        self._cancelled = False
+        self._workers = [threading.Thread(target=self._worker, daemon=True) for _ in range(TILE_WORKERS)]
+        for worker in self._workers:
+            worker.start()
+
+    def level_for(self, slot_seconds: float) -> int:
+        """
+        每个缩略图格子对应 slot_seconds 秒时，选择采样间隔不大于格子时长的最粗层级
+        """
+        for level, interval in enumerate(self.intervals):
+            if interval <= slot_seconds:
+                return level
+        return len(self.intervals) - 1
+
+    def begin_paint(self):
+        # 每次绘制前调用：重新收集本帧可见的瓦片，不再可见的请求会被丢弃
+        with self._cond:
+            self._wanted_prev = self._wanted
+            self._wanted = set()
+
+    def frame_at(self, t: float, slot_seconds: float) -> Optional[Tuple[Tuple[int, int], np.ndarray]]:
+        """
+        返回 ((层级, 帧下标), 帧)，目标层级的瓦片未就绪时请求解码并回退到更粗的层级
+        """
+        t = min(max(t, 0.0), self.duration)
+        target = self.level_for(slot_seconds)
+        with self._cond:
+            for level in range(target, 0, -1):
+                idx = int(t / self.intervals[level])
+                tile_key = (level, idx // TILE_FRAMES)
+                tile = self._tiles.get(tile_key)
+                if tile is not None and idx % TILE_FRAMES < len(tile):
+                    self._tiles.move_to_end(tile_key)
+                    if level == target:
+                        self._wanted.add(tile_key)
+                    return (level, idx), tile[idx % TILE_FRAMES]
+                if level == target and tile_key not in self._failed:
+                    self._request(tile_key)
+        idx = self.strip.index_at(t)
+        if idx < 0:
+            return None
+        return (0, idx), self.strip.frames[idx]
+
+    def _request(self, tile_key: Tuple[int, int]):
+        self._wanted.add(tile_key)
+        if tile_key in self._pending:
+            # 重新提到栈顶
+            if tile_key in self._stack:
+                self._stack.remove(tile_key)
+                self._stack.append(tile_key)
+            return
+        self._pending.add(tile_key)
+        self._stack.append(tile_key)
+        self._cond.notify()
+
+    def cancel(self):
+        with self._cond:
+            self._cancelled = True
+            self._stack.clear()
+            procs = list(self._procs)
+            self._cond.notify_all()
+        for proc in procs:
+            if proc.poll() is None:
+                proc.kill()
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._stack and not self._cancelled:
+                    self._cond.wait()
+                if self._cancelled:
+                    return
+                tile_key = self._stack.pop()
+                if tile_key not in self._wanted and tile_key not in self._wanted_prev:
+                    # 已滚出视野
+                    self._pending.discard(tile_key)
+                    continue
+            try:
+                frames = self._load_tile(*tile_key)
+            except Exception as e:
+                print(f"[Thumbs] tile {tile_key} failed: {e}")
+                frames = None
+            with self._cond:
+                self._pending.discard(tile_key)
+                if self._cancelled:
+                    return
+                if frames is None:
+                    self._failed.add(tile_key)
+                    continue
+                self._tiles[tile_key] = frames
+                while len(self._tiles) > TILE_MEMORY:
+                    self._tiles.popitem(last=False)
+            if self.on_update is not None:
+                self.on_update()
+
+    def _tile_cache_key(self, level: int, tile: int) -> str:
+        return make_key("thumb-tile", file_identity(self.video_path), self.intervals[level], tile,
+                        TILE_FRAMES, THUMB_WIDTH, THUMB_HEIGHT)
+
+    def _load_tile(self, level: int, tile: int) -> Optional[np.ndarray]:
+        key = self._tile_cache_key(level, tile)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return np.load(cached)
+        interval = self.intervals[level]
+        start = tile * TILE_FRAMES * interval
+        if start >= self.duration:
+            return None
+        # 输入端 -ss 先跳到前一个关键帧再精确解码到 start，只解码这一块
+        vf = (f"fps=1/{interval},"
+              f"scale={THUMB_WIDTH}:{THUMB_HEIGHT}:force_original_aspect_ratio=decrease,"
+              f"pad={THUMB_WIDTH}:{THUMB_HEIGHT}:(ow-iw)/2:(oh-ih)/2")
+        cmd = [FFMPEG, "-nostdin", "-v", "error", "-ss", f"{start:.3f}", "-i", self.video_path,
+               "-t", f"{TILE_FRAMES * interval:.3f}", "-an", "-sn", "-vf", vf,
+               "-frames:v", str(TILE_FRAMES), "-f", "rawvideo", "-pix_fmt", "rgb24", "-"]
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        with self._cond:
+            self._procs.add(proc)
+        try:
+            data = proc.stdout.read()
+        finally:
+            proc.stdout.close()
+            proc.wait()
+            with self._cond:
+                self._procs.discard(proc)
+        frame_bytes = THUMB_WIDTH * THUMB_HEIGHT * 3
+        n = len(data) // frame_bytes
+        if n == 0 or self._cancelled:
+            return None
+        frames = np.frombuffer(data[:n * frame_bytes], dtype=np.uint8).reshape(n, THUMB_HEIGHT, THUMB_WIDTH, 3)
+        tmp_path = self.cache.temp_path_for(key)
+        with open(tmp_path, "wb") as f:
+            np.save(f, frames)
+        self.cache.put_file(key, tmp_path)
+        return frames
@@ -1,13 +1,26 @@
-from PyQt5.QtWidgets import QWidget, QMessageBox
+from PyQt5.QtWidgets import QWidget
 from PyQt5.QtGui import QPainter, QColor, QPen, QFont, QPixmap, QImage
-from PyQt5.QtCore import Qt, pyqtSignal
-import threading
-from moviepy.editor import VideoFileClip
+from PyQt5.QtCore import Qt, pyqtSignal, QLineF
+from collections import OrderedDict
 import numpy as np
+from thumbnails import ThumbnailJob, ThumbnailPyramid, THUMB_WIDTH, THUMB_HEIGHT
+from waveform import WaveformJob
+
+# 缩放范围：最多放大到可见区间只有 MIN_VIEW_SPAN 秒
+MIN_VIEW_SPAN = 2.0
+# 滚轮每格的缩放倍数
+ZOOM_STEP = 1.25
+# 缓存的缩略图 QPixmap 数量
+PIXMAP_CACHE_SIZE = 1024
+# 候选刻度间隔（秒），取相邻刻度不少于 TICK_MIN_PX 像素的最小值
+TICK_STEPS = [0.1, 0.2, 0.5, 1, 2, 5, 10, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600]
+TICK_MIN_PX = 60
 
 class TimelineWidget(QWidget):
     previewFrameChanged = pyqtSignal(object)  # QPixmap or None
     jumpToPosition = pyqtSignal(float)  # 新增：跳转到某个时间点（秒）
+    thumbnailsUpdated = pyqtSignal()  # 后台线程解码出新的缩略图
+    fullResPreviewRequested = pyqtSignal(float)  # 右键请求该时间点（秒）的原分辨率帧
     def __init__(self, parent=None):
         super().__init__(parent)
         self.words = []  # [{word, start, end, is_gap}]
@@ -16,12 +29,19 @@ class TimelineWidget(QWidget):
         self.setMinimumHeight(40)
         self.setMouseTracking(True)
         self.video_path = None
-        self.thumbnails = []  # [(time, QPixmap)]
-        self.thumb_interval = 1.0
+        self.thumb_job = None  # 当前视频的缩略图提取任务
+        self.thumb_pyramid = None  # 放大后使用的多分辨率缩略图
+        self.thumb_cache = None  # 缩略图磁盘缓存，为空时使用默认位置
+        self.wave_job = None  # 当前视频的波形包络
+        self._thumb_pixmaps = OrderedDict()  # (层级, 帧下标) -> QPixmap
+        # 可见区间：从 view_start 开始的 view_span 秒，view_span 为 None 表示显示全部
+        self.view_start = 0.0
+        self.view_span = None
         self.thumb_height = 40
         self.hover_pixmap = None
         self.hover_pos = None
         self._dragging = False
+        self.thumbnailsUpdated.connect(self.update)
 
     def set_words(self, words, duration):
         self.words = words
@@ -30,36 +50,125 @@ class TimelineWidget(QWidget):
 
     def set_position(self, pos):
         self.position = pos
+        if self.view_span is not None and not self._dragging:
+            # 放大时播放头离开可见区间则翻页跟随
+            start, span = self.visible_range()
+            if pos < start or pos > start + span:
+                self._set_view(pos - span * 0.1, span)
+        self.update()
+
+    def visible_range(self):
+        # 返回 (起点, 时长)
+        duration = max(self.duration, 1e-3)
+        span = duration if self.view_span is None else min(self.view_span, duration)
+        start = min(max(self.view_start, 0.0), duration - span)
+        return start, span
+
+    def _set_view(self, start, span):
+        duration = max(self.duration, 1e-3)
+        span = min(max(span, min(MIN_VIEW_SPAN, duration)), duration)
+        if span >= duration:
+            self.view_start, self.view_span = 0.0, None
+        else:
+            self.view_start, self.view_span = min(max(start, 0.0), duration - span), span
         self.update()
 
+    def time_at(self, x):
+        start, span = self.visible_range()
+        return start + x / max(self.width(), 1) * span
+
+    def x_at(self, t):
+        start, span = self.visible_range()
+        return int((t - start) / span * self.width())
+
+    def zoom(self, factor, anchor_x=None):
+        """
+        以 anchor_x 处的时间为中心缩放，factor > 1 放大
+        """
+        start, span = self.visible_range()
+        anchor_x = self.width() / 2 if anchor_x is None else anchor_x
+        anchor_t = self.time_at(anchor_x)
+        new_span = span / factor
+        self._set_view(anchor_t - anchor_x / max(self.width(), 1) * new_span, new_span)
+
+    def pan(self, seconds):
+        start, span = self.visible_range()
+        self._set_view(start + seconds, span)
+
     def set_video(self, video_path, duration):
         self.video_path = video_path
         self.duration = duration
-        self.thumbnails = []
         self._start_extract_thumbnails()
 
     def _start_extract_thumbnails(self):
+        # 每个视频只解码一次；换视频时取消上一个还在进行的提取
+        if self.thumb_job is not None:
+            self.thumb_job.cancel()
+        if self.thumb_pyramid is not None:
+            self.thumb_pyramid.cancel()
+        if self.wave_job is not None:
+            self.wave_job.cancel()
+        self.thumb_job = None
+        self.thumb_pyramid = None
+        self.wave_job = None
+        self._thumb_pixmaps = OrderedDict()
+        self.view_start, self.view_span = 0.0, None
         if not self.video_path or self.duration <= 0:
             return
-        width = self.width()
-        n_thumbs = max(1, width // 40)  # 每40像素一帧
-        interval = self.duration / n_thumbs
-        self.thumb_interval = interval
-        self.thumb_height = 40  # 固定帧带高度
-        self.thumbnails = [None] * n_thumbs
-        def extract():
-            clip = VideoFileClip(self.video_path)
-            for i in range(n_thumbs):
-                t = min(self.duration, i * interval)
-                frame = clip.get_frame(t)
-                img = QImage(frame, frame.shape[1], frame.shape[0], QImage.Format_RGB888).rgbSwapped()
-                pix = QPixmap.fromImage(img).scaledToHeight(self.thumb_height, Qt.SmoothTransformation)
-                self.thumbnails[i] = (t, pix)
-                self.update()
-        threading.Thread(target=extract, daemon=True).start()
+        self.thumb_job = ThumbnailJob(self.video_path, self.duration, cache=self.thumb_cache,
+                                      on_update=self.thumbnailsUpdated.emit)
+        self.thumb_job.start()
+        self.thumb_pyramid = ThumbnailPyramid(self.thumb_job, cache=self.thumb_cache,
+                                              on_update=self.thumbnailsUpdated.emit)
+        # 波形包络与缩略图共用磁盘缓存，计算完成后同样通过信号触发重绘
+        self.wave_job = WaveformJob(self.video_path, cache=self.thumb_cache,
+                                    on_update=self.thumbnailsUpdated.emit)
+        self.wave_job.start()
+
+    def _thumb_pixmap(self, key, frame):
+        # QPixmap 只能在界面线程创建，按 (层级, 帧下标) 缓存
+        pix = self._thumb_pixmaps.get(key)
+        if pix is None:
+            frame = np.ascontiguousarray(frame)
+            img = QImage(frame.data, THUMB_WIDTH, THUMB_HEIGHT, THUMB_WIDTH * 3, QImage.Format_RGB888).copy()
+            pix = QPixmap.fromImage(img)
+            self._thumb_pixmaps[key] = pix
+            if len(self._thumb_pixmaps) > PIXMAP_CACHE_SIZE:
+                self._thumb_pixmaps.popitem(last=False)
+        else:
+            self._thumb_pixmaps.move_to_end(key)
+        return pix
+
+    def thumbnail_at(self, t, slot_seconds=None):
+        """
+        时间 t 处的缩略图，slot_seconds 为一个缩略图格子对应的时长（决定细节层级）。
+        尚未解码时返回 None，从不等待解码
+        """
+        if self.thumb_pyramid is None:
+            return None
+        if slot_seconds is None:
+            slot_seconds = self.visible_range()[1] / max(1, self.width() // 40)
+        found = self.thumb_pyramid.frame_at(t, slot_seconds)
+        return self._thumb_pixmap(*found) if found is not None else None
+
+    def _draw_waveform(self, painter, cols, band_y, band_h):
+        mins, maxs, rms = cols
+        mid = band_y + band_h / 2
+        half = band_h / 2
+        xs = np.nonzero(~np.isnan(maxs))[0]
+        if len(xs) == 0:
+            return
+        peak_top = mid - maxs[xs] * half
+        peak_bottom = mid - np.minimum(mins[xs], maxs[xs] - 2.0 / band_h) * half
+        rms_half = np.minimum(rms[xs], 1.0) * half
+        painter.setPen(QPen(QColor(120, 200, 255, 110), 1))
+        painter.drawLines([QLineF(x, a, x, b) for x, a, b in zip(xs.tolist(), peak_top.tolist(), peak_bottom.tolist())])
+        painter.setPen(QPen(QColor(150, 230, 255, 200), 1))
+        painter.drawLines([QLineF(x, mid - r, x, mid + r) for x, r in zip(xs.tolist(), rms_half.tolist()) if r >= 0.5])
 
     def resizeEvent(self, event):
-        self._start_extract_thumbnails()
+        # 缩放只重新取样已解码的帧，不重新解码
+        self.update()
         super().resizeEvent(event)
 
     def paintEvent(self, event):
@@ -69,33 +178,45 @@ class TimelineWidget(QWidget):
         # 缩略图帧带垂直居中
         band_h = self.thumb_height
         band_y = (h - band_h) // 2
-        if self.thumbnails:
-            n = len(self.thumbnails)
-            for i, thumb in enumerate(self.thumbnails):
-                if thumb is not None:
-                    t, pix = thumb
-                    x1 = int(i / n * w)
-                    x2 = int((i+1) / n * w)
+        view_start, view_span = self.visible_range()
+        if self.thumb_pyramid is not None and self.duration > 0:
+            n = max(1, w // 40)  # 每40像素一帧
+            slot_seconds = view_span / n
+            # 格子按绝对时间对齐，平移时缩略图跟着移动而不是原地换帧
+            first = int(view_start / slot_seconds)
+            self.thumb_pyramid.begin_paint()
+            for i in range(first, first + n + 1):
+                t = i * slot_seconds
+                if t >= self.duration:
+                    break
+                pix = self.thumbnail_at(t, slot_seconds)
+                if pix is not None:
+                    x1 = self.x_at(t)
+                    x2 = self.x_at(t + slot_seconds)
                     target_width = max(1, x2 - x1)
                     painter.drawPixmap(x1, band_y, target_width, band_h, pix)
+        # 波形叠加在缩略图带上：峰值为浅色，RMS 为亮色
+        envelope = self.wave_job.envelope if self.wave_job is not None else None
+        if envelope is not None and view_span > 0:
+            cols = envelope.columns(view_start, view_span, w)
+            if cols is not None:
+                self._draw_waveform(painter, cols, band_y, band_h)
         # 时间刻度
-        duration = self.duration
-        if duration > 0:
-            # 计算刻度间隔
-            if duration <= 30:
-                step = 1
-            elif duration <= 120:
-                step = 5
-            else:
-                step = 10
+        if view_span > 0:
+            # 计算刻度间隔：相邻刻度不少于 TICK_MIN_PX 像素
+            step = next((s for s in TICK_STEPS if s / view_span * w >= TICK_MIN_PX), TICK_STEPS[-1])
             font = QFont()
             font.setPointSize(10)
             painter.setFont(font)
             painter.setPen(QPen(QColor('#999'), 1))
-            for t in range(0, int(duration)+1, step):
-                x = int(t / duration * w)
+            i = int(view_start // step)
+            while i * step <= view_start + view_span:
+                t = i * step
+                x = self.x_at(t)
+                label = f"{t:.1f}s" if step < 1 else f"{int(t)}s"
                 painter.drawLine(x, 0, x, 8)
-                painter.drawText(x-10, 0, 20, 12, Qt.AlignCenter, f"{t}s")
+                painter.drawText(x-20, 0, 40, 12, Qt.AlignCenter, label)
+                i += 1
         # 绘制每个word/空隙区块
         # for word in self.words:
         #     x1 = int(word['start'] / self.duration * w)
@@ -103,7 +224,7 @@ class TimelineWidget(QWidget):
         #     color = QColor('#bae7ff') if not word['is_gap'] else QColor('#444')
         #     painter.fillRect(x1, 10, max(x2-x1,1), h-20, color)
         # 当前播放进度线
-        px = int(self.position / self.duration * w)
+        px = self.x_at(self.position)
         pen = QPen(QColor('#fa541c'), 2)
         painter.setPen(pen)
         painter.drawLine(px, 0, px, h)
@@ -124,16 +245,15 @@ class TimelineWidget(QWidget):
         print(f"[LOG] mousePressEvent: button={event.button()}, pos=({event.x()},{event.y()})")
         has_words = bool(self.words)
         x = event.x()
-        w = self.width()
-        t = x / w * self.duration
+        t = self.time_at(x)
         print(f"[LOG] mousePressEvent: x={x}, t={t:.2f}, has_words={has_words}")
         if event.button() == Qt.LeftButton:
             self._dragging = True
             print(f"[LOG] Start dragging at t={t:.2f}")
             self.jumpToPosition.emit(t)
         elif event.button() == Qt.RightButton:
-            if has_words and hasattr(self, 'fullResPreviewRequest'):
-                self.fullResPreviewRequest(t)
+            if has_words:
+                self.fullResPreviewRequested.emit(t)
         super().mousePressEvent(event)
 
     def mouseMoveEvent(self, event):
@@ -141,17 +261,14 @@ class TimelineWidget(QWidget):
         has_words = bool(self.words)
         if self._dragging and event.buttons() & Qt.LeftButton:
             x = event.x()
-            w = self.width()
-            t = x / w * self.duration
+            t = self.time_at(x)
             #print(f"[LOG] mouseMoveEvent: dragging, x={x}, t={t:.2f}")
             self.jumpToPosition.emit(t)
-        if has_words and self.video_path and self.thumbnails:
+        if has_words and self.video_path and self.thumb_job is not None:
             x = event.x()
-            w = self.width()
-            t = x / w * self.duration
-            idx = int(t / self.thumb_interval)
-            if 0 <= idx < len(self.thumbnails) and self.thumbnails[idx]:
-                _, pix = self.thumbnails[idx]
+            t = self.time_at(x)
+            pix = self.thumbnail_at(t)
+            if pix is not None:
                 self.hover_pixmap = pix
                 self.hover_pos = (x, 0)
                 self.previewFrameChanged.emit(pix)
@@ -174,16 +291,12 @@ class TimelineWidget(QWidget):
         super().mouseDoubleClickEvent(event)
 
     def wheelEvent(self, event):
-        print(f"[LOG] wheelEvent: delta={event.angleDelta()}")
-        super().wheelEvent(event) 
-
-    def fullResPreviewRequest(self, t):
-        if not keep_idxs or len(''.join([orig_words[i]['word'] for i in keep_idxs])) < len(llm_text_clean):
-            debug_info = (
-                f"原文words: {[w['word'] for w in orig_words]}\n"
-                f"大模型原文: {llm_text}\n"
-                f"大模型去标点: {llm_text_clean}\n"
-                f"已匹配: {''.join([orig_words[i]['word'] for i in keep_idxs])}\n"
-            )
-            QMessageBox.warning(self, '大模型优化', '大模型返回内容与原文对齐失败，请重试或检查API返回。\\n\\n' + debug_info)
-            return 
\ No newline at end of file
+        # 滚轮缩放（以鼠标位置为中心），Shift+滚轮或横向滚动平移；只改可见区间，不等待解码
+        delta = event.angleDelta()
+        start, span = self.visible_range()
+        if delta.x() or event.modifiers() & Qt.ShiftModifier:
+            steps = (delta.x() or delta.y()) / 120
+            self.pan(-steps * span * 0.1)
+        elif delta.y():
+            self.zoom(ZOOM_STEP ** (delta.y() / 120), event.pos().x())
+        event.accept()
@@ -1,9 +1,15 @@
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QPushButton, QStyle, QLabel
 from PyQt5.QtMultimedia import QMediaPlayer, QMediaContent
 from PyQt5.QtMultimediaWidgets import QVideoWidget
-from PyQt5.QtCore import QUrl, Qt
+from PyQt5.QtCore import QUrl, Qt, QTimer, pyqtSignal
+
+# 虚拟预览时的位置刷新间隔（毫秒）
+VIRTUAL_NOTIFY_MS = 20
+# 提前跳转量（毫秒），抵消 setPosition 生效前的延迟
+SKIP_LEAD_MS = 30
 
 class VideoPlayerWidget(QWidget):
+    editPositionChanged = pyqtSignal(float)  # 虚拟预览：剪辑后时间轴上的当前时间（秒）
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setFocusPolicy(Qt.StrongFocus)
@@ -29,6 +35,63 @@ class VideoPlayerWidget(QWidget):
         self.preview_label.setAlignment(Qt.AlignCenter)
         self.preview_label.hide()
         self.resizeEvent(None)
+        # 虚拟预览：直接播放原片，按保留区间跳过被删除的部分
+        self.virtual_mode = False
+        self.edit_timeline = None
+        self._skip_timer = QTimer(self)
+        self._skip_timer.setSingleShot(True)
+        self._skip_timer.setTimerType(Qt.PreciseTimer)
+        self._skip_timer.timeout.connect(self._skip_to_next_range)
+        self.player.positionChanged.connect(self._on_position_changed)
+
+    def set_edit_timeline(self, edit_timeline):
+        self.edit_timeline = edit_timeline
+        self._skip_timer.stop()
+
+    def set_virtual_mode(self, enabled):
+        self.virtual_mode = enabled
+        self._skip_timer.stop()
+        self.player.setNotifyInterval(VIRTUAL_NOTIFY_MS if enabled else 1000)
+        if enabled and self.edit_timeline:
+            pos = self.player.position() / 1000.0
+            if self.edit_timeline.range_index_at(pos) < 0:
+                i = self.edit_timeline.next_range_index(pos)
+                start = self.edit_timeline.ranges[i if i >= 0 else 0][0]
+                self.player.setPosition(int(start * 1000))
+
+    def _on_position_changed(self, ms):
+        if not self.virtual_mode or not self.edit_timeline:
+            return
+        t = ms / 1000.0
+        timeline = self.edit_timeline
+        i = timeline.range_index_at(t)
+        if i < 0:
+            # 播放中落入删除区间（例如用户拖动），立即跳到下一个保留区间
+            if self.player.state() == QMediaPlayer.PlayingState:
+                self._skip_to_next_range()
+            return
+        self.editPositionChanged.emit(timeline.to_edit_time(t))
+        if self.player.state() != QMediaPlayer.PlayingState:
+            return
+        # 区间末尾在下一次位置刷新之前到来时，用精确定时器提前安排跳转
+        remaining_ms = (timeline.ranges[i][1] - t) * 1000 - SKIP_LEAD_MS
+        if remaining_ms < VIRTUAL_NOTIFY_MS * 2 and not self._skip_timer.isActive():
+            self._skip_timer.start(max(0, int(remaining_ms)))
+
+    def _skip_to_next_range(self):
+        if not self.virtual_mode or not self.edit_timeline:
+            return
+        t = self.player.position() / 1000.0 + SKIP_LEAD_MS / 1000.0
+        i = self.edit_timeline.range_index_at(t)
+        if i >= 0 and self.edit_timeline.ranges[i][1] - t > SKIP_LEAD_MS / 1000.0:
+            return
+        # 当前区间结束，跳到之后的第一个保留区间
+        j = self.edit_timeline.next_range_index(self.edit_timeline.ranges[i][1] if i >= 0 else t)
+        if j < 0:
+            self.player.pause()
+            self.player.setPosition(int(self.edit_timeline.ranges[-1][1] * 1000))
+            return
+        self.player.setPosition(int(self.edit_timeline.ranges[j][0] * 1000))
 
     def toggle_play_pause(self):
         if self.player.state() == QMediaPlayer.PlayingState:
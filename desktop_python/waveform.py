@@ -0,0 +1,155 @@
+"""
+时间轴波形：对解码后的 16kHz 音频一次向量化遍历，得到每个桶的 min/max/RMS 包络，
+再逐级 4 合 1 生成多分辨率层级，每层存为可内存映射的 .npy（与缩略图共用磁盘缓存）。
+绘制时按每像素对应的时长选层级，任何缩放下都只需读取屏幕宽度量级的数据
+"""
+import threading
+from typing import Callable, List, Optional, Tuple
+import numpy as np
+from audio_io import SAMPLE_RATE, load_audio
+from disk_cache import DiskLRUCache, make_key, file_identity
+from thumbnails import get_thumb_cache
+
+# 第 0 层每个桶的采样点数（16kHz 下 4ms）
+WAVE_BUCKET = 64
+# 相邻层级的桶大小倍数
+WAVE_FACTOR = 4
+# 最粗一层的桶数不超过该值时停止
+WAVE_MIN_BUCKETS = 256
+# 计算第 0 层时每次处理的桶数，限制临时内存
+BLOCK_BUCKETS = 1 << 16
+
+
+def compute_envelope(audio: np.ndarray) -> List[np.ndarray]:
+    """
+    返回各层级的包络数组，形状 (桶数, 3)，列依次为 min / max / RMS，float32
+    """
+    n_buckets = max(1, -(-len(audio) // WAVE_BUCKET))
+    base = np.zeros((n_buckets, 3), dtype=np.float32)
+    block_samples = BLOCK_BUCKETS * WAVE_BUCKET
+    for b0 in range(0, n_buckets, BLOCK_BUCKETS):
+        block = np.asarray(audio[b0 * WAVE_BUCKET:b0 * WAVE_BUCKET + block_samples], dtype=np.float32)
+        rows = -(-len(block) // WAVE_BUCKET)
+        if len(block) < rows * WAVE_BUCKET:
+            # 末尾不足一个桶时补零
+            block = np.concatenate([block, np.zeros(rows * WAVE_BUCKET - len(block), dtype=np.float32)])
+        frames = block.reshape(rows, WAVE_BUCKET)
+        base[b0:b0 + rows, 0] = frames.min(axis=1)
+        base[b0:b0 + rows, 1] = frames.max(axis=1)
+        base[b0:b0 + rows, 2] = np.sqrt(np.einsum("ij,ij->i", frames, frames) / WAVE_BUCKET)
+    levels = [base]
+    while len(levels[-1]) > WAVE_MIN_BUCKETS:
+        prev = levels[-1]
+        rows = -(-len(prev) // WAVE_FACTOR)
+        pad = rows * WAVE_FACTOR - len(prev)
+        if pad:
+            prev = np.concatenate([prev, np.repeat(prev[-1:], pad, axis=0)])
+        groups = prev.reshape(rows, WAVE_FACTOR, 3)
+        level = np.empty((rows, 3), dtype=np.float32)
+        level[:, 0] = groups[:, :, 0].min(axis=1)
+        level[:, 1] = groups[:, :, 1].max(axis=1)
+        level[:, 2] = np.sqrt((groups[:, :, 2] ** 2).mean(axis=1))
+        levels.append(level)
+    return levels
+
+
+class WaveformEnvelope:
+    def __init__(self, levels: List[np.ndarray]):
+        self.levels = levels
+        coarsest = levels[-1]
+        # 按全局峰值归一化，安静的录音也能看清
+        self.peak = float(max(np.abs(coarsest[:, :2]).max(), 1e-6))
+
+    def bucket_seconds(self, level: int) -> float:
+        return WAVE_BUCKET * WAVE_FACTOR ** level / SAMPLE_RATE
+
+    def level_for(self, seconds_per_px: float) -> int:
+        # 桶时长不超过每像素时长的最粗层级，每列只需合并 1~WAVE_FACTOR 个桶
+        level = 0
+        while level + 1 < len(self.levels) and self.bucket_seconds(level + 1) <= seconds_per_px:
+            level += 1
+        return level
+
+    def columns(self, start: float, span: float, width: int) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        把 [start, start+span) 映射到 width 个像素列，返回每列的 (min, max, rms)，已归一化到 [-1, 1]。
+        超出音频末尾的列为 NaN
+        """
+        if width <= 0 or span <= 0:
+            return None
+        level = self.level_for(span / width)
+        arr = self.levels[level]
+        bs = self.bucket_seconds(level)
+        edges = ((start + np.arange(width + 1) * (span / width)) / bs).astype(np.int64)
+        edges = np.clip(edges, 0, len(arr))
+        lo, hi = int(edges[0]), int(edges[-1])
+        if hi <= lo:
+            return None
+        sub = np.asarray(arr[lo:hi])
+        idx = np.minimum(edges[:-1] - lo, len(sub) - 1)
+        mins = np.minimum.reduceat(sub[:, 0], idx) / self.peak
+        maxs = np.maximum.reduceat(sub[:, 1], idx) / self.peak
+        rms = np.maximum.reduceat(sub[:, 2], idx) / self.peak
+        beyond = edges[:-1] >= len(arr)
+        for col in (mins, maxs, rms):
+            col[beyond] = np.nan
+        return mins, maxs, rms
+
+
+class WaveformJob:
+    """
+    后台加载或计算一个源文件的波形包络，完成后 envelope 可用
+    """
+
+    def __init__(self, video_path: str, cache: Optional[DiskLRUCache] = None,
+                 on_update: Optional[Callable[[], None]] = None):
+        self.video_path = video_path
+        self.cache = cache or get_thumb_cache()
+        self.on_update = on_update
+        self.envelope: Optional[WaveformEnvelope] = None
+        self.error = None
+        self._cancelled = False
+        self._thread = None
+
+    def _level_key(self, level: int) -> str:
+        return make_key("wave", file_identity(self.video_path), SAMPLE_RATE, WAVE_BUCKET, WAVE_FACTOR, level)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        self._cancelled = True
+
+    def _load_cached(self) -> Optional[List[np.ndarray]]:
+        # 逐层读取，最粗一层满足终止条件才算完整；中间某层被淘汰则重新计算
+        levels = []
+        while True:
+            path = self.cache.get(self._level_key(len(levels)))
+            if path is None:
+                return None
+            levels.append(np.load(path, mmap_mode="r"))
+            if len(levels[-1]) <= WAVE_MIN_BUCKETS:
+                return levels
+
+    def _run(self):
+        try:
+            levels = self._load_cached()
+            if levels is None:
+                levels = compute_envelope(load_audio(self.video_path))
+                for i, level in enumerate(levels):
+                    key = self._level_key(i)
+                    tmp_path = self.cache.temp_path_for(key)
+                    with open(tmp_path, "wb") as f:
+                        np.save(f, level)
+                    self.cache.put_file(key, tmp_path, evict=False)
+                # 全部层级写完再淘汰，避免刚写入的层级被挤掉
+                self.cache.evict()
+            if self._cancelled:
+                return
+            self.envelope = WaveformEnvelope(levels)
+        except Exception as e:
+            self.error = str(e)
+            print(f"[Waveform] failed: {e}")
+        if self.on_update is not None and not self._cancelled:
+            self.on_update()
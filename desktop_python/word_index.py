@@ -0,0 +1,75 @@
+"""
+词时间索引：按列表顺序保存每个词的起止时间，另存一份按起点排序的下标，
+时间 -> 词、词 -> 时间都用二分查找，播放时每次高亮只需 O(log n)
+"""
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+
+class WordIndex:
+    def __init__(self, words: Optional[List[Dict]] = None):
+        self.rebuild(words or [])
+
+    def rebuild(self, words: List[Dict]):
+        self.starts = np.array([w['start'] for w in words], dtype=np.float64)
+        self.ends = np.array([w['end'] for w in words], dtype=np.float64)
+        self._sort()
+
+    def _sort(self):
+        # 对齐或大模型优化后词序可能与时间顺序不一致，统一按起点排序（稳定排序保持原顺序）
+        self.order = np.argsort(self.starts, kind='stable')
+        self.sorted_starts = self.starts[self.order]
+        # 按起点排序后终点的前缀最大值：用于判断更早开始的词是否仍覆盖某个时间（时间戳重叠）
+        self.max_ends = np.maximum.accumulate(self.ends[self.order]) if len(self.order) else self.ends
+
+    def __len__(self):
+        return len(self.starts)
+
+    def time_of(self, row: int) -> Tuple[float, float]:
+        return float(self.starts[row]), float(self.ends[row])
+
+    def word_at(self, t: float) -> int:
+        """
+        返回覆盖时间 t（start <= t < end）的词的行号，多个词重叠时取起点最晚的一个；
+        t 落在词与词之间的空白里时返回 -1
+        """
+        k = int(np.searchsorted(self.sorted_starts, t, side='right')) - 1
+        # 从起点不晚于 t 的最后一个词往前找，前缀最大终点不超过 t 时更早的词都不可能覆盖 t
+        while k >= 0 and self.max_ends[k] > t:
+            row = int(self.order[k])
+            if self.ends[row] > t:
+                return row
+            k -= 1
+        return -1
+
+    def remove(self, rows: List[int]):
+        """
+        删除若干行，其余行号前移，与列表上的删除保持一致
+        """
+        rows = np.unique(np.asarray(rows, dtype=np.int64))
+        rows = rows[(rows >= 0) & (rows < len(self.starts))]
+        if not len(rows):
+            return
+        self.starts = np.delete(self.starts, rows)
+        self.ends = np.delete(self.ends, rows)
+        # 删除不改变剩余词的相对时间顺序，直接从已排序的下标中去掉并重新编号
+        keep = ~np.isin(self.order, rows)
+        order = self.order[keep]
+        self.order = order - np.searchsorted(rows, order)
+        self.sorted_starts = self.sorted_starts[keep]
+        self.max_ends = np.maximum.accumulate(self.ends[self.order]) if len(self.order) else self.ends
+
+    def append(self, words: List[Dict]):
+        if not words:
+            return
+        self.starts = np.concatenate([self.starts, [w['start'] for w in words]])
+        self.ends = np.concatenate([self.ends, [w['end'] for w in words]])
+        self._sort()
+
+    def insert(self, row: int, words: List[Dict]):
+        # 撤销时把词插回原来的位置
+        if not words:
+            return
+        self.starts = np.insert(self.starts, row, [w['start'] for w in words])
+        self.ends = np.insert(self.ends, row, [w['end'] for w in words])
+        self._sort()
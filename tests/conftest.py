@@ -0,0 +1,11 @@
+"""
+测试直接导入各目录下的平铺模块，与 benchmarks/run.py 一样把目录加入 sys.path
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for name in ("backend", "desktop_python", "benchmarks"):
+    path = os.path.join(ROOT, name)
+    if path not in sys.path:
+        sys.path.append(path)
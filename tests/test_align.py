@@ -0,0 +1,127 @@
+import random
+import time
+
+from align import align_words, normalize
+
+
+def _orig(texts):
+    return [{"word": t} for t in texts]
+
+
+ORIG = _orig(["大家", "好", "嗯", "今天", "今天", "我们", "[0.800 sec]", "来", "讲", "那个", "剪辑", "[0.400 sec]",
+              "怎么", "快速", "剪", "视频"])
+
+
+def test_normalize():
+    assert normalize("Hello, 世界！") == "hello世界"
+
+
+def test_align_word_list():
+    keep, ratio = align_words(["大家", "好", "今天", "我们", "来", "讲", "剪辑", "怎么", "快速", "剪", "视频"], ORIG)
+    # 删掉的重复保留后一遍
+    assert keep == [0, 1, 4, 5, 7, 8, 10, 12, 13, 14, 15]
+    assert ratio == 1.0
+
+
+def test_align_word_list_keeps_gaps_where_model_kept_them():
+    keep, _ = align_words([{"word": w} for w in ["今天", "我们", "[0.800 sec]", "来", "讲", "剪辑"]], ORIG)
+    assert keep == [4, 5, 6, 7, 8, 10]
+
+
+def test_align_plain_text():
+    keep, ratio = align_words("大家好，今天我们[0.8 sec]来讲剪辑。怎么快速剪视频？", ORIG)
+    assert keep == [0, 1, 4, 5, 6, 7, 8, 10, 12, 13, 14, 15]
+    assert ratio == 1.0
+
+
+def test_align_merged_words_fall_back_to_characters():
+    # 模型把词合并了：按词对不上时逐字符对齐
+    keep, ratio = align_words(["大家好", "今天我们", "来讲剪辑"], ORIG)
+    assert keep == [0, 1, 4, 5, 7, 8, 10]
+    assert ratio == 1.0
+
+
+def test_align_rewritten_output_has_low_ratio():
+    _, ratio = align_words("各位朋友晚上好，欢迎收看", ORIG)
+    assert ratio < 0.5
+
+
+def test_align_empty_output():
+    assert align_words([], ORIG)[0] == []
+
+
+def test_align_prefers_whole_words():
+    # 逐字符对齐时 "视" 可能落到被删的 "要视" 上，整词修正后保留单字词 "视"
+    keep, ratio = align_words("视需来", _orig(["视", "要视", "需来"]))
+    assert keep == [0, 2]
+    assert ratio == 1.0
+
+
+def _lcs(a, b):
+    row = [0] * (len(b) + 1)
+    for x in a:
+        prev = row[:]
+        for j, y in enumerate(b):
+            row[j + 1] = prev[j] + 1 if x == y else max(row[j], prev[j + 1])
+    return row[-1]
+
+
+def test_align_text_is_exact_lcs_on_small_alphabet():
+    rng = random.Random(7)
+    for _ in range(30):
+        src = "".join(rng.choice("的是了") for _ in range(rng.randint(1, 120)))
+        out = "".join(rng.choice("的是了") for _ in range(rng.randint(1, 60)))
+        _, ratio = align_words(out, _orig(list(src)))
+        assert round(ratio * len(out)) == _lcs(src, out)
+
+
+def test_align_repeated_characters_are_not_cut_off():
+    words = _orig(["的"] * 12500 + ["是"] * 12500)
+    keep, ratio = align_words("的" * 12500 + "是" * 12500, words)
+    assert ratio == 1.0
+    assert len(keep) == 25000
+
+
+def _best_ms(fn, runs=7):
+    best = float("inf")
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000, result
+
+
+def _transcript(n=50000):
+    rng = random.Random(1)
+    vocab = ["".join(chr(0x4E00 + rng.randrange(3000)) for _ in range(rng.choice((1, 1, 2, 2, 3))))
+             for _ in range(5000)]
+    words = []
+    for k in range(n):
+        words.append("[0.500 sec]" if k % 15 == 14 else rng.choice(vocab))
+    kept = [k for k in range(n) if rng.random() > 0.3]
+    return _orig(words), kept
+
+
+def test_align_50k_words_under_50ms():
+    words, kept = _transcript()
+    out = [words[k]["word"] for k in kept]
+    ms, (keep, ratio) = _best_ms(lambda: align_words(out, words))
+    assert ratio == 1.0
+    assert [words[k]["word"] for k in keep] == out
+    assert ms < 50
+
+    text = "".join(w for w in out if not w.startswith("["))
+    ms, (keep, ratio) = _best_ms(lambda: align_words(text, words))
+    assert ratio == 1.0
+    assert "".join(words[k]["word"] for k in keep if not words[k]["word"].startswith("[")) == text
+    assert ms < 50
+
+
+def test_align_50k_repetitive_words_under_50ms():
+    words = _orig(["的"] * 25000 + ["是"] * 25000)
+    ms, (_, ratio) = _best_ms(lambda: align_words(["的", "是"] * 20000, words))
+    assert ratio == 20001 / 40000
+    assert ms < 50
+    ms, (_, ratio) = _best_ms(lambda: align_words("的是" * 20000, words))
+    assert ratio == 20001 / 40000
+    assert ms < 50
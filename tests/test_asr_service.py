@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+import asr_service
+from asr_service import SAMPLE_RATE, asr_service as service
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    # 两分钟音频，每 20 秒一段 1 秒静音；调度器只记录窗口，每个窗口返回一个覆盖整窗的分段
+    audio = np.full(120 * SAMPLE_RATE, 0.5, dtype=np.float32)
+    for t in range(20, 120, 20):
+        audio[t * SAMPLE_RATE:(t + 1) * SAMPLE_RATE] = 0.0
+    runs = []
+
+    def run(key, audio, spans, timeout=None):
+        runs.append(list(spans))
+        for i, (start, end) in enumerate(spans):
+            yield i, [{"start": 0.0, "end": (end - start) / SAMPLE_RATE, "text": "x", "words": []}]
+
+    monkeypatch.setattr(asr_service, "load_audio", lambda path, content_hash=None: audio)
+    monkeypatch.setattr(asr_service.scheduler, "run", run)
+    return runs
+
+
+def test_whole_file_by_default(calls, monkeypatch):
+    monkeypatch.setattr(asr_service.config, "ASR_WINDOW_SECONDS", 0.0)
+    segments = service.transcribe("a.wav", chunk_seconds=0, workers=1)
+    assert calls == [[(0, 120 * SAMPLE_RATE)]]
+    assert len(segments) == 1
+
+
+def test_windows_when_configured(calls, monkeypatch):
+    monkeypatch.setattr(asr_service.config, "ASR_WINDOW_SECONDS", 30.0)
+    segments = service.transcribe("a.wav", chunk_seconds=0, workers=1)
+    spans = calls[0]
+    assert len(spans) > 1
+    assert max(end - start for start, end in spans) <= 30 * SAMPLE_RATE
+    assert spans[0][0] == 0 and spans[-1][1] == 120 * SAMPLE_RATE
+    assert segments[-1]["end"] == pytest.approx(120.0, abs=0.1)
+
+
+class FakePool:
+    def __init__(self, on_result=None):
+        self.on_result = on_result
+        self.shut_down = False
+
+    def submit(self, fn, piece, offset):
+        pool = self
+
+        class Future:
+            def result(self):
+                if pool.on_result is not None:
+                    pool.on_result()
+                return []
+        return Future()
+
+    def shutdown(self, wait=True):
+        self.shut_down = True
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    fake = FakePool()
+    monkeypatch.setattr(asr_service.engine_registry, "idle_timeout", 10.0)
+    monkeypatch.setattr(asr_service.engine_registry, "unload_idle", lambda: None)
+    monkeypatch.setattr(service, "_pool", fake)
+    monkeypatch.setattr(service, "_pool_key", ("key", 2))
+    monkeypatch.setattr(service, "_pool_busy", 0)
+    return fake
+
+
+def test_reaper_skips_pool_with_work_in_flight(calls, pool, monkeypatch):
+    # 进程池上一次使用已经超时，转录期间触发空闲卸载
+    monkeypatch.setattr(service, "_pool_last_used", 0.0)
+    monkeypatch.setattr(service, "_get_pool", lambda key, workers: pool)
+    pool.on_result = lambda: (monkeypatch.setattr(service, "_pool_last_used", 0.0), service.unload_idle())
+    service.transcribe("a.wav", chunk_seconds=20, workers=2)
+    assert not pool.shut_down
+    assert service._pool_busy == 0
+
+
+def test_reaper_shuts_down_idle_pool(pool, monkeypatch):
+    monkeypatch.setattr(service, "_pool_last_used", 0.0)
+    service.unload_idle()
+    assert pool.shut_down and service._pool is None
+
+
+def test_cache_key_follows_effective_split(monkeypatch):
+    monkeypatch.setattr(asr_service.config, "ASR_CHUNK_SECONDS", 0.0)
+    monkeypatch.setattr(asr_service.config, "ASR_WORKERS", 1)
+    monkeypatch.setattr(asr_service.config, "ASR_WINDOW_SECONDS", 0.0)
+    key = service.cache_key
+    # 整段转录与进程数无关
+    assert key("h", chunk_seconds=0) == key("h", chunk_seconds=0, workers=4)
+    assert key("h", chunk_seconds=0) != key("h", chunk_seconds=30)
+    # 进程池与调度器分开缓存，具体进程数不影响
+    assert key("h", chunk_seconds=30, workers=2) == key("h", chunk_seconds=30, workers=4)
+    assert key("h", chunk_seconds=30, workers=2) != key("h", chunk_seconds=30, workers=1)
+    # 开启窗口后 /asr（不分块）与异步任务（30 秒分块）的切分相同，共用一份缓存；窗口大小变了就不再命中
+    monkeypatch.setattr(asr_service.config, "ASR_WINDOW_SECONDS", 30.0)
+    assert key("h", chunk_seconds=0) == key("h", chunk_seconds=30)
+    windowed = key("h", chunk_seconds=0)
+    monkeypatch.setattr(asr_service.config, "ASR_WINDOW_SECONDS", 15.0)
+    assert key("h", chunk_seconds=0) != windowed
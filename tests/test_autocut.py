@@ -0,0 +1,67 @@
+import numpy as np
+from autocut import (find_cuts, autocut_words, cut_list, REASON_KEEP, REASON_GAP, REASON_FILLER,
+                     REASON_REPEAT)
+from word_store import WordStore
+
+
+def _reasons(words, **kwargs):
+    strings = sorted({w for w, _, _ in words})
+    table = {s: i for i, s in enumerate(strings)}
+    word_text = np.array([table[w] for w, _, _ in words], dtype=np.int64)
+    start = np.array([s for _, s, _ in words], dtype=np.float64)
+    end = np.array([e for _, _, e in words], dtype=np.float64)
+    gap = np.array([w.startswith("[") for w, _, _ in words], dtype=bool)
+    kwargs.setdefault("max_gap", 0.5)
+    kwargs.setdefault("fillers", ["嗯", "那个"])
+    kwargs.setdefault("max_repeat", 3)
+    return find_cuts(word_text, strings, start, end, gap, **kwargs).tolist()
+
+
+def test_gaps_and_fillers():
+    words = [("大家", 0.0, 0.5), ("[0.300 sec]", 0.5, 0.8), ("好", 0.8, 1.0), ("[0.900 sec]", 1.0, 1.9),
+             ("嗯", 1.9, 2.2), ("那个，", 2.2, 2.5), ("开始", 2.5, 3.0)]
+    assert _reasons(words) == [REASON_KEEP, REASON_KEEP, REASON_KEEP, REASON_GAP,
+                               REASON_FILLER, REASON_FILLER, REASON_KEEP]
+
+
+def test_repeated_phrase_keeps_last():
+    # 重复比较跳过停顿和口头禅
+    words = [("我们", 0.0, 0.3), ("今天", 0.3, 0.6), ("嗯", 0.6, 0.8), ("我们", 0.8, 1.1), ("今天", 1.1, 1.4),
+             ("讲", 1.4, 1.6)]
+    assert _reasons(words) == [REASON_REPEAT, REASON_REPEAT, REASON_FILLER, REASON_KEEP, REASON_KEEP,
+                               REASON_KEEP]
+
+
+def test_single_char_doubling_needs_pause():
+    # 叠词紧挨着说不算重复，中间有停顿才算口吃
+    assert _reasons([("谢", 0.0, 0.2), ("谢", 0.2, 0.4)]) == [REASON_KEEP, REASON_KEEP]
+    assert _reasons([("我", 0.0, 0.2), ("我", 0.5, 0.7)]) == [REASON_REPEAT, REASON_KEEP]
+
+
+def test_max_repeat_limits_phrase_length():
+    words = [("a", 0, 1), ("b", 1, 2), ("c", 2, 3), ("a", 3, 4), ("b", 4, 5), ("c", 5, 6)]
+    assert _reasons(words, max_repeat=2) == [REASON_KEEP] * 6
+    assert _reasons(words, max_repeat=3) == [REASON_REPEAT] * 3 + [REASON_KEEP] * 3
+
+
+def test_empty():
+    assert _reasons([]) == []
+
+
+def test_autocut_words_and_cut_list():
+    words = [{"word": "嗯", "start": 0.0, "end": 0.3, "is_gap": False},
+             {"word": "大家", "start": 0.3, "end": 0.6, "is_gap": False},
+             {"word": "大家", "start": 0.6, "end": 0.9, "is_gap": False},
+             {"word": "[1.000 sec]", "start": 0.9, "end": 1.9, "is_gap": True},
+             {"word": "好", "start": 1.9, "end": 2.1, "is_gap": False}]
+    assert autocut_words(words, max_gap=0.5, fillers="嗯,啊") == [0, 1, 3]
+
+    segments = [{"start": w["start"], "end": w["end"], "text": w["word"],
+                 "words": [{k: w[k] for k in ("word", "start", "end")}]} for w in words]
+    store = WordStore.from_segments(segments)
+    reasons = np.array([REASON_FILLER, REASON_REPEAT, REASON_KEEP, REASON_GAP, REASON_GAP], dtype=np.uint8)
+    assert cut_list(store, reasons) == [
+        {"first": 0, "last": 0, "start": 0.0, "end": 0.3, "reason": "filler"},
+        {"first": 1, "last": 1, "start": 0.3, "end": 0.6, "reason": "repeat"},
+        {"first": 3, "last": 4, "start": 0.9, "end": 2.1, "reason": "gap"},
+    ]
@@ -0,0 +1,59 @@
+import random
+import numpy as np
+from edit_history import EditHistory, Fenwick
+
+
+def test_fenwick_prefix_and_select_match_bruteforce():
+    rng = random.Random(0)
+    for n in (1, 2, 7, 64, 100):
+        flags = np.array([rng.random() < 0.6 for _ in range(n)], dtype=bool)
+        tree = Fenwick(flags)
+        for _ in range(20):
+            i = rng.randrange(n)
+            flags[i] = not flags[i]
+            tree.add(i, 1 if flags[i] else -1)
+        for i in range(n + 1):
+            assert tree.prefix(i) == int(flags[:i].sum())
+        alive = np.flatnonzero(flags).tolist()
+        assert [tree.select(k) for k in range(len(alive))] == alive
+
+
+def test_fenwick_empty():
+    tree = Fenwick(np.zeros(0, dtype=bool))
+    assert tree.prefix(0) == 0
+
+
+def _words(n):
+    return [{"word": f"w{i}", "start": i, "end": i + 1} for i in range(n)]
+
+
+def test_delete_undo_redo():
+    history = EditHistory()
+    words = _words(10)
+    history.reset(words)
+    # 行号按删除前的可见行计算，重复和越界的行忽略
+    assert history.delete_rows([1, 3, 3, 42]).tolist() == [1, 3]
+    assert history.delete_rows([0, 1]).tolist() == [0, 2]
+    assert [w["word"] for w in history.visible_words()] == ["w4", "w5", "w6", "w7", "w8", "w9"]
+    assert history.base_index(0) == 4 and history.row_of(7) == 3
+
+    assert history.undo() == [(0, words[0]), (1, words[2])]
+    assert history.undo() == [(1, words[1]), (3, words[3])]
+    assert history.visible_words() == words
+    assert history.undo() is None and history.can_redo()
+
+    assert history.redo() == [1, 3]
+    assert [w["word"] for w in history.visible_words()] == ["w0", "w2", "w4", "w5", "w6", "w7", "w8", "w9"]
+    # 新的删除清空重做栈
+    history.delete_rows([0])
+    assert not history.can_redo()
+
+
+def test_history_limit():
+    history = EditHistory(limit=2)
+    history.reset(_words(5))
+    for _ in range(3):
+        history.delete_rows([0])
+    assert history.undo() and history.undo() and history.undo() is None
+    # 超出上限的操作不能撤销，对应的词保持删除
+    assert [w["word"] for w in history.visible_words()] == ["w1", "w2", "w3", "w4"]
@@ -0,0 +1,37 @@
+import pytest
+from edit_timeline import EditTimeline
+
+RANGES = [[1.0, 3.0], [5.0, 6.0], [8.0, 10.0]]
+
+
+def test_duration_and_empty_ranges_dropped():
+    timeline = EditTimeline(RANGES + [[11.0, 11.0]])
+    assert timeline.duration == 5.0
+    assert len(timeline.ranges) == 3
+    assert not EditTimeline([])
+
+
+def test_range_index_at():
+    timeline = EditTimeline(RANGES)
+    assert [timeline.range_index_at(t) for t in (0.5, 1.0, 2.9, 3.0, 5.5, 9.99, 10.0)] == [-1, 0, 0, -1, 1, 2, -1]
+    assert [timeline.next_range_index(t) for t in (0.0, 2.0, 4.0, 7.0, 10.5)] == [0, 0, 1, 2, -1]
+
+
+def test_to_edit_time_snaps_deleted_time_forward():
+    timeline = EditTimeline(RANGES)
+    assert timeline.to_edit_time(2.0) == 1.0
+    assert timeline.to_edit_time(5.5) == 2.5
+    # 落在删除区间里的时间对齐到下一个保留区间的起点
+    assert timeline.to_edit_time(4.0) == 2.0
+    assert timeline.to_edit_time(0.0) == 0.0
+    assert timeline.to_edit_time(12.0) == 5.0
+
+
+def test_to_source_time_round_trip():
+    timeline = EditTimeline(RANGES)
+    for t in (1.0, 2.5, 5.0, 5.9, 8.0, 9.5):
+        assert timeline.to_source_time(timeline.to_edit_time(t)) == pytest.approx(t)
+    assert timeline.to_source_time(2.0) == 5.0
+    assert timeline.to_source_time(-1.0) == 1.0
+    assert timeline.to_source_time(99.0) == 10.0
+    assert EditTimeline([]).to_source_time(1.0) == 0.0
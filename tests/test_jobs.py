@@ -0,0 +1,81 @@
+import threading
+from jobs import ASRJob, JobManager
+
+
+def _wait(job):
+    events = list(job.events(poll_timeout=0.05))
+    assert events[-1]["type"] in ("done", "error")
+    return events
+
+
+def test_events_replay_segments_progress_and_done():
+    job = ASRJob("a.wav")
+    job.set_running()
+    job.add_segments([{"text": "a"}])
+    job.set_progress(0.5)
+    job.finish([{"text": "a"}, {"text": "b"}])
+    events = list(job.events())
+    assert [e["type"] for e in events] == ["segment", "segment", "progress", "done"]
+    assert [e["segment"]["text"] for e in events[:2]] == ["a", "b"]
+    assert events[2]["progress"] == 100.0
+    assert events[-1]["segments"] == 2
+    # 重连后从头重放
+    assert list(job.events()) == events
+
+
+def test_events_follow_a_running_job():
+    job = ASRJob("a.wav")
+    job.set_running()
+    step = threading.Event()
+    events = []
+
+    def consume():
+        for event in job.events(poll_timeout=0.05):
+            events.append(event)
+            step.set()
+
+    thread = threading.Thread(target=consume)
+    thread.start()
+    job.add_segments([{"text": "a"}])
+    assert step.wait(5)
+    job.set_progress(0.25)
+    job.fail("boom")
+    thread.join(5)
+    assert not thread.is_alive()
+    assert {"type": "segment", "segment": {"text": "a"}} in events
+    assert events[-1] == {"type": "error", "error": "boom"}
+
+
+def test_events_send_heartbeats_while_idle():
+    job = ASRJob("a.wav")
+    events = job.events(poll_timeout=0.01)
+    assert next(events) == {"type": "progress", "progress": 0.0}
+    assert next(events) == {"type": "heartbeat"}
+
+
+def test_progress_is_clamped():
+    job = ASRJob("a.wav")
+    job.set_progress(1.7)
+    assert job.progress == 100.0
+    job.set_progress(-1)
+    assert job.progress == 0.0
+
+
+def test_manager_runs_jobs_and_records_failures():
+    manager = JobManager()
+    ok = manager.submit("a.wav", lambda job: [{"text": "a"}])
+    bad = manager.submit("b.wav", lambda job: 1 / 0)
+    assert _wait(ok)[-1] == {"type": "done", "segments": 1}
+    assert _wait(bad)[-1]["type"] == "error"
+    assert manager.get(ok.id).result == [{"text": "a"}]
+    assert manager.get(bad.id).info()["status"] == "error"
+    assert manager.get("missing") is None
+
+
+def test_manager_drops_finished_jobs_after_ttl():
+    manager = JobManager(ttl=0)
+    job = manager.submit("a.wav", lambda job: [])
+    _wait(job)
+    job.updated -= 1
+    manager.submit("b.wav", lambda job: [])
+    assert manager.get(job.id) is None
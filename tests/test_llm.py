@@ -0,0 +1,181 @@
+import io
+import os
+import contextlib
+import pytest
+import requests
+from llm import split_windows, parse_indices, optimize_words, _cache_load
+from llm_stub import StubHandler, start_stub
+from fixtures import FILLERS
+from disk_cache import DiskLRUCache
+
+WORDS = ["大家", "好", "嗯", "今天", "今天", "我们", "[0.800 sec]", "来", "讲", "那个", "剪辑", "[0.400 sec]",
+         "就是", "怎么", "怎么", "快速", "地", "剪", "视频", "[1.200 sec]", "谢谢", "大家"] * 5
+
+
+def expected_keep(texts):
+    # 与替身的规则一致：去掉停顿、口头禅和与前一条相同的条目
+    return [i for i, t in enumerate(texts)
+            if not (t.startswith("[") and t.endswith("sec]")) and t not in FILLERS
+            and not (i and texts[i - 1] == t)]
+
+
+def _optimize(words, base_url, **kwargs):
+    kwargs.setdefault("use_cache", False)
+    kwargs.setdefault("rate_limit", 0)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return optimize_words([{"word": w} for w in words], "stub", "stub", base_url, **kwargs)
+
+
+@pytest.fixture
+def stub():
+    server, base_url = start_stub()
+    yield base_url
+    server.shutdown()
+
+
+def test_split_windows_cover_all_words():
+    texts = ["a"] * 23
+    windows = split_windows(texts, 5, 2)
+    assert windows[0][1] == 0 and windows[-1][2] == len(texts)
+    for (lo, c0, c1, hi), nxt in zip(windows, windows[1:] + [None]):
+        assert lo == max(0, c0 - 2) and hi == min(len(texts), c1 + 2)
+        if nxt is not None:
+            assert nxt[1] == c1
+
+
+def test_split_windows_cut_after_gap():
+    # 窗口后半段有停顿时在停顿之后切开
+    texts = ["a", "b", "c", "d", "e", "[0.5 sec]", "f", "g", "h", "i"]
+    assert split_windows(texts, 8, 0)[0] == (0, 0, 6, 6)
+
+
+def test_split_windows_empty():
+    assert split_windows([], 10, 3) == []
+
+
+def test_parse_indices_filters_core():
+    assert parse_indices("保留：[5, 1, 3, 3, 9]", 1, 6) == [1, 3, 5]
+    with pytest.raises(ValueError):
+        parse_indices("好的，已经处理完毕", 0, 10)
+
+
+@pytest.mark.parametrize("window_items", [7, 20, 1000])
+def test_optimize_words_stitches_windows(stub, window_items):
+    # 分窗口拼回的结果与整体一次判断相同，窗口边界处的重复由上下文识别
+    assert _optimize(WORDS, stub, window_items=window_items, overlap=3) == expected_keep(WORDS)
+
+
+def test_optimize_words_reuses_cached_windows(stub, tmp_path):
+    cache = DiskLRUCache(str(tmp_path), 1024 * 1024, suffix=".json")
+    _optimize(WORDS, stub, window_items=10, overlap=3, use_cache=True, cache=cache)
+    progress = []
+    edited = WORDS[:50] + WORDS[51:]
+    keep = _optimize(edited, stub, window_items=10, overlap=3, use_cache=True, cache=cache,
+                     on_progress=lambda done, total: progress.append((done, total)))
+    assert keep == expected_keep(edited)
+    # 第一次回调是命中缓存的窗口数，之后每请求完一个窗口回调一次
+    total = progress[-1][1]
+    assert progress[-1][0] == total and len(progress) - 1 < total
+
+
+class GarbledOnceHandler(StubHandler):
+    calls_by_prompt = {}
+
+    def reply(self, prompt):
+        seen = self.calls_by_prompt.get(prompt, 0)
+        self.calls_by_prompt[prompt] = seen + 1
+        return "抱歉，我无法处理这个请求。" if not seen else super().reply(prompt)
+
+
+class GarbledHandler(StubHandler):
+    def reply(self, prompt):
+        return "当然可以！保留的编号如下：第一条、第二条"
+
+
+class EmptyOnceHandler(StubHandler):
+    calls_by_prompt = {}
+
+    def reply(self, prompt):
+        seen = self.calls_by_prompt.get(prompt, 0)
+        self.calls_by_prompt[prompt] = seen + 1
+        return "[]" if not seen else super().reply(prompt)
+
+
+class EmptyHandler(StubHandler):
+    def reply(self, prompt):
+        return "[]"
+
+
+class RejectedHandler(StubHandler):
+    rejected = 0
+
+    def do_POST(self):
+        RejectedHandler.rejected += 1
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_error(400, "invalid request")
+
+
+def test_optimize_words_retries_garbled_reply():
+    server, base_url = start_stub(handler_cls=GarbledOnceHandler)
+    try:
+        words = WORDS[:20]
+        assert _optimize(words, base_url, window_items=100, max_retries=1) == expected_keep(words)
+    finally:
+        server.shutdown()
+
+
+def test_optimize_words_gives_up_on_garbled_reply():
+    server, base_url = start_stub(handler_cls=GarbledHandler)
+    try:
+        with pytest.raises(RuntimeError):
+            _optimize(WORDS[:20], base_url, window_items=100, max_retries=0)
+    finally:
+        server.shutdown()
+
+
+def test_optimize_words_retries_empty_reply():
+    server, base_url = start_stub(handler_cls=EmptyOnceHandler)
+    try:
+        words = WORDS[:20]
+        assert _optimize(words, base_url, window_items=100, max_retries=1) == expected_keep(words)
+    finally:
+        server.shutdown()
+
+
+def test_optimize_words_keeps_window_on_persistent_empty_reply(tmp_path):
+    # 一直回复空数组时整个窗口保留原文，且不写入缓存
+    server, base_url = start_stub(handler_cls=EmptyHandler)
+    cache = DiskLRUCache(str(tmp_path), 1024 * 1024, suffix=".json")
+    try:
+        words = WORDS[:20]
+        keep = _optimize(words, base_url, window_items=100, max_retries=1, use_cache=True, cache=cache)
+        assert keep == list(range(len(words)))
+        assert os.listdir(tmp_path) == []
+    finally:
+        server.shutdown()
+
+
+def test_optimize_words_accepts_empty_reply_for_pauses(stub):
+    # 全是停顿的窗口删光是正常的
+    words = ["[0.500 sec]", "[0.800 sec]", "[1.000 sec]"]
+    assert _optimize(words, stub, window_items=100, max_retries=0) == []
+
+
+def test_optimize_words_rejected_reply_not_retried():
+    # 4xx（限流除外）说明请求本身有问题，不重试
+    server, base_url = start_stub(handler_cls=RejectedHandler)
+    try:
+        with pytest.raises(requests.HTTPError):
+            _optimize(WORDS[:20], base_url, window_items=100, max_retries=3)
+        assert RejectedHandler.rejected == 1
+    finally:
+        server.shutdown()
+
+
+
+@pytest.mark.parametrize("data", [b"not json", b"[1, 2]", b"{\"keep\": [1]}", b"{\"created\": \"x\", \"keep\": [1]}",
+                                  b"{\"created\": 1e12, \"keep\": 5}", b"null"])
+def test_cache_load_treats_bad_entries_as_miss(tmp_path, data):
+    cache = DiskLRUCache(str(tmp_path), 1024 * 1024, suffix=".json")
+    cache.put_bytes("k", data)
+    assert _cache_load(cache, "k") is None
@@ -0,0 +1,45 @@
+"""
+后端接口测试：只覆盖不需要 ASR 模型的路径
+"""
+import os
+import pytest
+from fastapi.testclient import TestClient
+import main
+
+client = TestClient(main.app)
+
+
+def test_submit_job_removes_upload_when_submit_fails(monkeypatch):
+    saved = []
+
+    def save_upload(file, **kwargs):
+        result = original(file, **kwargs)
+        saved.append(result[0])
+        return result
+
+    def submit(filename, fn):
+        raise RuntimeError("executor shut down")
+
+    original = main.save_upload
+    monkeypatch.setattr(main, "save_upload", save_upload)
+    monkeypatch.setattr(main.job_manager, "submit", submit)
+    # 测试环境不一定装了 ASR 引擎
+    monkeypatch.setattr(main, "check_engine", lambda engine: engine)
+    with pytest.raises(RuntimeError):
+        client.post("/asr/jobs", files={"file": ("a.wav", b"RIFF0000WAVE", "audio/wav")})
+    assert len(saved) == 1 and not os.path.exists(saved[0])
+
+
+def test_chunk_beyond_upload_size_is_rejected():
+    upload = client.post("/uploads", data={"filename": "a.wav", "size": "4"}).json()
+    response = client.put(f"/uploads/{upload['upload_id']}?offset=0", content=b"012345")
+    assert response.status_code == 413
+    assert client.get(f"/uploads/{upload['upload_id']}").json()["offset"] == 0
+    assert client.put(f"/uploads/{upload['upload_id']}?offset=0", content=b"0123").json()["offset"] == 4
+    assert client.post(f"/uploads/{upload['upload_id']}/complete").json()["complete"]
+    os.remove(main.upload_manager.take(upload["upload_id"])[0])
+
+
+def test_upload_over_server_limit_is_rejected(monkeypatch):
+    monkeypatch.setattr(main.upload_manager, "max_size", 8)
+    assert client.post("/uploads", data={"filename": "a.wav", "size": "9"}).status_code == 413
@@ -0,0 +1,102 @@
+import queue
+import threading
+import numpy as np
+import pytest
+from model_registry import ModelRegistry
+from scheduler import InferenceScheduler
+
+BAD = -1.0
+
+
+class Model:
+    def __init__(self):
+        self.batches = []
+        self.entered = threading.Event()
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def __call__(self, model, pieces):
+        self.entered.set()
+        self.gate.wait(5)
+        self.batches.append(len(pieces))
+        if any((p == BAD).any() for p in pieces):
+            raise RuntimeError("bad window")
+        return [float(p[0]) for p in pieces]
+
+
+def _scheduler(batch_size=4, max_queue=16):
+    model = Model()
+    return InferenceScheduler(ModelRegistry(lambda name: name), model, batch_size=batch_size,
+                              max_queue=max_queue, sample_rate=10), model
+
+
+def _spans(n, size=10):
+    return [(i * size, (i + 1) * size) for i in range(n)]
+
+
+def _audio(values, size=10):
+    return np.repeat(np.asarray(values, dtype=np.float32), size)
+
+
+def test_results_in_window_order():
+    scheduler, model = _scheduler(batch_size=3)
+    results = list(scheduler.run("base", _audio(range(7)), _spans(7)))
+    assert results == [(i, float(i)) for i in range(7)]
+    assert sum(model.batches) == 7 and max(model.batches) <= 3
+    assert scheduler.stats()["windows"] == 7
+    assert scheduler.stats()["requests"] == 0
+
+
+def test_windows_of_concurrent_requests_share_batches():
+    scheduler, model = _scheduler(batch_size=4)
+    model.gate.clear()
+    blocker = scheduler.submit("base", _audio([9]), _spans(1))
+    # 推理线程正在执行 blocker 时提交的请求进入同一批
+    assert model.entered.wait(5)
+    first = scheduler.submit("base", _audio([1, 2]), _spans(2))
+    second = scheduler.submit("base", _audio([3, 4]), _spans(2))
+    model.gate.set()
+    assert list(scheduler.results(blocker)) == [(0, 9.0)]
+    assert list(scheduler.results(first)) == [(0, 1.0), (1, 2.0)]
+    assert list(scheduler.results(second)) == [(0, 3.0), (1, 4.0)]
+    assert model.batches[1] == 4
+
+
+def test_failing_window_only_fails_its_request():
+    scheduler, model = _scheduler(batch_size=4)
+    model.gate.clear()
+    blocker = scheduler.submit("base", _audio([9]), _spans(1))
+    assert model.entered.wait(5)
+    bad = scheduler.submit("base", _audio([1, BAD]), _spans(2))
+    good = scheduler.submit("base", _audio([3, 4]), _spans(2))
+    model.gate.set()
+    list(scheduler.results(blocker))
+    with pytest.raises(RuntimeError):
+        list(scheduler.results(bad))
+    assert list(scheduler.results(good)) == [(0, 3.0), (1, 4.0)]
+    # 失败后调度器继续工作
+    assert list(scheduler.run("base", _audio([5]), _spans(1))) == [(0, 5.0)]
+
+
+def test_full_queue_raises_after_timeout():
+    scheduler, model = _scheduler(max_queue=1)
+    first = scheduler.submit("base", _audio([1]), _spans(1))
+    with pytest.raises(queue.Full):
+        scheduler.submit("base", _audio([2]), _spans(1), timeout=0.05)
+    # 取完结果后让出位置
+    assert list(scheduler.results(first)) == [(0, 1.0)]
+    assert list(scheduler.run("base", _audio([2]), _spans(1), timeout=1)) == [(0, 2.0)]
+
+
+def test_abandoned_request_frees_its_slot():
+    scheduler, _ = _scheduler(max_queue=1)
+    results = scheduler.run("base", _audio(range(5)), _spans(5))
+    assert next(results) == (0, 0.0)
+    results.close()
+    assert scheduler.stats()["requests"] == 0
+    assert list(scheduler.run("base", _audio([7]), _spans(1), timeout=1)) == [(0, 7.0)]
+
+
+def test_empty_request():
+    scheduler, _ = _scheduler()
+    assert list(scheduler.run("base", _audio([]), [])) == []
@@ -0,0 +1,150 @@
+import asyncio
+import hashlib
+import os
+import pytest
+import uploads
+from uploads import UploadManager, UploadTooLarge, resolve_local_path
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "media"
+    root.mkdir()
+    (root / "a.mp4").write_bytes(b"video")
+    (root / "sub").mkdir()
+    (root / "sub" / "b.mp4").write_bytes(b"video")
+    outside = tmp_path / "secret.txt"
+    outside.write_bytes(b"secret")
+    # 前缀相同但不是子目录
+    sibling = tmp_path / "media2"
+    sibling.mkdir()
+    (sibling / "c.mp4").write_bytes(b"video")
+    return root, outside, sibling
+
+
+def test_resolve_allows_files_inside_root(tree):
+    root, _, _ = tree
+    assert resolve_local_path(str(root / "a.mp4"), [str(root)]) == os.path.realpath(root / "a.mp4")
+    assert resolve_local_path(str(root / "sub" / "b.mp4"), [str(root)]) == os.path.realpath(root / "sub" / "b.mp4")
+
+
+def test_resolve_disabled_without_roots(tree):
+    root, _, _ = tree
+    with pytest.raises(PermissionError):
+        resolve_local_path(str(root / "a.mp4"), [])
+
+
+def test_resolve_rejects_dot_dot(tree):
+    root, outside, _ = tree
+    with pytest.raises(PermissionError):
+        resolve_local_path(str(root / ".." / outside.name), [str(root)])
+
+
+def test_resolve_rejects_prefix_sibling(tree):
+    root, _, sibling = tree
+    with pytest.raises(PermissionError):
+        resolve_local_path(str(sibling / "c.mp4"), [str(root)])
+
+
+def test_resolve_follows_symlinks(tree):
+    root, outside, _ = tree
+    link = root / "link.txt"
+    try:
+        link.symlink_to(outside)
+    except (OSError, NotImplementedError):
+        pytest.skip("symlinks not supported")
+    with pytest.raises(PermissionError):
+        resolve_local_path(str(link), [str(root)])
+    # 指向允许目录内的链接按真实路径放行
+    inner = root / "inner.mp4"
+    inner.symlink_to(root / "a.mp4")
+    assert resolve_local_path(str(inner), [str(root)]) == os.path.realpath(root / "a.mp4")
+
+
+def test_resolve_missing_file_and_directory(tree):
+    root, _, _ = tree
+    with pytest.raises(FileNotFoundError):
+        resolve_local_path(str(root / "missing.mp4"), [str(root)])
+    with pytest.raises(FileNotFoundError):
+        resolve_local_path(str(root / "sub"), [str(root)])
+
+
+def test_resolve_different_drive_is_rejected(tree, monkeypatch):
+    root, _, _ = tree
+
+    def commonpath(paths):
+        raise ValueError("Paths don't have the same drive")
+
+    monkeypatch.setattr(uploads.os.path, "commonpath", commonpath)
+    with pytest.raises(PermissionError):
+        resolve_local_path(str(root / "a.mp4"), [str(root)])
+
+
+async def _stream(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+def _append(manager, session, offset, *chunks, length=None):
+    return asyncio.run(manager.append(session, offset, _stream(*chunks), length))
+
+
+def test_chunked_upload_round_trip():
+    manager = UploadManager()
+    session = manager.create("a.mp4", size=10)
+    assert _append(manager, session, 0, b"01234", b"") == 5
+    with pytest.raises(ValueError):
+        _append(manager, session, 3, b"xx")
+    assert _append(manager, session, 5, b"56789") == 10
+    manager.complete(session)
+    path, sha256, filename = manager.take(session.id)
+    try:
+        assert sha256 == hashlib.sha256(b"0123456789").hexdigest() and filename == "a.mp4"
+        with open(path, "rb") as f:
+            assert f.read() == b"0123456789"
+    finally:
+        os.remove(path)
+
+
+def test_chunk_beyond_declared_size_is_not_written():
+    manager = UploadManager()
+    session = manager.create("a.mp4", size=4)
+    with pytest.raises(UploadTooLarge):
+        _append(manager, session, 0, b"012345", length=6)
+    # 没有声明长度时边读边检查
+    with pytest.raises(UploadTooLarge):
+        _append(manager, session, 0, b"01", b"2345")
+    assert session.offset == 0 and os.path.getsize(session.path) == 0
+    assert _append(manager, session, 0, b"0123") == 4
+    manager.complete(session)
+    os.remove(manager.take(session.id)[0])
+
+
+def test_server_limit_applies_without_declared_size():
+    manager = UploadManager(max_size=8)
+    with pytest.raises(UploadTooLarge):
+        manager.create("a.mp4", size=9)
+    with pytest.raises(ValueError):
+        manager.create("a.mp4", size=-1)
+    session = manager.create("a.mp4")
+    assert _append(manager, session, 0, b"0123") == 4
+    with pytest.raises(UploadTooLarge):
+        _append(manager, session, 4, b"012345")
+    assert session.offset == 4
+    os.remove(session.path)
+
+
+def test_save_upload_limit_removes_temp_file(monkeypatch, tmp_path):
+    class File:
+        def __init__(self, data):
+            self.file = open(data, "rb")
+
+    data = tmp_path / "in.bin"
+    data.write_bytes(b"x" * 100)
+    monkeypatch.setattr(uploads.tempfile, "tempdir", str(tmp_path / "tmp"))
+    os.mkdir(tmp_path / "tmp")
+    with pytest.raises(UploadTooLarge):
+        uploads.save_upload(File(data), max_size=99)
+    assert os.listdir(tmp_path / "tmp") == []
+    path, sha256, size = uploads.save_upload(File(data), max_size=100)
+    assert size == 100 and sha256 == hashlib.sha256(b"x" * 100).hexdigest()
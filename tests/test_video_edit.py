@@ -0,0 +1,97 @@
+import pytest
+from video_edit import TIME_EPS, plan_smart_render, snap_segments, split_balanced_chunks
+
+KEYFRAMES = [0.0, 2.0, 4.0, 6.0, 8.0, 10.0]
+
+
+def test_plan_copies_whole_gops_and_encodes_boundaries():
+    assert plan_smart_render([(1.0, 7.0)], KEYFRAMES) == [("encode", 1.0, 2.0), ("copy", 2.0, 6.0),
+                                                         ("encode", 6.0, 7.0)]
+
+
+def test_plan_segment_on_keyframes_is_copied():
+    assert plan_smart_render([(2.0, 6.0)], KEYFRAMES) == [("copy", 2.0, 6.0)]
+
+
+def test_plan_encodes_segments_without_a_full_gop():
+    # 区间内只有一个关键帧或没有关键帧
+    assert plan_smart_render([(1.5, 3.0), (4.5, 5.5)], KEYFRAMES) == [("encode", 1.5, 3.0), ("encode", 4.5, 5.5)]
+
+
+def test_plan_without_keyframes_encodes_everything():
+    assert plan_smart_render([(0.0, 3.0), (5.0, 9.0)], []) == [("encode", 0.0, 3.0), ("encode", 5.0, 9.0)]
+
+
+def test_plan_skips_empty_segments_and_covers_input():
+    segments = [(0.3, 0.3), (0.5, 4.2), (5.0, 9.9)]
+    plan = plan_smart_render(segments, KEYFRAMES)
+    assert all(end - start > TIME_EPS for _, start, end in plan)
+    # 拆出的片段首尾相接，正好覆盖非空的保留区间
+    covered = []
+    for _, start, end in plan:
+        if covered and abs(covered[-1][1] - start) <= TIME_EPS:
+            covered[-1] = (covered[-1][0], end)
+        else:
+            covered.append((start, end))
+    assert covered == [(0.5, 4.2), (5.0, 9.9)]
+
+
+VIDEO = {"r_frame_rate": "25/1", "start_time": "0.000000"}
+
+
+def test_snap_rounds_to_frames():
+    snapped = snap_segments([(0.31, 1.29)], VIDEO)
+    assert snapped == [(pytest.approx(0.32), pytest.approx(1.28))]
+
+
+def test_snap_merges_touching_and_drops_subframe_segments():
+    snapped = snap_segments([(0.0, 1.0), (1.01, 2.0), (3.0, 3.01)], VIDEO)
+    assert snapped == [(0.0, pytest.approx(2.0))]
+
+
+def test_snap_uses_stream_origin():
+    snapped = snap_segments([(1.02, 2.02)], {"r_frame_rate": "10/1", "start_time": "0.05"})
+    assert snapped == [(pytest.approx(1.05), pytest.approx(2.05))]
+
+
+def test_snap_without_frame_rate_is_identity():
+    segments = [(0.31, 1.29)]
+    assert snap_segments(segments, None) == segments
+    assert snap_segments(segments, {"r_frame_rate": "0/0"}) == segments
+
+
+def _durations(chunks):
+    return [sum(e - s for s, e in chunk) for chunk in chunks]
+
+
+def test_split_balances_output_duration():
+    segments = [(0.0, 50.0), (60.0, 65.0), (70.0, 100.0)]
+    chunks = split_balanced_chunks(segments, 30.0)
+    assert len(chunks) == 3
+    assert _durations(chunks) == [pytest.approx(28.333333, abs=1e-5)] * 3
+    # 分块边界可以落在区间中间，拼起来就是原区间
+    flat = [part for chunk in chunks for part in chunk]
+    merged = []
+    for start, end in flat:
+        if merged and abs(merged[-1][1] - start) <= TIME_EPS:
+            merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    assert merged == [(0.0, 50.0), (60.0, 65.0), (70.0, 100.0)]
+
+
+def test_split_short_input_is_one_chunk():
+    assert split_balanced_chunks([(1.0, 2.0), (3.0, 4.0)], 30.0) == [[(1.0, 2.0), (3.0, 4.0)]]
+
+
+def test_split_empty_input():
+    assert split_balanced_chunks([], 30.0) == []
+    assert split_balanced_chunks([(1.0, 1.0)], 30.0) == []
+
+
+def test_split_has_no_slivers():
+    # 浮点误差不应产生额外的碎片分块
+    segments = [(i * 0.1, i * 0.1 + 0.07) for i in range(3000)]
+    chunks = split_balanced_chunks(segments, 30.0)
+    assert len(chunks) == round(3000 * 0.07 / 30.0)
+    assert min(_durations(chunks)) > 29.0
@@ -0,0 +1,49 @@
+import random
+from word_index import WordIndex
+
+
+def _words(spans):
+    return [{"start": s, "end": e} for s, e in spans]
+
+
+def _brute(spans, t):
+    # 覆盖 t 的词中起点最晚的一个（起点相同取靠后的行）
+    best = -1
+    for row, (s, e) in enumerate(spans):
+        if s <= t < e and (best < 0 or s >= spans[best][0]):
+            best = row
+    return best
+
+
+def test_word_at_and_gaps():
+    index = WordIndex(_words([(0.0, 1.0), (1.0, 2.0), (3.0, 4.0)]))
+    assert [index.word_at(t) for t in (-0.5, 0.0, 0.99, 1.0, 2.5, 3.5, 4.0)] == [-1, 0, 0, 1, -1, 2, -1]
+    assert index.time_of(2) == (3.0, 4.0)
+    assert WordIndex().word_at(1.0) == -1
+
+
+def test_word_at_with_unsorted_and_overlapping_words():
+    spans = [(5.0, 6.0), (0.0, 10.0), (2.0, 3.0), (2.5, 2.7)]
+    index = WordIndex(_words(spans))
+    for t in (0.5, 2.1, 2.6, 2.8, 5.5, 9.0, 10.0):
+        assert index.word_at(t) == _brute(spans, t)
+
+
+def test_remove_insert_append_match_rebuild():
+    rng = random.Random(3)
+    spans = []
+    for _ in range(200):
+        s = round(rng.uniform(0, 100), 2)
+        spans.append((s, s + round(rng.uniform(0.05, 3), 2)))
+    index = WordIndex(_words(spans))
+    rows = rng.sample(range(len(spans)), 40)
+    index.remove(rows + [-1, 999])
+    spans = [sp for row, sp in enumerate(spans) if row not in set(rows)]
+    index.insert(10, _words([(50.0, 50.5), (51.0, 51.5)]))
+    spans[10:10] = [(50.0, 50.5), (51.0, 51.5)]
+    index.append(_words([(120.0, 121.0)]))
+    spans.append((120.0, 121.0))
+    assert len(index) == len(spans)
+    for _ in range(300):
+        t = rng.uniform(-1, 122)
+        assert index.word_at(t) == _brute(spans, t)
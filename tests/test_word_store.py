@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+from word_store import WordStore, FLAG_GAP, is_gap_text
+
+SEGMENTS = [
+    {"start": 0.0, "end": 1.2, "text": "大家好", "words": [
+        {"word": "大家", "start": 0.0, "end": 0.6}, {"word": "好", "start": 0.6, "end": 1.2}]},
+    {"start": 1.2, "end": 2.0, "text": "[0.800 sec]", "words": [
+        {"word": "[0.800 sec]", "start": 1.2, "end": 2.0}]},
+    {"start": 2.0, "end": 2.0, "text": "", "words": []},
+    {"start": 2.0, "end": 3.5, "text": "Hello 世界 🎬", "words": [
+        {"word": " Hello", "start": 2.0, "end": 2.4}, {"word": "世界", "start": 2.4, "end": 3.1},
+        {"word": "🎬", "start": 3.1, "end": 3.5}, {"word": "好", "start": 3.333333333333, "end": 3.5}]},
+]
+
+
+def test_is_gap_text():
+    assert is_gap_text("[0.350 sec]")
+    assert not is_gap_text("[音乐]")
+
+
+def test_bytes_round_trip():
+    store = WordStore.from_segments(SEGMENTS)
+    restored = WordStore.from_bytes(store.to_bytes())
+    assert restored.to_segments() == SEGMENTS
+    assert restored.words() == store.words()
+    assert restored.word_flags.tolist() == [0, 0, FLAG_GAP, 0, 0, 0, 0]
+    # 重复的文字在字符串表中只存一份
+    assert restored.strings.count("好") == 1
+
+
+def test_bytes_round_trip_empty():
+    store = WordStore.from_segments([])
+    restored = WordStore.from_bytes(store.to_bytes())
+    assert len(restored) == 0 and restored.n_segments == 0 and restored.duration == 0.0
+
+
+def test_from_bytes_rejects_other_payloads():
+    with pytest.raises(ValueError):
+        WordStore.from_bytes(b"{\"segments\": []}")
+    data = bytearray(WordStore.from_segments(SEGMENTS).to_bytes())
+    data[8:8 + len(b'{"version": 1')] = b'{"version": 9'
+    with pytest.raises(ValueError):
+        WordStore.from_bytes(bytes(data))
+
+
+def test_from_bytes_rejects_truncated_payloads():
+    data = WordStore.from_segments(SEGMENTS).to_bytes()
+    for size in [0, 4, 5, 8, 20] + list(range(len(data) - 40, len(data))):
+        with pytest.raises(ValueError):
+            WordStore.from_bytes(data[:size])
+
+
+def test_from_bytes_rejects_out_of_range_indices():
+    store = WordStore.from_segments(SEGMENTS)
+    bad = WordStore(store.word_start, store.word_end, store.word_text + len(store.strings), store.word_flags,
+                    store.seg_start, store.seg_end, store.seg_text, store.seg_offset, store.strings)
+    with pytest.raises(ValueError):
+        WordStore.from_bytes(bad.to_bytes())
+
+
+def test_arrays_are_little_endian():
+    store = WordStore.from_segments(SEGMENTS)
+    big = WordStore(store.word_start.astype(">f8"), store.word_end, store.word_text.astype(">u4"),
+                    store.word_flags, store.seg_start, store.seg_end, store.seg_text, store.seg_offset,
+                    store.strings)
+    assert big.to_bytes() == store.to_bytes()
+    assert np.array_equal(WordStore.from_bytes(big.to_bytes()).word_start, store.word_start)